@@ -23,3 +23,12 @@ class UserApplyStep2Form(forms.Form):
     education_major = forms.CharField(max_length=250, required=False)
     image = forms.ImageField()
     resume = forms.FileField()
+
+
+class UserApplyStep2DirectForm(UserApplyStep2Form):
+    """Second step with the files uploaded directly to storage beforehand."""
+
+    image = None  # type: ignore[assignment]
+    resume = None  # type: ignore[assignment]
+    image_token = forms.CharField()
+    resume_token = forms.CharField()
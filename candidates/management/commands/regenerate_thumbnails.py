@@ -0,0 +1,99 @@
+"""Management command regenerating the image variants of existing rows."""
+
+import json
+import os
+import time
+from typing import Any, Dict
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from recruit.images import BACKFILL_BATCH_SIZE, IMAGE_FIELDS, regenerate_variants
+
+
+class Command(BaseCommand):
+    """Rebuild thumbnails and image variants in parallel worker processes."""
+
+    help = (
+        "Regenerate thumbnails and image variants of candidates, recruiters and "
+        "employers, e.g. after IMAGE_VARIANT_SIZES changed. With --checkpoint, "
+        "an interrupted run resumes where it stopped; delete the file to start "
+        "over."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            help="Only regenerate this model, e.g. candidates.Candidate (repeatable).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker processes; 0 processes images in this process.",
+        )
+        parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+        parser.add_argument(
+            "--checkpoint", help="File recording the last regenerated row per model."
+        )
+        parser.add_argument(
+            "--missing", action="store_true", help="Only rows without a thumbnail."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        fields = IMAGE_FIELDS
+        if options["models"]:
+            fields = [field for field in IMAGE_FIELDS if field[0] in options["models"]]
+            unknown = set(options["models"]) - {label for label, _, _ in fields}
+            if unknown:
+                raise CommandError(f"No image fields on: {', '.join(sorted(unknown))}")
+        checkpoint_path = options["checkpoint"]
+        checkpoint = self.load_checkpoint(checkpoint_path)
+
+        started = time.monotonic()
+        regenerated = failed = 0
+        for label, field, thumb_field in fields:
+            key = f"{label}.{field}"
+            for batch in regenerate_variants(
+                label,
+                field,
+                thumb_field,
+                after=checkpoint.get(key),
+                workers=max(0, options["workers"]),
+                batch_size=max(1, options["batch_size"]),
+                missing_only=options["missing"],
+            ):
+                regenerated += batch.regenerated
+                failed += batch.failed
+                checkpoint[key] = batch.last_pk
+                self.save_checkpoint(checkpoint_path, checkpoint)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{key}: up to pk {batch.last_pk}, {regenerated} images "
+                    f"({regenerated / elapsed if elapsed else 0:.1f}/s)"
+                )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Regenerated {regenerated} images ({failed} failed) in "
+                f"{elapsed:.1f}s, {regenerated / elapsed if elapsed else 0:.1f} "
+                "images/s."
+            )
+        )
+
+    def load_checkpoint(self, path: Any) -> Dict[str, Any]:
+        """Return the last regenerated pk per image field."""
+        if not path or not os.path.exists(path):
+            return {}
+        with open(path) as handle:
+            return dict(json.load(handle))
+
+    def save_checkpoint(self, path: Any, checkpoint: Dict[str, Any]) -> None:
+        """Replace the checkpoint file, atomically so a crash cannot corrupt it."""
+        if not path:
+            return
+        with open(f"{path}.tmp", "w") as handle:
+            json.dump(checkpoint, handle)
+        os.replace(f"{path}.tmp", path)
@@ -0,0 +1,30 @@
+"""Signal handlers generating and purging candidate image variants."""
+
+from typing import Any
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from recruit.images import queue_variants, remember_image, replaced_image
+from recruit.utils import purge_variants
+
+from .models import Candidate
+
+
+@receiver(post_init, sender=Candidate)
+def remember_image_name(sender: Any, instance: Candidate, **kwargs: Any) -> None:
+    """Note the loaded photo, so that a save can tell it was replaced."""
+    remember_image(instance, "image")
+
+
+@receiver(post_save, sender=Candidate)
+def queue_image_variants(sender: Any, instance: Candidate, **kwargs: Any) -> None:
+    """Resize a new or replaced candidate photo in the background."""
+    purge_variants(instance.image.storage, replaced_image(instance, "image"))
+    queue_variants(instance, "image", "thumb")
+
+
+@receiver(post_delete, sender=Candidate)
+def purge_image_variants(sender: Any, instance: Candidate, **kwargs: Any) -> None:
+    """Delete the variants of a removed candidate's photo."""
+    purge_variants(instance.image.storage, instance.image.name)
@@ -1,5 +1,413 @@
 """Tests for the candidates application."""
 
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from recruit.images import (
+    _executors,
+    process_image,
+    regenerate_variants,
+    render_variants,
+    shutdown,
+)
+from recruit.utils import generate_thumbnail, wait_for_deletes
+from uploads.models import PendingUpload
+from uploads.presigned import purge_unclaimed
+
+from .models import Candidate, CandidateDocument
+
+
+def image_bytes(size, image_format="JPEG", mode="RGB"):
+    """Return an encoded image of the given size."""
+    buffer = io.BytesIO()
+    Image.new(mode, size, "red").save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class ImagePipelineTest(TestCase):
+    """Test cases for the background image variant pipeline."""
+
+    def setUp(self) -> None:
+        """Store uploads in a temporary media root."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_PIPELINE_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(
+            username="candidate", email="candidate@example.com", password="pass1234"
+        )
+
+    def test_pools_are_drained_at_exit(self) -> None:
+        """Test that starting the worker pools registers their shutdown."""
+        with patch("recruit.images.ThreadPoolExecutor") as threads, patch(
+            "recruit.images.ProcessPoolExecutor"
+        ) as processes, patch("recruit.images.atexit") as exit_hooks:
+            _executors(1)
+            exit_hooks.register.assert_called_once_with(shutdown)
+            shutdown()
+        threads.return_value.shutdown.assert_called_once_with()
+        processes.return_value.shutdown.assert_called_once_with()
+
+    def test_variants_fit_every_size(self) -> None:
+        """Test that each size is produced in the source format and as WebP."""
+        sizes = [("thumb", (100, 100)), ("large", (800, 800))]
+        variants = render_variants(image_bytes((3000, 2000)), sizes)
+
+        self.assertEqual(
+            [(variant.size, variant.extension) for variant in variants],
+            [("large", "jpg"), ("large", "webp"), ("thumb", "jpg"), ("thumb", "webp")],
+        )
+        dimensions = [Image.open(io.BytesIO(variant.data)).size for variant in variants]
+        self.assertEqual(dimensions, [(800, 533)] * 2 + [(100, 67)] * 2)
+
+    def test_format_comes_from_content(self) -> None:
+        """Test that a PNG named like a JPEG keeps its transparency as PNG."""
+        upload = ContentFile(image_bytes((400, 400), "PNG", "RGBA"), name="logo.jpg")
+
+        thumb = generate_thumbnail(upload)
+
+        self.assertEqual(thumb.name, "logo-thumb.png")
+        self.assertEqual(thumb.content_type, "image/png")
+        self.assertEqual(Image.open(thumb).mode, "RGBA")
+
+    def test_upload_records_thumbnail_after_commit(self) -> None:
+        """Test that saving a photo stores its variants once committed."""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            candidate = Candidate.objects.create(
+                user=self.user, image=ContentFile(image_bytes((2000, 1500)), "me.jpg")
+            )
+        self.assertEqual(len(callbacks), 1)
+
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.thumb.name, "me-thumb.jpg")
+        self.assertEqual(Image.open(candidate.thumb).size, (100, 75))
+        self.assertTrue(default_storage.exists("me-large.webp"))
+
+        # The recorded thumbnail is current, so saving again queues nothing.
+        with self.captureOnCommitCallbacks() as callbacks:
+            candidate.save()
+        self.assertEqual(callbacks, [])
+
+    def test_replaced_image_keeps_new_thumbnail(self) -> None:
+        """Test that a stale job does not overwrite a newer image's thumbnail."""
+        candidate = Candidate.objects.create(
+            user=self.user, image=ContentFile(image_bytes((300, 300)), "old.jpg")
+        )
+        old_name = candidate.image.name
+        Candidate.objects.filter(pk=candidate.pk).update(image="new.jpg")
+
+        with ThreadPoolExecutor(1) as executor:
+            thumb = process_image(
+                Candidate, candidate.pk, "image", "thumb", old_name, executor=executor
+            )
+
+        self.assertEqual(thumb, "old-thumb.jpg")
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.thumb.name, "")
+
+    def test_replaced_and_deleted_photos_lose_their_variants(self) -> None:
+        """Test that the variants of a photo go when it is replaced or removed."""
+        with self.captureOnCommitCallbacks(execute=True):
+            candidate = Candidate.objects.create(
+                user=self.user, image=ContentFile(image_bytes((600, 600)), "old.jpg")
+            )
+        candidate = Candidate.objects.get(pk=candidate.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            candidate.image = ContentFile(image_bytes((600, 600)), "new.jpg")
+            candidate.save()
+        wait_for_deletes()
+        self.assertFalse(default_storage.exists("old-large.webp"))
+        self.assertTrue(default_storage.exists("old.jpg"))
+        self.assertTrue(default_storage.exists("new-large.webp"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            candidate.delete()
+        wait_for_deletes()
+        self.assertFalse(default_storage.exists("new-large.webp"))
+
+    def test_broken_upload_is_skipped(self) -> None:
+        """Test that an undecodable upload leaves the thumbnail empty."""
+        with self.captureOnCommitCallbacks(execute=True):
+            candidate = Candidate.objects.create(
+                user=self.user, image=ContentFile(b"not an image", "broken.jpg")
+            )
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.thumb.name, "")
+
+
+class RegenerateThumbnailsTest(TestCase):
+    """Test cases for the regenerate_thumbnails command."""
+
+    def setUp(self) -> None:
+        """Create candidates whose photos have no thumbnails yet."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.checkpoint = os.path.join(media_root, "checkpoint.json")
+        self.candidates = [
+            Candidate.objects.create(
+                user=User.objects.create_user(username=f"c{i}", password="pass1234"),
+                image=ContentFile(image_bytes((600, 400)), f"photo{i}.jpg"),
+            )
+            for i in range(3)
+        ]
+
+    def regenerate(self, **options):
+        """Run the command in-process and return its output."""
+        out = io.StringIO()
+        call_command(
+            "regenerate_thumbnails",
+            models=["candidates.Candidate"],
+            workers=0,
+            batch_size=2,
+            checkpoint=self.checkpoint,
+            stdout=out,
+            **options,
+        )
+        return out.getvalue()
+
+    def test_regenerates_and_checkpoints(self) -> None:
+        """Test that every row gets a thumbnail and the last pk is recorded."""
+        output = self.regenerate()
+
+        self.assertIn("Regenerated 3 images (0 failed)", output)
+        self.assertIn("images/s", output)
+        for candidate in self.candidates:
+            candidate.refresh_from_db()
+            self.assertTrue(candidate.thumb.name.endswith("-thumb.jpg"))
+        with open(self.checkpoint) as handle:
+            checkpoint = json.load(handle)
+        last_pk = self.candidates[-1].pk
+        self.assertEqual(checkpoint, {"candidates.Candidate.image": last_pk})
+
+    def test_resumes_from_checkpoint(self) -> None:
+        """Test that rows up to the checkpoint are skipped."""
+        with open(self.checkpoint, "w") as handle:
+            json.dump({"candidates.Candidate.image": self.candidates[1].pk}, handle)
+
+        self.assertIn("Regenerated 1 images", self.regenerate())
+        self.candidates[0].refresh_from_db()
+        self.assertEqual(self.candidates[0].thumb.name, "")
+
+    def test_photo_replaced_during_backfill_keeps_its_thumbnail(self) -> None:
+        """Test that a row whose photo changed is not given the old thumbnail."""
+        batches = regenerate_variants(
+            "candidates.Candidate", "image", "thumb", batch_size=2
+        )
+        self.assertEqual(next(batches).regenerated, 2)
+        # The last batch is already rendered when the photo is replaced.
+        replaced = self.candidates[-1]
+        Candidate.objects.filter(pk=replaced.pk).update(image="replaced.jpg")
+
+        self.assertEqual([batch.regenerated for batch in batches], [0])
+        replaced.refresh_from_db()
+        self.assertEqual(replaced.thumb.name, "")
+
+    def test_unknown_model(self) -> None:
+        """Test that a model without image fields is rejected."""
+        with self.assertRaises(CommandError):
+            call_command("regenerate_thumbnails", models=["jobs.Job"], workers=0)
+
+
+class FakeS3Storage(FileSystemStorage):
+    """Local stand-in for an S3 storage that presigns uploads."""
+
+    bucket_name = "recruit-media"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bucket = Mock()
+        self.bucket.meta.client.generate_presigned_post.side_effect = (
+            lambda **params: {
+                "url": "http://s3.local/recruit-media",
+                "fields": {"key": params["Key"], **params["Fields"]},
+            }
+        )
+        self.bucket.delete_objects.side_effect = self.delete_keys
+
+    def _normalize_name(self, name):
+        return f"media/{name}"
+
+    def delete_keys(self, Delete):
+        """Do what DeleteObjects does, on the local files."""
+        for item in Delete["Objects"]:
+            self.delete(item["Key"].removeprefix("media/"))
+        return {"Errors": []}
+
+
+class DirectUploadTest(TestCase):
+    """Test cases for application files uploaded straight to storage."""
+
+    details = {
+        "birth_year": "1990",
+        "gender": "female",
+        "education": "Bachelor",
+        "education_major": "History",
+    }
+
+    def setUp(self) -> None:
+        """Use an S3 stand-in and an applicant with a valid key."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(
+            MEDIA_ROOT=media_root,
+            PRESIGNED_UPLOADS=True,
+            STORAGES={
+                "default": {"BACKEND": "candidates.tests.FakeS3Storage"},
+                "staticfiles": {
+                    "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+                },
+            },
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(username="applicant", password="pass1234")
+        verify = patch(
+            "candidates.views.UserProfile.verify_token", return_value=self.user
+        )
+        verify.start()
+        self.addCleanup(verify.stop)
+
+    def presign(self):
+        """Request uploads of a photo and a resume."""
+        response = self.client.post(
+            reverse("candidate_apply_uploads") + "?key=k",
+            {
+                "image_name": "../me.jpg",
+                "image_type": "image/jpeg",
+                "resume_name": "cv.pdf",
+                "resume_type": "application/pdf",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def upload(self, upload, content):
+        """Do what the browser does: POST the file to the presigned URL."""
+        name = upload["fields"]["key"].removeprefix("media/")
+        default_storage.save(name, ContentFile(content))
+        return name
+
+    def complete(self, uploads):
+        """Report the uploads done along with the application details."""
+        return self.client.post(
+            reverse("candidate_apply_uploads_complete") + "?key=k",
+            {
+                **self.details,
+                "image_token": uploads["image"]["token"],
+                "resume_token": uploads["resume"]["token"],
+            },
+        )
+
+    def test_uploads_are_attached(self) -> None:
+        """Test that uploaded objects are assigned without re-uploading."""
+        uploads = self.presign()
+        self.assertEqual(uploads["image"]["fields"]["Content-Type"], "image/jpeg")
+        self.assertRegex(
+            uploads["image"]["fields"]["key"], r"^media/incoming/[0-9a-f]{32}/me.jpg$"
+        )
+        image = self.upload(uploads["image"], image_bytes((50, 50)))
+        resume = self.upload(uploads["resume"], b"%PDF-1.4")
+
+        response = self.complete(uploads)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["redirect"].endswith("?key=k"))
+        candidate = Candidate.objects.get(user=self.user)
+        self.assertEqual(candidate.image.name, image)
+        self.assertEqual(candidate.birth_year, "1990")
+        document = CandidateDocument.objects.get(candidate=candidate)
+        self.assertEqual(document.document.name, resume)
+
+    def test_missing_upload_is_rejected(self) -> None:
+        """Test that a token alone does not attach a file."""
+        uploads = self.presign()
+        self.upload(uploads["image"], image_bytes((50, 50)))
+
+        response = self.complete(uploads)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Candidate.objects.filter(user=self.user).exists())
+
+    def test_tokens_are_bound_to_their_field(self) -> None:
+        """Test that an upload cannot be claimed as another field."""
+        uploads = self.presign()
+        self.upload(uploads["image"], image_bytes((50, 50)))
+        self.upload(uploads["resume"], b"%PDF-1.4")
+        uploads["image"], uploads["resume"] = uploads["resume"], uploads["image"]
+
+        self.assertEqual(self.complete(uploads).status_code, 400)
+
+    def test_photo_must_be_an_image(self) -> None:
+        """Test that a photo upload is only issued for allowed image types."""
+        for content_type in ("application/x-msdownload", "image/svg+xml"):
+            response = self.client.post(
+                reverse("candidate_apply_uploads") + "?key=k",
+                {"image_name": "me.svg", "image_type": content_type},
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_invalid_photo_is_rejected(self) -> None:
+        """Test that a photo that does not decode is deleted, not attached."""
+        uploads = self.presign()
+        image = self.upload(uploads["image"], b"<svg onload='alert(1)'/>")
+        self.upload(uploads["resume"], b"%PDF-1.4")
+
+        response = self.complete(uploads)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(default_storage.exists(image))
+        self.assertFalse(Candidate.objects.filter(user=self.user).exists())
+
+    def test_tokens_are_single_use(self) -> None:
+        """Test that a claimed upload cannot be claimed again."""
+        uploads = self.presign()
+        self.upload(uploads["image"], image_bytes((50, 50)))
+        self.upload(uploads["resume"], b"%PDF-1.4")
+
+        self.assertEqual(self.complete(uploads).status_code, 200)
+        self.assertEqual(self.complete(uploads).status_code, 400)
+        self.assertFalse(PendingUpload.objects.exists())
+
+    def test_failed_claims_can_be_retried(self) -> None:
+        """Test that a photo stays claimable when the resume is missing."""
+        uploads = self.presign()
+        self.upload(uploads["image"], image_bytes((50, 50)))
+
+        self.assertEqual(self.complete(uploads).status_code, 400)
+        self.upload(uploads["resume"], b"%PDF-1.4")
+        self.assertEqual(self.complete(uploads).status_code, 200)
+
+    def test_unclaimed_uploads_are_purged(self) -> None:
+        """Test that objects of uploads never claimed are deleted."""
+        uploads = self.presign()
+        image = self.upload(uploads["image"], image_bytes((50, 50)))
+
+        result = purge_unclaimed(timezone.now())
+
+        self.assertEqual(result, (2, []))
+        self.assertFalse(default_storage.exists(image))
+        self.assertFalse(PendingUpload.objects.exists())
+
+    def test_storage_without_presigning(self) -> None:
+        """Test that storages other than S3 fall back to regular uploads."""
+        with override_settings(PRESIGNED_UPLOADS=False):
+            response = self.client.post(reverse("candidate_apply_uploads") + "?key=k")
+        self.assertEqual(response.status_code, 404)
@@ -1,18 +1,29 @@
 """Views for the candidates application."""
 
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from django.contrib import messages
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.urls import reverse
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_POST
 
 from accounts.models import UserProfile
-
-from .forms import UserApplyStep1Form, UserApplyStep2Form
+from uploads.presigned import (
+    IMAGE_TYPES,
+    UploadError,
+    claim_upload,
+    presign_upload,
+    supports_direct_uploads,
+)
+
+from .forms import UserApplyStep1Form, UserApplyStep2DirectForm, UserApplyStep2Form
 from .models import Candidate, CandidateDocument
 
+DIRECT_UPLOAD_FIELDS = ("image", "resume")
+
 
 def apply(request: HttpRequest) -> HttpResponse:
     """Handle candidate application process."""
@@ -66,33 +77,7 @@ def apply(request: HttpRequest) -> HttpResponse:
 
         if form.is_valid():
             files = form.files
-            data = form.data
-
-            try:
-                if hasattr(user, 'candidate') and user.candidate:
-                    candidate = user.candidate
-                    candidate.birth_year = data["birth_year"]
-                    candidate.gender = data["gender"]
-                    candidate.education = data["education"]
-                    candidate.education_major = data["education_major"]
-                    candidate.image = files["image"]
-                    candidate.save()
-                else:
-                    raise Candidate.DoesNotExist()
-            except (Candidate.DoesNotExist, AttributeError):
-                candidate = Candidate.objects.create(
-                    user=user,
-                    birth_year=data["birth_year"],
-                    gender=data["gender"],
-                    education=data["education"],
-                    education_major=data["education_major"],
-                    image=files["image"],
-                )
-            CandidateDocument.objects.create(
-                candidate=candidate,
-                document=files["resume"],
-                document_type="Resume",
-            )
+            save_application(user, form.data, files["image"], files["resume"])
 
             messages.add_message(
                 request, messages.SUCCESS, "Form submitted successfully."
@@ -112,7 +97,105 @@ def apply(request: HttpRequest) -> HttpResponse:
         messages.add_message(request, messages.ERROR, error_message)
         form = None
 
-    return render(request, "candidates/apply.html", {"form": form})
+    context: Dict[str, Any] = {"form": form}
+    if key and user and supports_direct_uploads():
+        context["uploads_url"] = reverse("candidate_apply_uploads") + "?key=" + key
+        context["uploads_complete_url"] = (
+            reverse("candidate_apply_uploads_complete") + "?key=" + key
+        )
+    return render(request, "candidates/apply.html", context)
+
+
+def save_application(user: User, data: Any, image: Any, resume: Any) -> Candidate:
+    """Store the second application step: details, photo and resume."""
+    try:
+        if hasattr(user, 'candidate') and user.candidate:
+            candidate = user.candidate
+            candidate.birth_year = data["birth_year"]
+            candidate.gender = data["gender"]
+            candidate.education = data["education"]
+            candidate.education_major = data["education_major"]
+            candidate.image = image
+            candidate.save()
+        else:
+            raise Candidate.DoesNotExist()
+    except (Candidate.DoesNotExist, AttributeError):
+        candidate = Candidate.objects.create(
+            user=user,
+            birth_year=data["birth_year"],
+            gender=data["gender"],
+            education=data["education"],
+            education_major=data["education_major"],
+            image=image,
+        )
+    CandidateDocument.objects.create(
+        candidate=candidate,
+        document=resume,
+        document_type="Resume",
+    )
+    return candidate
+
+
+@require_POST
+def apply_uploads(request: HttpRequest) -> JsonResponse:
+    """Issue presigned uploads of the photo and resume of step 2."""
+    user: Optional[User] = UserProfile.verify_token(request.GET.get("key"))
+    if not user:
+        return JsonResponse(
+            {"error": "A valid application key is required."}, status=403
+        )
+
+    if not supports_direct_uploads():
+        return JsonResponse({"error": "Direct uploads are not available."}, status=404)
+
+    uploads = {}
+    for field in DIRECT_UPLOAD_FIELDS:
+        content_type = request.POST.get(f"{field}_type") or "application/octet-stream"
+        if field == "image" and content_type not in IMAGE_TYPES:
+            return JsonResponse(
+                {"error": "The photo must be a JPEG, PNG or WebP image."}, status=400
+            )
+        try:
+            upload = presign_upload(
+                field, request.POST.get(f"{field}_name", ""), content_type, user.pk
+            )
+        except UploadError as e:
+            return JsonResponse({"error": str(e)}, status=404)
+        uploads[field] = upload._asdict()
+    return JsonResponse(uploads)
+
+
+@require_POST
+def apply_uploads_complete(request: HttpRequest) -> JsonResponse:
+    """Save step 2 with the photo and resume uploaded directly to storage."""
+    key = request.GET.get("key")
+    user: Optional[User] = UserProfile.verify_token(key)
+    if not key or not user:
+        return JsonResponse(
+            {"error": "A valid application key is required."}, status=403
+        )
+
+    form = UserApplyStep2DirectForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    try:
+        with transaction.atomic():
+            image, resume = (
+                claim_upload(
+                    form.cleaned_data[f"{field}_token"],
+                    field,
+                    user.pk,
+                    image=field == "image",
+                )
+                for field in DIRECT_UPLOAD_FIELDS
+            )
+            save_application(user, form.data, image, resume)
+    except UploadError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    messages.add_message(request, messages.SUCCESS, "Form submitted successfully.")
+    success_url = reverse("candidate_apply_success") + "?key=" + key
+    return JsonResponse({"redirect": success_url})
 
 
 def apply_success(request: HttpRequest) -> HttpResponse:
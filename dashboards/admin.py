@@ -1,3 +1,13 @@
 """Django admin configuration for dashboards app."""
 
-# Register your models here.
+from django.contrib import admin
+
+from .models import COUNTER_FIELDS, DashboardCounter
+
+
+@admin.register(DashboardCounter)
+class DashboardCounterAdmin(admin.ModelAdmin):
+    """Read-only admin for recruiter dashboard counters."""
+
+    list_display = ("recruiter", *COUNTER_FIELDS, "updated_at")
+    readonly_fields = ("recruiter", *COUNTER_FIELDS, "updated_at")
@@ -1,5 +1,13 @@
+"""Django app configuration for dashboards application."""
+
 from django.apps import AppConfig
 
 
 class DashboardsConfig(AppConfig):
-    name = 'dashboards'
+    """Configuration for the dashboards app."""
+
+    name = "dashboards"
+
+    def ready(self) -> None:
+        """Connect signal handlers."""
+        from . import signals  # noqa: F401
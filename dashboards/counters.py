@@ -0,0 +1,197 @@
+"""Incrementally maintained recruiter dashboard counters.
+
+Each InterviewInvitation and InterviewRequest contributes 0 or 1 to some of
+the counters of the recruiter who owns its job. Every save compares the
+row's contribution before and after the change and applies the difference
+with a single `F()` UPDATE, so the dashboard reads one row instead of
+counting every interview. `rebuild_counters` recomputes rows from scratch
+and is used to repair counters after bulk writes that bypass signals.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Count, F, Q
+from django.db.models.functions import Now
+
+from interviews.models import InterviewInvitation, InterviewRequest
+from jobs.models import Job
+from recruiters.models import Recruiter
+
+from .models import COUNTER_FIELDS, DashboardCounter
+
+REBUILD_BATCH_SIZE = 500
+
+# Fields of each model whose values decide its contribution.
+TRACKED_FIELDS = {
+    InterviewInvitation: ("job_id", "confirmed_time", "result"),
+    InterviewRequest: ("job_id", "candidate_accepted", "employer_accepted"),
+}
+
+State = Tuple[Any, ...]
+Deltas = Dict[Any, Dict[str, int]]
+
+
+def invitation_contribution(confirmed_time: Any, result: str) -> Dict[str, int]:
+    """Return the counters an invitation in the given state adds to."""
+    return {
+        "interviews_pending_confirmation": int(confirmed_time is None),
+        "interviews_pending_follow_up": int(
+            not (confirmed_time is None and result == "")
+        ),
+    }
+
+
+def request_contribution(
+    candidate_accepted: Optional[bool], employer_accepted: Optional[bool]
+) -> Dict[str, int]:
+    """Return the counters an interview request in the given state adds to."""
+    return {
+        "pending_employer_requests": int(
+            employer_accepted is True and candidate_accepted is None
+        ),
+        "pending_candidate_requests": int(
+            candidate_accepted is True and employer_accepted is None
+        ),
+    }
+
+
+def contribution(model: Any, state: State) -> Dict[str, int]:
+    """Return the contribution of a tracked row state, minus its job id."""
+    if model is InterviewInvitation:
+        return invitation_contribution(*state[1:])
+    return request_contribution(*state[1:])
+
+
+def capture_state(instance: Any) -> Optional[State]:
+    """Return the tracked field values of an instance, if all are loaded."""
+    fields = TRACKED_FIELDS[type(instance)]
+    if any(field not in instance.__dict__ for field in fields):
+        return None
+    return tuple(instance.__dict__[field] for field in fields)
+
+
+def load_state(model: Any, pk: Any) -> Optional[State]:
+    """Read the stored tracked field values of a row."""
+    row = model.objects.filter(pk=pk).values_list(*TRACKED_FIELDS[model]).first()
+    return tuple(row) if row is not None else None
+
+
+def state_deltas(model: Any, before: Optional[State], after: Optional[State]) -> Deltas:
+    """Return the per-recruiter counter changes between two row states."""
+    job_ids = {state[0] for state in (before, after) if state is not None}
+    recruiters = dict(
+        Job.objects.filter(pk__in=job_ids).values_list("pk", "recruiter_id")
+    )
+    deltas: Deltas = {}
+    for state, sign in ((before, -1), (after, 1)):
+        if state is None:
+            continue
+        recruiter_id = recruiters.get(state[0])
+        if recruiter_id is None:
+            continue
+        counters = deltas.setdefault(recruiter_id, {})
+        for field, value in contribution(model, state).items():
+            counters[field] = counters.get(field, 0) + sign * value
+    return deltas
+
+
+def apply_deltas(deltas: Deltas) -> None:
+    """Add counter deltas, creating missing counter rows from scratch."""
+    missing = []
+    for recruiter_id, counters in deltas.items():
+        changes = {
+            field: F(field) + value for field, value in counters.items() if value
+        }
+        if not changes:
+            continue
+        updated = DashboardCounter.objects.filter(pk=recruiter_id).update(
+            updated_at=Now(), **changes
+        )
+        if not updated:
+            missing.append(recruiter_id)
+    if missing:
+        # A full recount already includes the change being recorded.
+        rebuild_counters(missing)
+
+
+def record_created(instances: Iterable[Any]) -> None:
+    """Count rows inserted with `bulk_create`, which sends no signals."""
+    deltas: Deltas = {}
+    for instance in instances:
+        model = type(instance)
+        for recruiter_id, counters in state_deltas(
+            model, None, capture_state(instance)
+        ).items():
+            total = deltas.setdefault(recruiter_id, {})
+            for field, value in counters.items():
+                total[field] = total.get(field, 0) + value
+    apply_deltas(deltas)
+
+
+def count_rows(recruiter_ids: List[Any]) -> Deltas:
+    """Count every recruiter's pending interviews with two grouped queries."""
+    counts: Deltas = {
+        recruiter_id: {field: 0 for field in COUNTER_FIELDS}
+        for recruiter_id in recruiter_ids
+    }
+    invitations = (
+        InterviewInvitation.objects.filter(job__recruiter__in=recruiter_ids)
+        .values("job__recruiter")
+        .annotate(
+            interviews_pending_confirmation=Count(
+                "pk", filter=Q(confirmed_time__isnull=True)
+            ),
+            interviews_pending_follow_up=Count(
+                "pk", filter=~Q(confirmed_time__isnull=True, result="")
+            ),
+        )
+        .order_by()
+    )
+    requests = (
+        InterviewRequest.objects.filter(job__recruiter__in=recruiter_ids)
+        .values("job__recruiter")
+        .annotate(
+            pending_employer_requests=Count(
+                "pk",
+                filter=Q(employer_accepted=True, candidate_accepted__isnull=True),
+            ),
+            pending_candidate_requests=Count(
+                "pk",
+                filter=Q(candidate_accepted=True, employer_accepted__isnull=True),
+            ),
+        )
+        .order_by()
+    )
+    for rows in (invitations, requests):
+        for row in rows:
+            recruiter_id = row.pop("job__recruiter")
+            counts[recruiter_id].update(row)
+    return counts
+
+
+def rebuild_counters(recruiter_ids: Optional[Iterable[Any]] = None) -> int:
+    """Recompute the counters of the given recruiters (default: all)."""
+    if recruiter_ids is None:
+        recruiter_ids = Recruiter.objects.order_by("pk").values_list("pk", flat=True)
+    ids = list(recruiter_ids)
+    for start in range(0, len(ids), REBUILD_BATCH_SIZE):
+        batch = ids[start : start + REBUILD_BATCH_SIZE]
+        DashboardCounter.objects.bulk_create(
+            [
+                DashboardCounter(recruiter_id=recruiter_id, **counters)
+                for recruiter_id, counters in count_rows(batch).items()
+            ],
+            update_conflicts=True,
+            unique_fields=["recruiter"],
+            update_fields=[*COUNTER_FIELDS, "updated_at"],
+        )
+    return len(ids)
+
+
+def get_counters(recruiter_id: Any) -> DashboardCounter:
+    """Return a recruiter's counters, building them on first use."""
+    counter = DashboardCounter.objects.filter(pk=recruiter_id).first()
+    if counter is None:
+        rebuild_counters([recruiter_id])
+        counter = DashboardCounter.objects.get(pk=recruiter_id)
+    return counter
@@ -0,0 +1,33 @@
+"""Management command recomputing recruiter dashboard counters."""
+
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from dashboards.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    """Rebuild dashboard counters from the interview tables."""
+
+    help = "Recount every recruiter's dashboard counters from scratch."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--recruiter",
+            type=int,
+            action="append",
+            dest="recruiters",
+            help="Only rebuild this recruiter's counters (repeatable).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        started = time.monotonic()
+        rebuilt = rebuild_counters(options["recruiters"])
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt counters for {rebuilt} recruiters in {elapsed:.1f}s."
+            )
+        )
@@ -1,6 +1,32 @@
 """Models for the dashboards application."""
 
-# Import models from centralized location
-# Note: dashboards app currently has no models defined
+from django.db import models
 
-__all__ = []
+COUNTER_FIELDS = (
+    "interviews_pending_confirmation",
+    "interviews_pending_follow_up",
+    "pending_employer_requests",
+    "pending_candidate_requests",
+)
+
+
+class DashboardCounter(models.Model):
+    """Per-recruiter interview counts shown on the recruiter dashboard."""
+
+    recruiter = models.OneToOneField(
+        "recruiters.Recruiter",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="dashboard_counter",
+    )
+    interviews_pending_confirmation = models.IntegerField(default=0)
+    interviews_pending_follow_up = models.IntegerField(default=0)
+    pending_employer_requests = models.IntegerField(default=0)
+    pending_candidate_requests = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Dashboard counters for recruiter {self.pk}"
+
+
+__all__ = ["COUNTER_FIELDS", "DashboardCounter"]
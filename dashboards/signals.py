@@ -0,0 +1,82 @@
+"""Signal handlers keeping recruiter dashboard counters up to date."""
+
+from typing import Any
+
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from interviews.models import InterviewInvitation, InterviewRequest
+from jobs.models import Job
+
+from .counters import (
+    apply_deltas,
+    capture_state,
+    load_state,
+    rebuild_counters,
+    state_deltas,
+)
+
+
+@receiver(post_init, sender=InterviewInvitation)
+@receiver(post_init, sender=InterviewRequest)
+def remember_state(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Stash the counted field values of a freshly loaded row."""
+    instance._dashboard_state = capture_state(instance)
+
+
+@receiver(pre_save, sender=InterviewInvitation)
+@receiver(pre_save, sender=InterviewRequest)
+@receiver(pre_delete, sender=InterviewInvitation)
+@receiver(pre_delete, sender=InterviewRequest)
+def load_missing_state(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Read the stored state of rows that were loaded with deferred fields."""
+    if kwargs.get("raw") or instance._state.adding:
+        return
+    if getattr(instance, "_dashboard_state", None) is None:
+        instance._dashboard_state = load_state(sender, instance.pk)
+
+
+@receiver(post_save, sender=InterviewInvitation)
+@receiver(post_save, sender=InterviewRequest)
+def count_saved(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Apply the counter changes caused by a save."""
+    if kwargs.get("raw"):
+        return
+    before = None if kwargs.get("created") else instance._dashboard_state
+    after = capture_state(instance) or load_state(sender, instance.pk)
+    apply_deltas(state_deltas(sender, before, after))
+    instance._dashboard_state = after
+
+
+@receiver(post_delete, sender=InterviewInvitation)
+@receiver(post_delete, sender=InterviewRequest)
+def count_deleted(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Remove a deleted row from its recruiter's counters."""
+    before = instance._dashboard_state
+    apply_deltas(state_deltas(sender, before, None))
+
+
+@receiver(post_init, sender=Job)
+def remember_recruiter(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Stash the recruiter a freshly loaded job belongs to."""
+    instance._dashboard_recruiter_id = instance.__dict__.get("recruiter_id")
+
+
+@receiver(post_save, sender=Job)
+def recount_reassigned_job(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Recount both recruiters when a job changes hands."""
+    if kwargs.get("raw") or kwargs.get("created"):
+        return
+    if "recruiter_id" not in instance.__dict__:
+        return
+    previous = instance._dashboard_recruiter_id
+    current = instance.recruiter_id
+    if previous != current:
+        rebuild_counters(pk for pk in (previous, current) if pk is not None)
+        instance._dashboard_recruiter_id = current
@@ -1,3 +1,113 @@
 """Tests for the dashboards app."""
 
-# Create your tests here.
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from model_bakery import baker
+
+from candidates.models import Candidate
+from interviews.models import InterviewInvitation, InterviewRequest
+from jobs.models import Job
+from recruiters.models import Recruiter
+
+from .counters import count_rows, get_counters, rebuild_counters
+from .models import COUNTER_FIELDS, DashboardCounter
+from .views import dashboards
+
+
+class DashboardCounterTest(TestCase):
+    """Test cases for the incremental dashboard counters."""
+
+    def setUp(self) -> None:
+        """Create two recruiters with one job each."""
+        self.recruiter, self.other = baker.make(Recruiter, _quantity=2)
+        self.job = baker.make(Job, recruiter=self.recruiter)
+        self.other_job = baker.make(Job, recruiter=self.other)
+        self.candidate = baker.make(Candidate)
+        rebuild_counters()
+
+    def assertCountersMatchRecount(self) -> None:
+        """Assert the stored counters equal a from-scratch recount."""
+        expected = count_rows([self.recruiter.pk, self.other.pk])
+        for recruiter_id, counts in expected.items():
+            counter = DashboardCounter.objects.get(pk=recruiter_id)
+            stored = {field: getattr(counter, field) for field in COUNTER_FIELDS}
+            self.assertEqual(stored, counts)
+
+    def test_invitation_changes(self) -> None:
+        """Test that invitations are counted for their job's recruiter only."""
+        invitation = baker.make(
+            InterviewInvitation, job=self.job, candidate=self.candidate, result=""
+        )
+        counter = get_counters(self.recruiter.pk)
+        self.assertEqual(counter.interviews_pending_confirmation, 1)
+        self.assertEqual(get_counters(self.other.pk).interviews_pending_confirmation, 0)
+
+        invitation.confirmed_time = timezone.now()
+        invitation.save()
+        counter.refresh_from_db()
+        self.assertEqual(counter.interviews_pending_confirmation, 0)
+        self.assertEqual(counter.interviews_pending_follow_up, 1)
+        self.assertCountersMatchRecount()
+
+        InterviewInvitation.objects.only("pk").get(pk=invitation.pk).delete()
+        self.assertCountersMatchRecount()
+
+    def test_request_changes(self) -> None:
+        """Test that request acceptance moves between counters."""
+        request = baker.make(InterviewRequest, job=self.job, candidate=self.candidate)
+        request.employer_accepted = True
+        request.save()
+        self.assertEqual(get_counters(self.recruiter.pk).pending_employer_requests, 1)
+
+        deferred = InterviewRequest.objects.defer("candidate_accepted").get(
+            pk=request.pk
+        )
+        deferred.candidate_accepted = True
+        deferred.save()
+        self.assertEqual(get_counters(self.recruiter.pk).pending_employer_requests, 0)
+        self.assertCountersMatchRecount()
+
+    def test_job_reassignment(self) -> None:
+        """Test that moving a job moves its interviews between recruiters."""
+        baker.make(InterviewInvitation, job=self.job, candidate=self.candidate)
+        job = Job.objects.get(pk=self.job.pk)
+        job.recruiter = self.other
+        job.save()
+        previous = get_counters(self.recruiter.pk)
+        current = get_counters(self.other.pk)
+        self.assertEqual(previous.interviews_pending_confirmation, 0)
+        self.assertEqual(current.interviews_pending_confirmation, 1)
+
+    def test_dashboard_reads_one_row(self) -> None:
+        """Test that reading counters does not scale with interview count."""
+        baker.make(
+            InterviewInvitation, job=self.job, candidate=self.candidate, _quantity=5
+        )
+        with self.assertNumQueries(1):
+            counter = get_counters(self.recruiter.pk)
+        self.assertEqual(counter.interviews_pending_confirmation, 5)
+
+
+class RecruiterDashboardTest(TestCase):
+    """Test cases for the recruiter dashboard page."""
+
+    def test_recruiter_without_profile_row(self) -> None:
+        """Test that a recruiter user without a Recruiter row gets zeros."""
+        user = baker.make(User)
+        baker.make(
+            User.userprofile.related.related_model,  # type: ignore[attr-defined]
+            user=user,
+            user_type="Recruiter",
+        )
+        request = RequestFactory().get("/")
+        request.user = user
+
+        with patch("dashboards.views.render") as render:
+            dashboards(request)
+
+        template, context = render.call_args.args[1:]
+        self.assertEqual(template, "recruiters/dashboard.html")
+        self.assertEqual(context, dict.fromkeys(COUNTER_FIELDS, 0))
@@ -1,4 +1,4 @@
 """Type definitions for the dashboards application."""
 
-# Dashboards app doesn't have any models yet
-# This file exists to maintain consistency with the type structure
+# DashboardCounter is defined directly in dashboards.models; it has no
+# counterpart in the centralized model package that needs a protocol here.
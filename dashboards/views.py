@@ -4,7 +4,10 @@ from django.contrib.auth.decorators import login_required
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 
-from interviews.models import InterviewInvitation, InterviewRequest
+from recruiters.models import Recruiter
+
+from .counters import get_counters
+from .models import COUNTER_FIELDS
 
 
 @login_required
@@ -17,31 +20,15 @@ def dashboards(request: HttpRequest) -> HttpResponse:
             return render(request, "candidates/dashboard.html")
 
         if user_type == "Recruiter":
-            interviews_pending_confirmation = InterviewInvitation.objects.exclude(
-                confirmed_time__isnull=False,
-            ).count()  # type: ignore[misc]
-
-            interviews_pending_follow_up = InterviewInvitation.objects.exclude(
-                confirmed_time__isnull=True,
-                result="",
-            ).count()  # type: ignore[misc]
-
-            pending_employer_requests = InterviewRequest.objects.filter(
-                employer_accepted=True,
-                candidate_accepted__isnull=True,
-            ).count()  # type: ignore[misc]
-
-            pending_candidate_requests = InterviewRequest.objects.filter(
-                candidate_accepted=True,
-                employer_accepted__isnull=True,
-            ).count()  # type: ignore[misc]
-
-            context = {
-                "interviews_pending_confirmation": interviews_pending_confirmation,
-                "interviews_pending_follow_up": interviews_pending_follow_up,
-                "pending_employer_requests": pending_employer_requests,
-                "pending_candidate_requests": pending_candidate_requests,
-            }
+            recruiter_id = (
+                Recruiter.objects.filter(user=request.user)
+                .values_list("pk", flat=True)
+                .first()
+            )
+            context = dict.fromkeys(COUNTER_FIELDS, 0)
+            if recruiter_id is not None:
+                counter = get_counters(recruiter_id)
+                context = {field: getattr(counter, field) for field in COUNTER_FIELDS}
 
             return render(request, "recruiters/dashboard.html", context)
 
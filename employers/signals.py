@@ -0,0 +1,69 @@
+"""Signal handlers generating and purging employer image files."""
+
+from typing import Any, List
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from recruit.custom_storages import is_content_addressed
+from recruit.images import queue_variants, remember_image, replaced_image
+from recruit.utils import StoredFile, image_files, purge_variants, queue_delete
+
+from .models import Employer, EmployerImages
+
+
+@receiver(post_init, sender=Employer)
+def remember_license_name(sender: Any, instance: Employer, **kwargs: Any) -> None:
+    """Note the loaded license scan, so that a save can tell it was replaced."""
+    remember_image(instance, "business_license")
+
+
+@receiver(post_save, sender=Employer)
+def queue_license_variants(sender: Any, instance: Employer, **kwargs: Any) -> None:
+    """Resize a new or replaced business license scan in the background."""
+    purge_variants(
+        instance.business_license.storage,
+        replaced_image(instance, "business_license"),
+    )
+    queue_variants(instance, "business_license", "business_license_thumb")
+
+
+@receiver(post_init, sender=EmployerImages)
+def remember_image_name(
+    sender: Any, instance: EmployerImages, **kwargs: Any
+) -> None:
+    """Note the loaded image, so that a save can tell it was replaced."""
+    remember_image(instance, "image")
+
+
+@receiver(post_save, sender=EmployerImages)
+def queue_image_variants(
+    sender: Any, instance: EmployerImages, **kwargs: Any
+) -> None:
+    """Resize a new or replaced employer image in the background."""
+    purge_variants(instance.image.storage, replaced_image(instance, "image"))
+    queue_variants(instance, "image", "thumb")
+
+
+def purge_files(*files: Any) -> None:
+    """Delete files and their variants once the deletion is committed."""
+    stored: List[StoredFile] = []
+    for file in files:
+        stored += image_files(file)
+    # Shared content-addressed objects go once unreferenced (uploads app).
+    stored = [file for file in stored if not is_content_addressed(file.name)]
+    if stored:
+        transaction.on_commit(lambda: queue_delete(stored))
+
+
+@receiver(post_delete, sender=Employer)
+def purge_license(sender: Any, instance: Employer, **kwargs: Any) -> None:
+    """Delete a removed employer's business license and its variants."""
+    purge_files(instance.business_license, instance.business_license_thumb)
+
+
+@receiver(post_delete, sender=EmployerImages)
+def purge_image(sender: Any, instance: EmployerImages, **kwargs: Any) -> None:
+    """Delete a removed employer image and its variants."""
+    purge_files(instance.image, instance.thumb)
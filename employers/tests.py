@@ -1,3 +1,134 @@
 """Tests for the employers application."""
 
-# Create your tests here.
+import shutil
+import tempfile
+from unittest.mock import Mock, patch
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from recruit.utils import (
+    DeleteFailure,
+    StoredFile,
+    delete_objects,
+    delete_with_backoff,
+    record_failed_deletes,
+    wait_for_deletes,
+)
+from uploads.models import FailedDeletion
+
+from .models import Employer, EmployerImages
+
+
+class FakeS3Storage:
+    """Stand-in for S3Boto3Storage recording DeleteObjects requests."""
+
+    bucket_name = "recruit-media"
+
+    def __init__(self, errors=()):
+        self.bucket = Mock()
+        self.bucket.delete_objects.return_value = {
+            "Errors": [
+                {"Key": f"media/{name}", "Code": "AccessDenied", "Message": "Denied"}
+                for name in errors
+            ]
+        }
+
+    def _normalize_name(self, name):
+        return f"media/{name}"
+
+    def requested_keys(self):
+        """Return the keys of each DeleteObjects request."""
+        return [
+            [item["Key"] for item in call.kwargs["Delete"]["Objects"]]
+            for call in self.bucket.delete_objects.call_args_list
+        ]
+
+
+class DeleteObjectsTest(TestCase):
+    """Test cases for batched file deletion."""
+
+    def test_keys_are_grouped_in_thousands(self) -> None:
+        """Test that one request deletes up to 1000 keys of a bucket."""
+        storage = FakeS3Storage()
+        files = [StoredFile(storage, f"images/{i}.jpg") for i in range(2500)]
+
+        result = delete_objects(files)
+
+        self.assertEqual(result, (2500, []))
+        keys = storage.requested_keys()
+        self.assertEqual([len(batch) for batch in keys], [1000, 1000, 500])
+        self.assertEqual(keys[0][0], "media/images/0.jpg")
+
+    def test_failed_keys_are_reported(self) -> None:
+        """Test that per-key errors come back with their files."""
+        storage = FakeS3Storage(errors=["b.jpg"])
+
+        result = delete_objects(
+            [StoredFile(storage, "a.jpg"), StoredFile(storage, "b.jpg")]
+        )
+
+        self.assertEqual(result.deleted, 1)
+        failure, = result.failed
+        self.assertEqual(failure.file, StoredFile(storage, "b.jpg"))
+        self.assertEqual(failure.error, "AccessDenied: Denied")
+
+    def test_failures_are_retried_with_backoff(self) -> None:
+        """Test that failed deletions are retried after growing pauses."""
+        storage = FakeS3Storage()
+        storage.bucket.delete_objects.side_effect = [
+            Exception("SlowDown"),
+            Exception("SlowDown"),
+            {"Errors": []},
+        ]
+
+        with patch("recruit.utils.time.sleep") as sleep:
+            result = delete_with_backoff([StoredFile(storage, "a.jpg")])
+
+        self.assertEqual(result, (1, []))
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.5, 1.0])
+
+    def test_final_failures_are_recorded(self) -> None:
+        """Test that files failing every attempt are kept for a retry."""
+        storage = FakeS3Storage()
+        failure = DeleteFailure(StoredFile(storage, "a.jpg"), "SlowDown")
+
+        with self.assertLogs("recruit.utils", "ERROR"):
+            record_failed_deletes([failure])
+            record_failed_deletes([failure._replace(error="AccessDenied")])
+
+        row = FailedDeletion.objects.get()
+        self.assertEqual(row.storage, "employers.tests.FakeS3Storage")
+        self.assertEqual((row.name, row.error), ("a.jpg", "AccessDenied"))
+
+
+class EmployerPurgeTest(TestCase):
+    """Test cases for deleting a departed employer's files."""
+
+    def setUp(self) -> None:
+        """Store uploads in a temporary media root."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_PIPELINE_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_deleting_employer_removes_files(self) -> None:
+        """Test that an employer's license, images and variants are deleted."""
+        user = User.objects.create_user(username="employer", password="pass1234")
+        employer = Employer.objects.create(
+            user=user, business_license=ContentFile(b"scan", "license.pdf")
+        )
+        image = EmployerImages.objects.create(
+            employer=employer, image=ContentFile(b"photo", "office.jpg")
+        )
+        default_storage.save("office-thumb.webp", ContentFile(b"variant"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            employer.delete()
+        wait_for_deletes()
+
+        for name in ("license.pdf", image.image.name, "office-thumb.webp"):
+            self.assertFalse(default_storage.exists(name), name)
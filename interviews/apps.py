@@ -1,5 +1,17 @@
+"""Django app configuration for interviews application."""
+
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class InterviewsConfig(AppConfig):
-    name = 'interviews'
+    """Configuration for the interviews app."""
+
+    name = "interviews"
+
+    def ready(self) -> None:
+        """Connect signal handlers."""
+        from . import signals  # noqa: F401
+        from .indexes import install_indexes
+
+        post_migrate.connect(install_indexes, sender=self)
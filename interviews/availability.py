@@ -0,0 +1,370 @@
+"""Weekly availability bitmaps and overlap queries.
+
+A user's weekly availability is stored as a 672-bit integer: one bit per
+15-minute slot of the week in UTC, starting Monday 00:00. Intersecting the
+availability of several users is then a bitwise AND, and removing a
+blackout date is clearing a run of bits. Queries over a date range work on
+a "horizon" mask whose bit `i` is the slot starting `i * 15` minutes after
+the (slot-aligned) start of the range.
+"""
+
+import datetime
+import math
+import threading
+import zoneinfo
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Available, Exclusion, WeeklyAvailability
+
+SLOT_MINUTES = 15
+SLOT = datetime.timedelta(minutes=SLOT_MINUTES)
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+WEEK_MASK = (1 << SLOTS_PER_WEEK) - 1
+BITMAP_BYTES = SLOTS_PER_WEEK // 8
+
+UTC = datetime.timezone.utc
+
+Interval = Tuple[datetime.datetime, datetime.datetime]
+Range = Tuple[int, str, str]
+
+# Users whose ranges `save_availability` is replacing in this thread.
+_saving = threading.local()
+
+
+class AvailabilityConflict(Exception):
+    """Raised when availability was changed since the editor loaded it."""
+
+    def __init__(self, version: int) -> None:
+        super().__init__(f"Availability changed; current version is {version}")
+        self.version = version
+
+
+class Horizon:
+    """A date range split into 15-minute slots, aligned to slot boundaries."""
+
+    def __init__(self, start: datetime.datetime, end: datetime.datetime) -> None:
+        start = start.astimezone(UTC)
+        end = end.astimezone(UTC)
+        self.start = start.replace(
+            minute=start.minute - start.minute % SLOT_MINUTES, second=0, microsecond=0
+        )
+        self.slots = max(0, math.ceil((end - self.start) / SLOT))
+        self.mask = (1 << self.slots) - 1
+
+    @property
+    def end(self) -> datetime.datetime:
+        """Return the end of the last slot."""
+        return self.to_datetime(self.slots)
+
+    def index(self, moment: datetime.datetime) -> int:
+        """Return the slot containing `moment`, which may lie outside."""
+        return math.floor((moment.astimezone(UTC) - self.start) / SLOT)
+
+    def to_datetime(self, index: int) -> datetime.datetime:
+        """Return the start of slot `index`."""
+        return self.start + index * SLOT
+
+    def range_mask(self, start: datetime.datetime, end: datetime.datetime) -> int:
+        """Return the slots overlapping [start, end), clipped to the horizon."""
+        first = max(0, self.index(start))
+        last = min(self.slots, math.ceil((end.astimezone(UTC) - self.start) / SLOT))
+        if last <= first:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+
+    def week_offset(self) -> int:
+        """Return the weekly slot in which the horizon starts."""
+        return (
+            self.start.weekday() * SLOTS_PER_DAY
+            + (self.start.hour * 60 + self.start.minute) // SLOT_MINUTES
+        )
+
+    def tile(self, week: int) -> int:
+        """Repeat a weekly bitmap over the whole horizon."""
+        offset = self.week_offset()
+        rotated = ((week >> offset) | (week << (SLOTS_PER_WEEK - offset))) & WEEK_MASK
+        tiled, width = rotated, SLOTS_PER_WEEK
+        while width < self.slots:
+            tiled |= tiled << width
+            width *= 2
+        return tiled & self.mask
+
+    def intervals(self, mask: int, min_slots: int = 1) -> List[Interval]:
+        """Convert a mask into (start, end) runs at least `min_slots` long."""
+        runs = []
+        index = 0
+        while mask:
+            skip = (mask & -mask).bit_length() - 1
+            mask >>= skip
+            index += skip
+            length = (~mask & (mask + 1)).bit_length() - 1
+            if length >= min_slots:
+                runs.append((self.to_datetime(index), self.to_datetime(index + length)))
+            mask >>= length
+            index += length
+        return runs
+
+
+def get_zone(name: Optional[str]) -> datetime.tzinfo:
+    """Return the named time zone, falling back to UTC."""
+    if not name:
+        return UTC
+    try:
+        return zoneinfo.ZoneInfo(name)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        return UTC
+
+
+def parse_datetime(value: str) -> Optional[datetime.datetime]:
+    """Parse an ISO 8601 timestamp as stored by the availability page."""
+    try:
+        moment = datetime.datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return moment if moment.tzinfo is not None else None
+
+
+def parse_clock(value: str) -> Optional[datetime.timedelta]:
+    """Parse a wall-clock time such as "09:30", "9.5" or "24:00"."""
+    value = value.strip()
+    try:
+        if ":" in value:
+            hours, minutes = value.split(":")[:2]
+            offset = datetime.timedelta(hours=int(hours), minutes=int(minutes))
+        else:
+            offset = datetime.timedelta(hours=float(value))
+    except ValueError:
+        return None
+    if not datetime.timedelta(0) <= offset <= datetime.timedelta(days=1):
+        return None
+    return offset
+
+
+def week_range_mask(start: datetime.datetime, end: datetime.datetime) -> int:
+    """Return the weekly slots fully covered by [start, end), wrapping around."""
+    start = start.astimezone(UTC)
+    end = end.astimezone(UTC)
+    if end <= start:
+        end += datetime.timedelta(days=1)
+    midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    first = math.ceil((start - midnight) / SLOT)
+    last = math.floor((end - midnight) / SLOT)
+    length = min(max(0, last - first), SLOTS_PER_WEEK)
+    offset = start.weekday() * SLOTS_PER_DAY + first
+    bits = ((1 << length) - 1) << offset
+    return (bits | bits >> SLOTS_PER_WEEK) & WEEK_MASK
+
+
+def range_to_bits(
+    day_of_week: int, time_start: str, time_end: str, zone: datetime.tzinfo
+) -> int:
+    """
+    Return the weekly UTC slots of one `Available` row.
+
+    The availability page stores absolute UTC timestamps, which are used as
+    they are. Plain wall-clock times are read in the user's time zone on
+    `day_of_week` (0 is Sunday, as on the page) of the current week.
+    """
+    start = parse_datetime(time_start)
+    end = parse_datetime(time_end)
+    if start is not None and end is not None:
+        return week_range_mask(start, end)
+
+    start_clock = parse_clock(time_start)
+    end_clock = parse_clock(time_end)
+    if start_clock is None or end_clock is None:
+        return 0
+    today = datetime.datetime.now(zone).date()
+    monday = today - datetime.timedelta(days=today.weekday())
+    day = monday + datetime.timedelta(days=(int(day_of_week) - 1) % 7)
+    midnight = datetime.datetime.combine(day, datetime.time(), tzinfo=zone)
+    start = (midnight + start_clock).astimezone(UTC)
+    end = (midnight + end_clock).astimezone(UTC)
+    return week_range_mask(start, end)
+
+
+def weekly_bitmap(ranges: Iterable[Sequence[Any]], zone: datetime.tzinfo) -> int:
+    """Combine (day_of_week, time_start, time_end) ranges into one bitmap."""
+    week = 0
+    for day_of_week, time_start, time_end in ranges:
+        week |= range_to_bits(day_of_week, time_start, time_end, zone)
+    return week
+
+
+def user_zones(user_ids: Iterable[Any]) -> Dict[Any, datetime.tzinfo]:
+    """Return each user's profile time zone."""
+    rows = User.objects.filter(pk__in=list(user_ids)).values_list(
+        "pk", "userprofile__timezone"
+    )
+    return {pk: get_zone(name) for pk, name in rows}
+
+
+def refresh_weekly_availability(user_ids: Iterable[Any]) -> Dict[Any, int]:
+    """Rebuild the stored bitmaps of the given users from their ranges."""
+    ids = list(user_ids)
+    if not ids:
+        return {}
+    zones = user_zones(ids)
+    ranges: Dict[Any, List[Range]] = {pk: [] for pk in zones}
+    rows = Available.objects.filter(user__in=zones).values_list(
+        "user_id", "day_of_week", "time_start", "time_end"
+    )
+    for user_id, *row in rows:
+        ranges[user_id].append(tuple(row))  # type: ignore[arg-type]
+
+    versions = dict(
+        WeeklyAvailability.objects.filter(pk__in=zones).values_list("pk", "version")
+    )
+    bitmaps = {pk: weekly_bitmap(ranges[pk], zones[pk]) for pk in zones}
+    WeeklyAvailability.objects.bulk_create(
+        [
+            WeeklyAvailability(
+                user_id=pk,
+                bitmap=week.to_bytes(BITMAP_BYTES, "little"),
+                version=versions.get(pk, 0) + 1,
+            )
+            for pk, week in bitmaps.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=["bitmap", "version", "updated_at"],
+    )
+    return bitmaps
+
+
+def weekly_bitmaps(user_ids: Iterable[Any]) -> Dict[Any, int]:
+    """Return the stored bitmaps of the given users, building missing ones."""
+    ids = set(user_ids)
+    bitmaps = {
+        pk: int.from_bytes(bitmap, "little")
+        for pk, bitmap in WeeklyAvailability.objects.filter(pk__in=ids).values_list(
+            "pk", "bitmap"
+        )
+    }
+    missing = ids - bitmaps.keys()
+    if missing:
+        bitmaps.update(refresh_weekly_availability(missing))
+    return bitmaps
+
+
+def exclusion_masks(user_ids: Iterable[Any], horizon: Horizon) -> Dict[Any, int]:
+    """Return the horizon slots each user has blacked out."""
+    ids = list(user_ids)
+    zones = user_zones(ids)
+    first = horizon.start.date() - datetime.timedelta(days=1)
+    last = horizon.end.date() + datetime.timedelta(days=1)
+    masks: Dict[Any, int] = {}
+    rows = Exclusion.objects.filter(user__in=ids, date__range=(first, last))
+    for user_id, day in rows.values_list("user_id", "date"):
+        zone = zones.get(user_id, UTC)
+        start = datetime.datetime.combine(day, datetime.time(), tzinfo=zone)
+        end = datetime.datetime.combine(
+            day + datetime.timedelta(days=1), datetime.time(), tzinfo=zone
+        )
+        masks[user_id] = masks.get(user_id, 0) | horizon.range_mask(start, end)
+    return masks
+
+
+def availability_masks(user_ids: Iterable[Any], horizon: Horizon) -> Dict[Any, int]:
+    """Return each user's free slots over the horizon, minus exclusions."""
+    ids = list(user_ids)
+    bitmaps = weekly_bitmaps(ids)
+    excluded = exclusion_masks(ids, horizon)
+    return {
+        pk: horizon.tile(bitmaps.get(pk, 0)) & ~excluded.get(pk, 0) & horizon.mask
+        for pk in ids
+    }
+
+
+def common_availability(
+    user_ids: Iterable[Any],
+    start: datetime.datetime,
+    end: datetime.datetime,
+    min_duration: datetime.timedelta = SLOT,
+) -> List[Interval]:
+    """
+    Return the intervals in [start, end) when all the given users are free.
+
+    Only runs of at least `min_duration` are returned. Every user's weekly
+    availability is intersected, then each user's exclusion dates (midnight
+    to midnight in their own time zone) are removed.
+    """
+    horizon = Horizon(start, end)
+    masks = availability_masks(user_ids, horizon)
+    common = horizon.mask if masks else 0
+    for mask in masks.values():
+        common &= mask
+    return horizon.intervals(common, math.ceil(min_duration / SLOT))
+
+
+def availability_version(user_id: Any) -> int:
+    """Return the version of a user's availability, building it if needed."""
+    version = (
+        WeeklyAvailability.objects.filter(pk=user_id)
+        .values_list("version", flat=True)
+        .first()
+    )
+    if version is None:
+        refresh_weekly_availability([user_id])
+        version = WeeklyAvailability.objects.get(pk=user_id).version
+    return version
+
+
+def is_saving(user_id: Any) -> bool:
+    """Return whether `save_availability` rebuilds this user's bitmap itself."""
+    return user_id in getattr(_saving, "users", ())
+
+
+def save_availability(
+    user_id: Any, ranges: Iterable[Range], version: Optional[int] = None
+) -> Tuple[int, int, int]:
+    """
+    Replace a user's ranges by applying only the difference.
+
+    Ranges that are already stored are left alone; only removed ranges are
+    deleted and only new ones inserted, all in one transaction. The user's
+    availability row is locked for the update, so when `version` is given
+    and someone else saved in the meantime `AvailabilityConflict` is raised
+    instead of overwriting their changes. Returns the new version and the
+    number of ranges created and deleted.
+    """
+    availability_version(user_id)
+    with transaction.atomic():
+        current = (
+            WeeklyAvailability.objects.select_for_update()
+            .values_list("version", flat=True)
+            .get(pk=user_id)
+        )
+        if version is not None and version != current:
+            raise AvailabilityConflict(current)
+
+        wanted = set(ranges)
+        stale = []
+        for pk, *row in Available.objects.filter(user_id=user_id).values_list(
+            "pk", "day_of_week", "time_start", "time_end"
+        ):
+            key = tuple(row)
+            if key in wanted:
+                wanted.discard(key)  # type: ignore[arg-type]
+            else:
+                stale.append(pk)
+        if stale:
+            # The post_delete receiver skips users being saved here: it would
+            # rebuild the bitmap once per range after commit, bumping the
+            # version past the one returned below.
+            users = _saving.__dict__.setdefault("users", set())
+            users.add(user_id)
+            try:
+                Available.objects.filter(pk__in=stale).delete()
+            finally:
+                users.discard(user_id)
+        Available.objects.bulk_create(
+            Available(user_id=user_id, day_of_week=day, time_start=start, time_end=end)
+            for day, start, end in sorted(wanted)
+        )
+        refresh_weekly_availability([user_id])
+    return availability_version(user_id), len(wanted), len(stale)
@@ -0,0 +1,32 @@
+"""Composite indexes for the interview request list.
+
+InterviewRequest is defined in the shared model package, so the indexes
+backing the list's filters and keyset orderings are created here from
+`post_migrate` instead of through the model's Meta.
+"""
+
+from typing import Any, Tuple
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .models import InterviewRequest
+
+# (index suffix, columns)
+INTERVIEW_REQUEST_INDEXES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("candidate_id", ("candidate_id", "id")),
+    ("job_id", ("job_id", "id")),
+    ("status_id", ("candidate_accepted", "employer_accepted", "id")),
+)
+
+
+def install_indexes(using: str = DEFAULT_DB_ALIAS, **kwargs: Any) -> None:
+    """Create the interview request indexes; connected to `post_migrate`."""
+    connection = connections[using]
+    table = InterviewRequest._meta.db_table
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for suffix, columns in INTERVIEW_REQUEST_INDEXES:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {quote(f'{table}_{suffix}_idx')} "
+                f"ON {quote(table)} ({', '.join(quote(c) for c in columns)})"
+            )
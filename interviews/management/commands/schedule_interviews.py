@@ -0,0 +1,63 @@
+"""Management command proposing interview times for accepted requests."""
+
+import datetime
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from interviews.scheduling import (
+    DEFAULT_DURATION,
+    DEFAULT_HORIZON,
+    schedule_interviews,
+)
+
+
+class Command(BaseCommand):
+    """Schedule every mutually accepted interview request."""
+
+    help = (
+        "Propose a time for every interview request accepted by both sides "
+        "and create its invitation."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=DEFAULT_HORIZON.days,
+            help="How many days ahead interviews may be placed.",
+        )
+        parser.add_argument(
+            "--duration",
+            type=int,
+            default=int(DEFAULT_DURATION.total_seconds() // 60),
+            help="Interview length in minutes.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the schedule without creating invitations.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        started = time.monotonic()
+        result = schedule_interviews(
+            horizon=datetime.timedelta(days=options["days"]),
+            duration=datetime.timedelta(minutes=options["duration"]),
+            dry_run=options["dry_run"],
+        )
+        elapsed = time.monotonic() - started
+        for assignment in result.assignments:
+            self.stdout.write(
+                f"Request {assignment.request.pk}: "
+                f"{assignment.start:%Y-%m-%d %H:%M} UTC"
+            )
+        for request in result.unscheduled:
+            self.stdout.write(f"Request {request.pk}: no common free time")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scheduled {len(result.assignments)} interviews, "
+                f"{len(result.unscheduled)} unscheduled, in {elapsed:.2f}s."
+            )
+        )
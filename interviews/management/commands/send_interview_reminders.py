@@ -0,0 +1,41 @@
+"""Management command sending due interview invitation reminders."""
+
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from interviews.reminders import CHUNK_SIZE, backfill_reminders, send_due_reminders
+
+
+class Command(BaseCommand):
+    """Send request and confirmation reminders for open invitations."""
+
+    help = "Email reminders for interview invitations that are still unanswered."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Invitations claimed and emailed per batch.",
+        )
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="First schedule reminders for open invitations that have none.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        started = time.monotonic()
+        if options["backfill"]:
+            scheduled = backfill_reminders(options["chunk_size"])
+            self.stdout.write(f"Scheduled reminders for {scheduled} invitations.")
+        result = send_due_reminders(options["chunk_size"])
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {result.sent} reminders ({result.failed} failed, "
+                f"{result.retired} retired) in {elapsed:.1f}s."
+            )
+        )
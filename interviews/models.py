@@ -1,5 +1,8 @@
 """Models for the interviews application."""
 
+from django.contrib.auth.models import User
+from django.db import models
+
 # Import models from centralized location
 from recruit_models.interviews import (
     Available,
@@ -9,10 +12,71 @@ from recruit_models.interviews import (
     generate_invitation,
 )
 
+
+class WeeklyAvailability(models.Model):
+    """
+    A user's weekly availability as a bitmap of 15-minute UTC slots.
+
+    Derived from the user's `Available` rows by `interviews.availability`;
+    `version` increases every time the bitmap is rebuilt.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="weekly_availability",
+    )
+    bitmap = models.BinaryField(max_length=84)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Weekly availability of user {self.pk}"
+
+
+class ProposedInterviewTime(models.Model):
+    """The time the scheduler proposed for a pending interview invitation."""
+
+    invitation = models.OneToOneField(
+        InterviewInvitation,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="proposed_time",
+    )
+    start = models.DateTimeField(db_index=True)
+    end = models.DateTimeField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Invitation {self.pk} proposed for {self.start:%Y-%m-%d %H:%M}"
+
+
+class InvitationReminder(models.Model):
+    """When the next reminder for an open interview invitation is due."""
+
+    invitation = models.OneToOneField(
+        InterviewInvitation,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="reminder",
+    )
+    # Cleared once no further reminder will be sent, so that finished
+    # invitations drop out of the index the sweeper scans.
+    due_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"Reminder for invitation {self.pk}"
+
+
 __all__ = [
     "InterviewInvitation",
     "InterviewRequest",
     "Available",
     "Exclusion",
+    "InvitationReminder",
+    "ProposedInterviewTime",
+    "WeeklyAvailability",
     "generate_invitation",
 ]
@@ -0,0 +1,284 @@
+"""Reminder emails for open interview invitations.
+
+Every invitation has an InvitationReminder row holding when its next
+reminder is due. The sweeper walks the due rows by the `due_at` index in
+fixed-size chunks, claims each chunk by stamping a lease on it, sends the
+chunk's emails over one backend connection and then records the sent ones
+with one UPDATE of the invitation counters and one of the reminder rows;
+reminders the backend did not send stay due for the next sweep.
+Memory stays flat however many invitations are due, and concurrent sweepers
+skip each other's claimed rows.
+"""
+
+import datetime
+import itertools
+import logging
+from typing import Any, Iterable, Iterator, List, NamedTuple
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Case, F, Q, QuerySet, Value, When
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from sendgrid.outbox import send_all
+
+from .models import InterviewInvitation, InvitationReminder
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+LEASE = datetime.timedelta(minutes=10)
+REMINDER_INTERVAL = datetime.timedelta(
+    hours=getattr(settings, "INTERVIEW_REMINDER_INTERVAL_HOURS", 48)
+)
+MAX_REMINDERS = getattr(settings, "INTERVIEW_MAX_REMINDERS", 3)
+
+# InterviewInvitation.status values that still need an answer.
+REQUEST_OPEN = 0
+PENDING_CONFIRMATION = 1
+
+REMINDER_KINDS = {
+    REQUEST_OPEN: ("request_reminder", "Reminder: interview request for {job}"),
+    PENDING_CONFIRMATION: (
+        "confirmation_reminder",
+        "Reminder: please confirm your interview for {job}",
+    ),
+}
+
+
+class SweepResult(NamedTuple):
+    """Outcome of a reminder sweep."""
+
+    sent: int
+    failed: int
+    retired: int
+
+
+class ChunkResult(NamedTuple):
+    """Invitations of a claimed chunk by how their reminder went."""
+
+    sent: List[Any]
+    failed: List[Any]
+    unreachable: List[Any]
+
+
+def open_invitations() -> Q:
+    """Return the condition for invitations that still get reminders."""
+    return Q(
+        invitation__is_active=True,
+        invitation__confirmed_time__isnull=True,
+    ) & (
+        Q(
+            invitation__status=REQUEST_OPEN,
+            invitation__request_reminders_sent__lt=MAX_REMINDERS,
+        )
+        | Q(
+            invitation__status=PENDING_CONFIRMATION,
+            invitation__confirmation_reminders_sent__lt=MAX_REMINDERS,
+        )
+    )
+
+
+def unclaimed(now: datetime.datetime) -> Q:
+    """Return the condition for rows no sweeper is working on."""
+    return Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+
+
+def schedule_reminders(invitation_ids: Iterable[Any]) -> None:
+    """Schedule the first reminder of new invitations."""
+    due_at = timezone.now() + REMINDER_INTERVAL
+    InvitationReminder.objects.bulk_create(
+        [
+            InvitationReminder(invitation_id=pk, due_at=due_at)
+            for pk in invitation_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def backfill_reminders(chunk_size: int = CHUNK_SIZE) -> int:
+    """Schedule reminders for open invitations created without one."""
+    missing = (
+        InterviewInvitation.objects.filter(
+            is_active=True,
+            confirmed_time__isnull=True,
+            status__in=REMINDER_KINDS,
+            reminder__isnull=True,
+        )
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+    scheduled = 0
+    for chunk in chunked(missing, chunk_size):
+        schedule_reminders(chunk)
+        scheduled += len(chunk)
+    return scheduled
+
+
+def chunked(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield lists of at most `size` items."""
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def due_reminders(now: datetime.datetime) -> "QuerySet[InvitationReminder]":
+    """Return the unclaimed reminders due at `now`."""
+    return InvitationReminder.objects.filter(unclaimed(now), due_at__lte=now)
+
+
+def claim(ids: List[Any], now: datetime.datetime) -> List[Any]:
+    """
+    Claim the given reminders for this sweeper and return those it got.
+
+    Rows locked by another sweeper are skipped rather than waited for. The
+    lease is written with a conditional UPDATE and read back, so two
+    sweepers can never both claim a row even on databases without row locks.
+    """
+    lease = now + LEASE
+    with transaction.atomic():
+        locked = list(
+            due_reminders(now)
+            .filter(pk__in=ids)
+            .select_for_update(skip_locked=True)
+            .values_list("pk", flat=True)
+        )
+        due_reminders(now).filter(pk__in=locked).update(claimed_until=lease)
+    return list(
+        InvitationReminder.objects.filter(
+            pk__in=locked, claimed_until=lease
+        ).values_list("pk", flat=True)
+    )
+
+
+def build_message(invitation: Any) -> EmailMultiAlternatives:
+    """Render the reminder email for an invitation."""
+    template, subject = REMINDER_KINDS[invitation.status]
+    context = {
+        "invitation": invitation,
+        "candidate": invitation.candidate,
+        "job": invitation.job,
+        "proposed_time": getattr(invitation, "proposed_time", None),
+    }
+    message = EmailMultiAlternatives(
+        subject=subject.format(job=invitation.job.title),
+        body=render_to_string(f"interviews/emails/{template}.txt", context),
+        to=[invitation.candidate.user.email],
+    )
+    message.attach_alternative(
+        render_to_string(f"interviews/emails/{template}.html", context), "text/html"
+    )
+    return message
+
+
+def send_chunk(ids: List[Any], connection: Any) -> ChunkResult:
+    """Send the reminders of one claimed chunk that are still open."""
+    invitations = list(
+        InterviewInvitation.objects.filter(
+            pk__in=ids,
+            is_active=True,
+            confirmed_time__isnull=True,
+            status__in=REMINDER_KINDS,
+        )
+        .order_by("pk")
+        .select_related("candidate__user", "job", "proposed_time")
+        .only(
+            "pk",
+            "status",
+            "candidate__user__email",
+            "candidate__user__first_name",
+            "candidate__user__last_name",
+            "job__title",
+            "proposed_time__start",
+            "proposed_time__end",
+        )
+    )
+    reachable = [
+        invitation for invitation in invitations if invitation.candidate.user.email
+    ]
+    results = send_all(
+        connection, [build_message(invitation) for invitation in reachable]
+    )
+    return ChunkResult(
+        [invitation.pk for invitation, r in zip(reachable, results) if r.sent],
+        [invitation.pk for invitation, r in zip(reachable, results) if not r.sent],
+        [
+            invitation.pk
+            for invitation in invitations
+            if not invitation.candidate.user.email
+        ],
+    )
+
+
+def record_sent(ids: List[Any], now: datetime.datetime) -> None:
+    """Bump the counters and schedule the next reminder of sent invitations."""
+    InterviewInvitation.objects.filter(pk__in=ids).update(
+        request_reminders_sent=F("request_reminders_sent")
+        + Case(When(status=REQUEST_OPEN, then=Value(1)), default=Value(0)),
+        confirmation_reminders_sent=F("confirmation_reminders_sent")
+        + Case(When(status=PENDING_CONFIRMATION, then=Value(1)), default=Value(0)),
+    )
+    postpone(ids, now)
+
+
+def postpone(ids: List[Any], now: datetime.datetime) -> None:
+    """Schedule the next reminder of invitations and release their claim."""
+    InvitationReminder.objects.filter(pk__in=ids).update(
+        due_at=now + REMINDER_INTERVAL, claimed_until=None
+    )
+
+
+def retire_finished(now: datetime.datetime) -> int:
+    """Stop scheduling reminders for invitations that no longer need them."""
+    return (
+        due_reminders(now)
+        .exclude(open_invitations())
+        .update(due_at=None, claimed_until=None)
+    )
+
+
+def send_due_reminders(chunk_size: int = CHUNK_SIZE) -> SweepResult:
+    """Send every reminder that is due, one claimed chunk at a time."""
+    now = timezone.now()
+    retired = retire_finished(now)
+    due_ids = (
+        due_reminders(now)
+        .order_by("due_at")
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+    sent = failed = 0
+    connection = get_connection()
+    with connection:
+        for chunk in chunked(due_ids, chunk_size):
+            # The lease starts now: sending earlier chunks may have taken
+            # longer than LEASE.
+            claimed = claim(chunk, timezone.now())
+            if not claimed:
+                continue
+            try:
+                result = send_chunk(claimed, connection)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed to send %d interview reminders", len(claimed))
+                InvitationReminder.objects.filter(pk__in=claimed).update(
+                    claimed_until=None
+                )
+                failed += len(claimed)
+                continue
+            sent_at = timezone.now()
+            record_sent(result.sent, sent_at)
+            # Candidates without an email address are tried again later.
+            postpone(result.unreachable, sent_at)
+            # Reminders the backend did not send stay due for the next sweep.
+            InvitationReminder.objects.filter(pk__in=result.failed).update(
+                claimed_until=None
+            )
+            # Invitations answered since they were found need no more reminders.
+            InvitationReminder.objects.filter(pk__in=claimed).exclude(
+                pk__in=result.sent + result.failed + result.unreachable
+            ).update(due_at=None, claimed_until=None)
+            sent += len(result.sent)
+            failed += len(result.failed)
+    return SweepResult(sent, failed, retired)
@@ -0,0 +1,243 @@
+"""Batch scheduling of interviews for mutually accepted requests.
+
+Every ready request needs one slot in which its candidate, the job's
+employer and the job's recruiter are all free. The scheduler works on the
+availability masks of `interviews.availability`: a request's feasible start
+slots are the AND of its participants' free slots, minus the times they
+are already booked, shifted so that the whole interview fits. Requests are
+assigned greedily, most constrained (fewest feasible starts) first, each to
+its earliest feasible start, and every assignment marks its participants
+busy for the rest of the run.
+"""
+
+import datetime
+import logging
+import math
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from dashboards.counters import record_created
+
+from .availability import SLOT, Horizon, availability_masks
+from .models import InterviewInvitation, InterviewRequest, ProposedInterviewTime
+from .reminders import schedule_reminders
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DURATION = datetime.timedelta(
+    minutes=getattr(settings, "INTERVIEW_DURATION_MINUTES", 60)
+)
+DEFAULT_NOTICE = datetime.timedelta(hours=24)
+DEFAULT_HORIZON = datetime.timedelta(days=14)
+
+# InterviewInvitation.status for an interview awaiting confirmation.
+PENDING_CONFIRMATION = 1
+
+
+class ReadyRequest(NamedTuple):
+    """A mutually accepted request and the users who must attend."""
+
+    pk: int
+    candidate_id: int
+    job_id: int
+    user_ids: Set[int]
+
+
+class Assignment(NamedTuple):
+    """A proposed interview time for a request."""
+
+    request: ReadyRequest
+    start: datetime.datetime
+    end: datetime.datetime
+
+
+class ScheduleResult(NamedTuple):
+    """Outcome of a scheduling run."""
+
+    assignments: List[Assignment]
+    unscheduled: List[ReadyRequest]
+
+
+def ready_requests() -> List[ReadyRequest]:
+    """
+    Claim the accepted requests that have no active invitation yet.
+
+    Call this inside the transaction that creates the invitations. The
+    requests are locked with SKIP LOCKED, so a concurrent run leaves the
+    ones this run is scheduling alone. They are then read again, so
+    requests invited by a run that committed before the locks were taken
+    drop out. SQLite has no row locks; run one scheduler at a time there.
+    """
+    invited = InterviewInvitation.objects.filter(
+        candidate=OuterRef("candidate"), job=OuterRef("job"), is_active=True
+    )
+    ready = InterviewRequest.objects.filter(
+        candidate_accepted=True, employer_accepted=True
+    ).exclude(Exists(invited))
+    locked = list(
+        ready.select_for_update(skip_locked=True).values_list("pk", flat=True)
+    )
+    rows = (
+        ready.filter(pk__in=locked)
+        .order_by("pk")
+        .values_list(
+            "pk",
+            "candidate_id",
+            "job_id",
+            "candidate__user_id",
+            "job__employer__user_id",
+            "job__recruiter__user_id",
+        )
+    )
+    return [
+        ReadyRequest(pk, candidate_id, job_id, {u for u in users if u is not None})
+        for pk, candidate_id, job_id, *users in rows
+    ]
+
+
+def booked_masks(user_ids: Set[int], horizon: Horizon) -> Dict[int, int]:
+    """Return the horizon slots in which users already have interviews."""
+    masks: Dict[int, int] = {}
+
+    def book(users: Any, start: datetime.datetime, end: datetime.datetime) -> None:
+        bits = horizon.range_mask(start, end)
+        for user_id in users:
+            if user_id in user_ids:
+                masks[user_id] = masks.get(user_id, 0) | bits
+
+    fields = ("candidate__user_id", "job__employer__user_id", "job__recruiter__user_id")
+    confirmed = InterviewInvitation.objects.filter(
+        is_active=True,
+        confirmed_time__gte=horizon.start - DEFAULT_DURATION,
+        confirmed_time__lt=horizon.end,
+    ).values_list("confirmed_time", *fields)
+    for confirmed_time, *users in confirmed:
+        book(users, confirmed_time, confirmed_time + DEFAULT_DURATION)
+
+    proposed = ProposedInterviewTime.objects.filter(
+        invitation__is_active=True,
+        invitation__confirmed_time__isnull=True,
+        end__gt=horizon.start,
+        start__lt=horizon.end,
+    ).values_list("start", "end", *(f"invitation__{field}" for field in fields))
+    for start, end, *users in proposed:
+        book(users, start, end)
+    return masks
+
+
+def fitting_starts(mask: int, length: int) -> int:
+    """Return the slots where `length` consecutive free slots begin."""
+    starts, width = mask, 1
+    while width < length:
+        step = min(width, length - width)
+        starts &= starts >> step
+        width += step
+    return starts
+
+
+def assign(
+    requests: List[ReadyRequest],
+    free: Dict[int, int],
+    horizon: Horizon,
+    length: int,
+) -> ScheduleResult:
+    """Greedily give each request the earliest start its attendees share."""
+    candidates: Dict[int, int] = {}
+    for request in requests:
+        mask = horizon.mask if request.user_ids else 0
+        for user_id in request.user_ids:
+            mask &= free.get(user_id, 0)
+        candidates[request.pk] = fitting_starts(mask, length)
+
+    assignments = []
+    unscheduled = []
+    block = (1 << length) - 1
+    for request in sorted(
+        requests, key=lambda r: (bin(candidates[r.pk]).count("1"), r.pk)
+    ):
+        starts = candidates[request.pk]
+        for user_id in request.user_ids:
+            starts &= fitting_starts(free[user_id], length)
+        if not starts:
+            unscheduled.append(request)
+            continue
+        slot = (starts & -starts).bit_length() - 1
+        for user_id in request.user_ids:
+            free[user_id] &= ~(block << slot)
+        assignments.append(
+            Assignment(
+                request, horizon.to_datetime(slot), horizon.to_datetime(slot + length)
+            )
+        )
+    return ScheduleResult(assignments, unscheduled)
+
+
+def schedule_requests(
+    requests: List[ReadyRequest],
+    start: datetime.datetime,
+    end: datetime.datetime,
+    duration: datetime.timedelta = DEFAULT_DURATION,
+) -> ScheduleResult:
+    """Assign a start time within [start, end) to as many requests as possible."""
+    horizon = Horizon(start, end)
+    user_ids = set().union(*(request.user_ids for request in requests))
+    free = availability_masks(user_ids, horizon)
+    for user_id, booked in booked_masks(user_ids, horizon).items():
+        free[user_id] &= ~booked
+    return assign(requests, free, horizon, math.ceil(duration / SLOT))
+
+
+def create_invitations(assignments: List[Assignment]) -> List[InterviewInvitation]:
+    """Create pending invitations with their proposed times in bulk."""
+    invitations = InterviewInvitation.objects.bulk_create(
+        [
+            InterviewInvitation(
+                candidate_id=assignment.request.candidate_id,
+                job_id=assignment.request.job_id,
+                status=PENDING_CONFIRMATION,
+            )
+            for assignment in assignments
+        ]
+    )
+    ProposedInterviewTime.objects.bulk_create(
+        [
+            ProposedInterviewTime(
+                invitation=invitation, start=assignment.start, end=assignment.end
+            )
+            for invitation, assignment in zip(invitations, assignments)
+        ]
+    )
+    schedule_reminders(invitation.pk for invitation in invitations)
+    record_created(invitations)
+    return invitations
+
+
+def schedule_interviews(
+    start: Optional[datetime.datetime] = None,
+    horizon: datetime.timedelta = DEFAULT_HORIZON,
+    duration: datetime.timedelta = DEFAULT_DURATION,
+    dry_run: bool = False,
+) -> ScheduleResult:
+    """
+    Schedule every ready request and create its invitation.
+
+    Interviews are placed between `start` (default: 24 hours from now) and
+    `start + horizon`. With `dry_run` nothing is written.
+    """
+    if start is None:
+        start = timezone.now() + DEFAULT_NOTICE
+    with transaction.atomic():
+        requests = ready_requests()
+        result = schedule_requests(requests, start, start + horizon, duration)
+        if result.assignments and not dry_run:
+            create_invitations(result.assignments)
+    logger.info(
+        "Scheduled %d of %d ready interview requests",
+        len(result.assignments),
+        len(requests),
+    )
+    return result
@@ -0,0 +1,30 @@
+"""Signal handlers for availability bitmaps and invitation reminders."""
+
+from typing import Any
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .availability import is_saving, refresh_weekly_availability
+from .models import Available, InterviewInvitation
+from .reminders import schedule_reminders
+
+
+@receiver(post_save, sender=Available)
+@receiver(post_delete, sender=Available)
+def refresh_user_availability(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Rebuild a user's bitmap once the changed range is committed."""
+    user_id = instance.user_id
+    if kwargs.get("raw") or is_saving(user_id):
+        return
+    transaction.on_commit(lambda: refresh_weekly_availability([user_id]))
+
+
+@receiver(post_save, sender=InterviewInvitation)
+def schedule_first_reminder(
+    sender: Any, instance: Any, created: bool, **kwargs: Any
+) -> None:
+    """Schedule the first reminder of a new invitation."""
+    if created and not kwargs.get("raw"):
+        schedule_reminders([instance.pk])
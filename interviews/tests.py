@@ -1,3 +1,373 @@
-from django.test import TestCase
+"""Tests for the interviews application."""
 
-# Create your tests here.
+import datetime
+import json
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from candidates.models import Candidate
+from jobs.models import Job
+from recruiters.models import Recruiter
+
+from .availability import (
+    SLOTS_PER_DAY,
+    AvailabilityConflict,
+    Horizon,
+    availability_version,
+    common_availability,
+    range_to_bits,
+    save_availability,
+    week_range_mask,
+)
+from .models import (
+    Available,
+    Exclusion,
+    InterviewInvitation,
+    InterviewRequest,
+    InvitationReminder,
+    WeeklyAvailability,
+)
+from .reminders import send_due_reminders
+from .scheduling import schedule_interviews
+
+UTC = datetime.timezone.utc
+
+
+def utc(*args: int) -> datetime.datetime:
+    """Return an aware UTC datetime."""
+    return datetime.datetime(*args, tzinfo=UTC)
+
+
+class AvailabilityBitmapTest(SimpleTestCase):
+    """Test cases for weekly availability bitmaps."""
+
+    def test_iso_range(self) -> None:
+        """Test that stored UTC timestamps map onto weekly slots."""
+        # 2024-01-02 is a Tuesday.
+        bits = range_to_bits(2, "2024-01-02T09:00:00Z", "2024-01-02T10:00:00Z", UTC)
+        self.assertEqual(bits, 0b1111 << (SLOTS_PER_DAY + 36))
+
+    def test_clock_range_uses_time_zone(self) -> None:
+        """Test that wall-clock times are converted from the user's zone."""
+        zone = datetime.timezone(datetime.timedelta(hours=9))
+        bits = range_to_bits(1, "09:00", "10:00", zone)
+        self.assertEqual(bits, 0b1111)
+
+    def test_range_wraps_around_the_week(self) -> None:
+        """Test that a range past Sunday midnight wraps to Monday."""
+        bits = week_range_mask(utc(2024, 1, 7, 23, 30), utc(2024, 1, 8, 0, 30))
+        self.assertEqual(bits, 0b11 | 0b11 << (7 * SLOTS_PER_DAY - 2))
+
+    def test_horizon_intervals(self) -> None:
+        """Test tiling a weekly bitmap and reading back the intervals."""
+        horizon = Horizon(utc(2024, 1, 1), utc(2024, 1, 15))
+        week = week_range_mask(utc(2024, 1, 1, 9), utc(2024, 1, 1, 10))
+        self.assertEqual(
+            horizon.intervals(horizon.tile(week)),
+            [
+                (utc(2024, 1, 1, 9), utc(2024, 1, 1, 10)),
+                (utc(2024, 1, 8, 9), utc(2024, 1, 8, 10)),
+            ],
+        )
+
+
+class CommonAvailabilityTest(TestCase):
+    """Test cases for intersecting several users' availability."""
+
+    def setUp(self) -> None:
+        """Create two users with overlapping Monday availability."""
+        self.first, self.second = baker.make(User, _quantity=2)
+        for user, start, end in (
+            (self.first, "2024-01-01T09:00:00Z", "2024-01-01T12:00:00Z"),
+            (self.second, "2024-01-01T11:00:00Z", "2024-01-01T15:00:00Z"),
+        ):
+            Available.objects.create(
+                user=user, day_of_week=1, time_start=start, time_end=end
+            )
+
+    def test_overlap_minus_exclusions(self) -> None:
+        """Test the overlap over two weeks with one excluded Monday."""
+        Exclusion.objects.create(user=self.second, date=datetime.date(2024, 1, 8))
+        users = [self.first.pk, self.second.pk]
+        self.assertEqual(
+            common_availability(users, utc(2024, 1, 1), utc(2024, 1, 15)),
+            [(utc(2024, 1, 1, 11), utc(2024, 1, 1, 12))],
+        )
+        self.assertEqual(WeeklyAvailability.objects.count(), 2)
+
+    def test_bitmap_follows_saved_ranges(self) -> None:
+        """Test that saving a range rebuilds the stored bitmap."""
+        users = [self.first.pk, self.second.pk]
+        common_availability(users, utc(2024, 1, 1), utc(2024, 1, 2))
+        with self.captureOnCommitCallbacks(execute=True):
+            Available.objects.create(
+                user=self.first,
+                day_of_week=1,
+                time_start="2024-01-01T13:00:00Z",
+                time_end="2024-01-01T14:00:00Z",
+            )
+        self.assertEqual(
+            common_availability(users, utc(2024, 1, 1), utc(2024, 1, 2)),
+            [
+                (utc(2024, 1, 1, 11), utc(2024, 1, 1, 12)),
+                (utc(2024, 1, 1, 13), utc(2024, 1, 1, 14)),
+            ],
+        )
+
+
+def make_available(user: User, start: str, end: str) -> None:
+    """Give a user one Monday availability range on 2024-01-01 (UTC)."""
+    Available.objects.create(
+        user=user,
+        day_of_week=1,
+        time_start=f"2024-01-01T{start}:00Z",
+        time_end=f"2024-01-01T{end}:00Z",
+    )
+
+
+class SchedulerTest(TestCase):
+    """Test cases for the batch interview scheduler."""
+
+    def setUp(self) -> None:
+        """Create two accepted requests competing for one candidate."""
+        self.candidate = baker.make(Candidate)
+        recruiter = baker.make(Recruiter)
+        self.flexible = baker.make(Job, recruiter=recruiter)
+        self.strict = baker.make(Job, recruiter=recruiter)
+        make_available(self.candidate.user, "09:00", "11:00")
+        make_available(recruiter.user, "08:00", "12:00")
+        make_available(self.flexible.employer.user, "09:00", "11:00")
+        make_available(self.strict.employer.user, "09:00", "10:00")
+        for job in (self.flexible, self.strict):
+            baker.make(
+                InterviewRequest,
+                candidate=self.candidate,
+                job=job,
+                candidate_accepted=True,
+                employer_accepted=True,
+            )
+
+    def schedule(self) -> None:
+        """Schedule interviews on Monday 2024-01-01."""
+        schedule_interviews(start=utc(2024, 1, 1), horizon=datetime.timedelta(days=1))
+
+    def test_most_constrained_first(self) -> None:
+        """Test that the request with fewer options is placed first."""
+        self.schedule()
+        proposed = {
+            invitation.job_id: invitation.proposed_time.start
+            for invitation in InterviewInvitation.objects.all()
+        }
+        self.assertEqual(
+            proposed,
+            {self.strict.pk: utc(2024, 1, 1, 9), self.flexible.pk: utc(2024, 1, 1, 10)},
+        )
+        self.assertEqual(InterviewInvitation.objects.filter(status=1).count(), 2)
+
+    def test_confirmed_interviews_block_slots(self) -> None:
+        """Test that existing confirmed interviews are respected."""
+        baker.make(
+            InterviewInvitation,
+            candidate=self.candidate,
+            job=baker.make(Job),
+            confirmed_time=utc(2024, 1, 1, 9),
+        )
+        self.schedule()
+        self.assertEqual(InterviewInvitation.objects.count(), 2)
+        invitation = InterviewInvitation.objects.get(job=self.flexible)
+        self.assertEqual(invitation.proposed_time.start, utc(2024, 1, 1, 10))
+
+    def test_rerun_is_idempotent(self) -> None:
+        """Test that already invited requests are not scheduled again."""
+        self.schedule()
+        self.schedule()
+        self.assertEqual(InterviewInvitation.objects.count(), 2)
+
+
+class AvailabilityUpdateTest(TestCase):
+    """Test cases for diff-based availability updates."""
+
+    def setUp(self) -> None:
+        """Create a user with two ranges."""
+        self.user = baker.make(User)
+        self.monday = (1, "2024-01-01T09:00:00Z", "2024-01-01T12:00:00Z")
+        self.tuesday = (2, "2024-01-02T09:00:00Z", "2024-01-02T12:00:00Z")
+        save_availability(self.user.pk, [self.monday, self.tuesday])
+
+    def test_only_changes_are_written(self) -> None:
+        """Test that unchanged ranges keep their rows."""
+        kept = Available.objects.get(user=self.user, day_of_week=1).pk
+        wednesday = (3, "2024-01-03T09:00:00Z", "2024-01-03T12:00:00Z")
+        _, created, deleted = save_availability(
+            self.user.pk, [self.monday, wednesday]
+        )
+        self.assertEqual((created, deleted), (1, 1))
+        self.assertTrue(Available.objects.filter(pk=kept).exists())
+
+    def test_stale_version_conflicts(self) -> None:
+        """Test that saving over a newer version raises a conflict."""
+        version = availability_version(self.user.pk)
+        save_availability(self.user.pk, [self.monday], version)
+        with self.assertRaises(AvailabilityConflict):
+            save_availability(self.user.pk, [self.tuesday], version)
+        self.assertEqual(Available.objects.filter(user=self.user).count(), 1)
+
+    def test_view_returns_409_on_conflict(self) -> None:
+        """Test that the endpoint reports conflicts and new versions."""
+        url = reverse("availability", args=[self.user.pk])
+        version = self.client.get(url).json()["version"]
+        data = {
+            "availability": json.dumps(
+                [{"day": 1, "start": self.monday[1], "end": self.monday[2]}]
+            ),
+            "timezone": json.dumps(""),
+            "version": version,
+        }
+        response = self.client.post(url, data)
+        self.assertEqual(response.json()["version"], version + 1)
+        self.assertEqual(self.client.post(url, data).status_code, 409)
+
+    def test_returned_version_survives_commit(self) -> None:
+        """Test that the version returned is still current once committed."""
+        url = reverse("availability", args=[self.user.pk])
+        version = self.client.get(url).json()["version"]
+        data = {
+            "availability": json.dumps(
+                [{"day": 1, "start": self.monday[1], "end": self.monday[2]}]
+            ),
+            "timezone": json.dumps(""),
+            "version": version,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, data)
+        data["version"] = response.json()["version"]
+        self.assertEqual(availability_version(self.user.pk), data["version"])
+        self.assertEqual(self.client.post(url, data).status_code, 200)
+
+    def test_invalid_version_is_rejected(self) -> None:
+        """Test that a non-numeric version is a bad request."""
+        url = reverse("availability", args=[self.user.pk])
+        response = self.client.post(url, {"version": "latest"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ReminderSweepTest(TestCase):
+    """Test cases for the interview reminder sweeper."""
+
+    def setUp(self) -> None:
+        """Create three open invitations whose reminders are due."""
+        self.invitations = [
+            baker.make(
+                InterviewInvitation,
+                candidate__user__email=f"candidate{index}@example.com",
+                status=index % 2,
+                confirmed_time=None,
+                is_active=True,
+            )
+            for index in range(3)
+        ]
+        InvitationReminder.objects.update(due_at=timezone.now())
+
+    def test_sends_and_counts_reminders(self) -> None:
+        """Test that due reminders are sent once and counted."""
+        result = send_due_reminders(chunk_size=2)
+        self.assertEqual(result.sent, 3)
+        self.assertEqual(len(mail.outbox), 3)
+        counts = InterviewInvitation.objects.order_by("pk").values_list(
+            "request_reminders_sent", "confirmation_reminders_sent"
+        )
+        self.assertEqual(list(counts), [(1, 0), (0, 1), (1, 0)])
+        self.assertEqual(send_due_reminders().sent, 0)
+
+    def test_claimed_and_answered_invitations_are_skipped(self) -> None:
+        """Test that other sweepers' claims and answered invitations are left."""
+        claimed, answered, _ = self.invitations
+        InvitationReminder.objects.filter(pk=claimed.pk).update(
+            claimed_until=timezone.now() + datetime.timedelta(minutes=5)
+        )
+        answered.confirmed_time = timezone.now()
+        answered.save()
+        result = send_due_reminders()
+        self.assertEqual((result.sent, result.retired), (1, 1))
+        self.assertIsNone(InvitationReminder.objects.get(pk=answered.pk).due_at)
+
+    def test_candidates_without_email_are_postponed(self) -> None:
+        """Test that invitations nobody can be emailed about are not counted."""
+        unreachable = self.invitations[0]
+        user = unreachable.candidate.user
+        user.email = ""
+        user.save()
+        result = send_due_reminders()
+        self.assertEqual(result.sent, 2)
+        unreachable.refresh_from_db()
+        self.assertEqual(unreachable.request_reminders_sent, 0)
+        reminder = InvitationReminder.objects.get(pk=unreachable.pk)
+        self.assertGreater(reminder.due_at, timezone.now())
+        self.assertIsNone(reminder.claimed_until)
+
+    def test_unsent_reminders_are_not_counted(self) -> None:
+        """Test that reminders the backend did not send stay due."""
+        connection = MagicMock()
+        connection.send_messages.side_effect = [1, 0, 1]
+        with patch("interviews.reminders.get_connection", return_value=connection):
+            result = send_due_reminders()
+        self.assertEqual((result.sent, result.failed), (2, 1))
+        unsent = self.invitations[1]
+        unsent.refresh_from_db()
+        self.assertEqual(unsent.confirmation_reminders_sent, 0)
+        reminder = InvitationReminder.objects.get(pk=unsent.pk)
+        self.assertLessEqual(reminder.due_at, timezone.now())
+        self.assertIsNone(reminder.claimed_until)
+
+    def test_each_chunk_gets_a_fresh_lease(self) -> None:
+        """Test that chunks claimed late in a sweep are leased from that time."""
+        start = timezone.now()
+        later = start + datetime.timedelta(hours=1)
+        with patch("interviews.reminders.timezone") as clock, patch(
+            "interviews.reminders.claim", return_value=[]
+        ) as claim:
+            clock.now.side_effect = [start, start, later]
+            send_due_reminders(chunk_size=2)
+        self.assertEqual([call.args[1] for call in claim.call_args_list], [start, later])
+
+
+class InterviewRequestListTest(TestCase):
+    """Test cases for the paginated interview request list."""
+
+    def setUp(self) -> None:
+        """Create a staff user and a few requests."""
+        self.staff = baker.make(User, is_staff=True)
+        self.requests = baker.make(
+            InterviewRequest,
+            candidate_accepted=None,
+            employer_accepted=None,
+            _quantity=5,
+        )
+        self.client.force_login(self.staff)
+
+    def test_pages_follow_the_cursor(self) -> None:
+        """Test that pages are sorted newest first and chained by cursor."""
+        response = self.client.get(reverse("interviews"), {"page_size": 3})
+        first = [ir.pk for ir in response.context["interview_requests"]]
+        cursor = response.context["page"].next_cursor
+        response = self.client.get(
+            reverse("interviews"), {"page_size": 3, "cursor": cursor}
+        )
+        second = [ir.pk for ir in response.context["interview_requests"]]
+        expected = sorted((ir.pk for ir in self.requests), reverse=True)
+        self.assertEqual(first + second, expected)
+
+    def test_status_filter(self) -> None:
+        """Test that the status filter narrows the list."""
+        accepted = self.requests[0]
+        accepted.candidate_accepted = accepted.employer_accepted = True
+        accepted.save()
+        response = self.client.get(reverse("interviews"), {"status": "accepted"})
+        listed = [ir.pk for ir in response.context["interview_requests"]]
+        self.assertEqual(listed, [accepted.pk])
@@ -1,15 +1,65 @@
 """Views for the interviews application."""
 
 import json
-from typing import Dict
+from typing import Any, Dict, List, Tuple
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Q
 from django.http import HttpRequest, HttpResponse, JsonResponse
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
 
-from interviews.models import Available, InterviewRequest
+from interviews.availability import (
+    AvailabilityConflict,
+    availability_version,
+    save_availability,
+)
+from interviews.models import InterviewRequest
+from recruit.pagination import clamp_page_size, paginate_keyset
+
+# Keyset orderings for the interview request list; each ends with a unique
+# column so the order is total.
+INTERVIEW_REQUEST_SORTS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "newest": ("Newest first", ("-id",)),
+    "oldest": ("Oldest first", ("id",)),
+    "job": ("Job title", ("job__title", "id")),
+}
+
+INTERVIEW_REQUEST_STATUSES: Dict[str, Tuple[str, Q]] = {
+    "open": (
+        "Awaiting both sides",
+        Q(candidate_accepted__isnull=True, employer_accepted__isnull=True),
+    ),
+    "awaiting_candidate": (
+        "Awaiting candidate",
+        Q(employer_accepted=True, candidate_accepted__isnull=True),
+    ),
+    "awaiting_employer": (
+        "Awaiting employer",
+        Q(candidate_accepted=True, employer_accepted__isnull=True),
+    ),
+    "accepted": ("Accepted", Q(candidate_accepted=True, employer_accepted=True)),
+    "declined": ("Declined", Q(candidate_accepted=False) | Q(employer_accepted=False)),
+}
+
+# The only columns the interview request list renders.
+INTERVIEW_REQUEST_COLUMNS = (
+    "id",
+    "candidate_accepted",
+    "employer_accepted",
+    "candidate__user__first_name",
+    "candidate__user__last_name",
+    "candidate__user__email",
+    "job__title",
+    "job__employer__name_english",
+)
+
+
+def choices(options: Dict[str, Tuple[str, Any]]) -> List[Tuple[str, str]]:
+    """Return (key, label) pairs for a dict of labelled options."""
+    return [(key, label) for key, (label, _) in options.items()]
 
 
 def available(request: HttpRequest, bu_id: str) -> HttpResponse:
@@ -21,7 +71,7 @@ def available(request: HttpRequest, bu_id: str) -> HttpResponse:
 
 def availability(request: HttpRequest, bu_id: str) -> JsonResponse:
     """Handle user availability GET/POST requests."""
-    user = User.objects.get(id=bu_id)
+    user = get_object_or_404(User, id=bu_id)
 
     if request.method == "GET":
         user_availability = user.available_set.all()
@@ -34,32 +84,49 @@ def availability(request: HttpRequest, bu_id: str) -> JsonResponse:
             }
             availability.append(temp)
         availability_json = json.dumps(availability)
-        return JsonResponse({"availability": availability_json})
+        return JsonResponse(
+            {
+                "availability": availability_json,
+                "version": availability_version(user.pk),
+            }
+        )
 
     if request.method == "POST":
-        old_availability = user.available_set.all()
         new_availability = json.loads(request.POST.get("availability", "[]"))
         timezone = json.loads(request.POST.get("timezone", '""'))
-        available_instances = []
-        for time_range in new_availability:
-            avail = Available(
-                day_of_week=int(time_range["day"]),
-                time_start=time_range["start"],
-                time_end=time_range["end"],
-                user=user,
+        version = request.POST.get("version")
+        try:
+            expected_version = int(version) if version else None
+        except ValueError:
+            return JsonResponse({"error": "Invalid version"}, status=400)
+        ranges = [
+            (int(time_range["day"]), time_range["start"], time_range["end"])
+            for time_range in new_availability
+        ]
+        message: Dict[str, Any] = {"message": "Availability updated"}
+
+        try:
+            with transaction.atomic():
+                # Safe access to userprofile
+                if hasattr(user, "userprofile") and user.userprofile:
+                    if timezone != user.userprofile.timezone:
+                        user.userprofile.timezone = timezone
+                        user.userprofile.save()
+                        message["message"] = "Timezone and " + message["message"]
+
+                message["version"], _, _ = save_availability(
+                    user.pk, ranges, expected_version
+                )
+        except AvailabilityConflict as conflict:
+            return JsonResponse(
+                {
+                    "error": "Availability was changed elsewhere. "
+                    "Reload the page to see the latest times.",
+                    "version": conflict.version,
+                },
+                status=409,
             )
-            available_instances.append(avail)
-        old_availability.delete()
-        Available.objects.bulk_create(available_instances)
-        message: Dict[str, str] = {"message": "Availability updated"}
-        
-        # Safe access to userprofile
-        if hasattr(user, 'userprofile') and user.userprofile:
-            if timezone != user.userprofile.timezone:
-                user.userprofile.timezone = timezone
-                user.userprofile.save()
-                message["message"] = "Timezone and " + message["message"]
-        
+
         return JsonResponse(message)
 
     return JsonResponse({"error": "Invalid request method"})
@@ -78,22 +145,50 @@ def interview_requests(request: HttpRequest) -> HttpResponse:
     if user_type == "Candidate" and hasattr(user, 'candidate'):
         interview_requests = InterviewRequest.objects.filter(
             candidate=user.candidate
-        ).all()
+        )
     elif user_type == "Recruiter" and hasattr(user, 'recruiter'):
         interview_requests = InterviewRequest.objects.filter(
             job__recruiter=user.recruiter
-        ).all()
+        )
     elif user_type == "Employer" and hasattr(user, 'employer'):
         interview_requests = InterviewRequest.objects.filter(
             job__employer=user.employer
-        ).all()
+        )
     elif hasattr(user, 'is_staff') and user.is_staff:
         interview_requests = InterviewRequest.objects.all()
     else:
         raise PermissionDenied
 
+    status = request.GET.get("status", "")
+    if status in INTERVIEW_REQUEST_STATUSES:
+        interview_requests = interview_requests.filter(
+            INTERVIEW_REQUEST_STATUSES[status][1]
+        )
+    sort = request.GET.get("sort", "")
+    if sort not in INTERVIEW_REQUEST_SORTS:
+        sort = "newest"
+
+    page = paginate_keyset(
+        interview_requests.select_related("candidate__user", "job__employer").only(
+            *INTERVIEW_REQUEST_COLUMNS
+        ),
+        INTERVIEW_REQUEST_SORTS[sort][1],
+        cursor=request.GET.get("cursor"),
+        page_size=clamp_page_size(request.GET.get("page_size")),
+    )
+    params = request.GET.copy()
+    params.pop("cursor", None)
+
     return render(
         request,
         "interviews/interviews.html",
-        {"interview_requests": interview_requests},
+        {
+            "interview_requests": page,
+            "page": page,
+            "status": status,
+            "sort": sort,
+            "statuses": choices(INTERVIEW_REQUEST_STATUSES),
+            "sorts": choices(INTERVIEW_REQUEST_SORTS),
+            "query_string": params.urlencode(),
+        },
     )
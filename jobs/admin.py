@@ -1,11 +1,11 @@
 """Django admin configuration for jobs app."""
 
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from django.contrib import admin
 
-from .models import Job, JobRequirements
+from .models import CandidateJobMatch, Job, JobRequirements
 
 if TYPE_CHECKING:
     from django.db.models import Model
@@ -19,10 +19,41 @@ class JobRequirementsInline(admin.StackedInline[JobRequirements]):
     verbose_name_plural = "Preferences"
 
 
+class CandidateJobMatchInline(admin.TabularInline[CandidateJobMatch]):
+    """Read-only inline listing a job's best matching candidates."""
+
+    model = CandidateJobMatch
+    fk_name = "job"
+    fields = ("candidate", "score", "job_rank")
+    readonly_fields = fields
+    ordering = ("job_rank",)
+    can_delete = False
+    extra = 0
+    max_num = 0
+    verbose_name_plural = "Best matching candidates"
+
+    def get_queryset(self, request: Any) -> Any:
+        """Only list the job's ranked matches."""
+        queryset = super().get_queryset(request)
+        return queryset.filter(job_rank__isnull=False).select_related(
+            "candidate__user"
+        )
+
+
 class JobAdmin(admin.ModelAdmin[Job]):
     """Admin interface for Job model."""
 
-    inlines = (JobRequirementsInline,)
+    inlines = (JobRequirementsInline, CandidateJobMatchInline)
+
+
+class CandidateJobMatchAdmin(admin.ModelAdmin[CandidateJobMatch]):
+    """Admin interface for CandidateJobMatch model."""
+
+    list_display = ("job", "candidate", "score", "job_rank", "candidate_rank")
+    list_select_related = ("job", "candidate__user")
+    raw_id_fields = ("job", "candidate")
+    ordering = ("job", "job_rank")
 
 
 admin.site.register(Job, JobAdmin)
+admin.site.register(CandidateJobMatch, CandidateJobMatchAdmin)
@@ -0,0 +1,86 @@
+"""Versioned cache for rendered job detail pages.
+
+Every job has a version token in the cache that changes whenever the job, its
+requirements or its employer is saved. Rendered detail fragments are stored
+under a key that includes the token, so bumping the version invalidates them
+without having to know which fragments exist. The token doubles as the
+page's ETag and the bump time as its Last-Modified date.
+
+Versions are only meaningful when every worker process sees the same cache.
+With a per-process cache such as the default LocMemCache, a bump reaches
+only the process that made it, so versions and fragments then expire after
+`JOB_DETAIL_LOCAL_TIMEOUT` seconds to bound how long other workers serve a
+stale page.
+"""
+
+import datetime
+import uuid
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+from .models import Job
+
+VERSION_KEY = "jobs:version:{}"
+DETAIL_KEY = "jobs:detail:{}:{}"
+DETAIL_TIMEOUT = 60 * 60 * 24
+DEFAULT_LOCAL_TIMEOUT = 60
+
+JobVersion = Tuple[str, datetime.datetime]
+
+
+def _new_version() -> JobVersion:
+    """Return a fresh version token stamped with the current second."""
+    return uuid.uuid4().hex[:16], timezone.now().replace(microsecond=0)
+
+
+def get_timeouts() -> Tuple[Optional[int], int]:
+    """Return how long versions and rendered fragments stay cached."""
+    # `cache` is a proxy; the backend itself is in `caches`.
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        timeout = int(
+            getattr(settings, "JOB_DETAIL_LOCAL_TIMEOUT", DEFAULT_LOCAL_TIMEOUT)
+        )
+        return timeout, timeout
+    return None, DETAIL_TIMEOUT
+
+
+def get_job_version(job_id: Any) -> Optional[JobVersion]:
+    """
+    Return a job's current version, creating one if none is cached.
+
+    Returns None for jobs that do not exist, without caching anything.
+    """
+    key = VERSION_KEY.format(job_id)
+    version: Optional[JobVersion] = cache.get(key)
+    if version is None:
+        if not Job.objects.filter(pk=job_id).exists():
+            return None
+        cache.add(key, _new_version(), get_timeouts()[0])
+        version = cache.get(key) or _new_version()
+    return version
+
+
+def bump_job_versions(job_ids: Iterable[Any]) -> None:
+    """Invalidate the cached pages of the given jobs."""
+    versions = {VERSION_KEY.format(job_id): _new_version() for job_id in job_ids}
+    if versions:
+        cache.set_many(versions, get_timeouts()[0])
+
+
+def forget_job_versions(job_ids: Iterable[Any]) -> None:
+    """Drop the versions of deleted jobs, orphaning their fragments."""
+    cache.delete_many([VERSION_KEY.format(job_id) for job_id in job_ids])
+
+
+def get_detail_fragment(job_id: Any, token: str) -> Optional[Dict[str, Any]]:
+    """Return the cached rendered detail fragment for a job version."""
+    return cache.get(DETAIL_KEY.format(job_id, token))
+
+
+def set_detail_fragment(job_id: Any, token: str, fragment: Dict[str, Any]) -> None:
+    """Cache the rendered detail fragment for a job version."""
+    cache.set(DETAIL_KEY.format(job_id, token), fragment, get_timeouts()[1])
@@ -0,0 +1,14 @@
+"""Forms for the jobs application."""
+
+from django import forms
+
+
+class JobSearchForm(forms.Form):
+    """Search and facet filters for the job board."""
+
+    q = forms.CharField(max_length=200, required=False, label="Search")
+    salary_min = forms.IntegerField(min_value=0, required=False)
+    salary_max = forms.IntegerField(min_value=0, required=False)
+    compensation_type = forms.CharField(max_length=100, required=False)
+    accommodation_included = forms.NullBooleanField(required=False)
+    insurance_included = forms.NullBooleanField(required=False)
@@ -0,0 +1,30 @@
+"""Management command scoring candidates against job requirements."""
+
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from jobs.matching import DEFAULT_TOP_K, rebuild_matches
+
+
+class Command(BaseCommand):
+    """Recompute and store the best candidate/job matches."""
+
+    help = "Score all active candidates against all active jobs and store the top-k."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--top-k",
+            type=int,
+            default=DEFAULT_TOP_K,
+            help="Matches to keep per job and per candidate.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        started = time.monotonic()
+        stored = rebuild_matches(top_k=options["top_k"])
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Stored {stored} matches in {elapsed:.1f}s.")
+        )
@@ -0,0 +1,17 @@
+"""Management command rebuilding the job board search index."""
+
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from jobs.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """Recreate the full-text index and every job's search document."""
+
+    help = "Rebuild the job search documents and full-text index."
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        indexed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} jobs."))
@@ -0,0 +1,379 @@
+"""Batch scoring of candidates against job and employer requirements.
+
+Candidates and jobs are loaded once into columnar NumPy arrays and every
+candidate x job pair is scored with vectorized comparisons, a block of jobs
+at a time to keep memory bounded. Only the top-k matches per job and per
+candidate are kept and written to CandidateJobMatch, so "best candidates for
+this job" becomes an indexed read instead of a loop over the whole table.
+"""
+
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.db.models import QuerySet
+from django_countries import countries
+
+from candidates.models import Candidate
+from recruit.choices import EDUCATION_CHOICES
+
+from .models import CandidateJobMatch, Job, JobRequirements
+
+DEFAULT_TOP_K = 50
+# Upper bound on candidate x job cells scored at once (float32 => ~16 MB).
+BLOCK_CELLS = 4_000_000
+WRITE_BATCH_SIZE = 1000
+# Fixed-point scale used to combine a score and a tie-breaking position.
+SCORE_SCALE = 1_000_000
+POSITION_LIMIT = 2**31
+
+# Relative weight of each requirement in the final score.
+WEIGHTS: Dict[str, float] = {
+    "gender": 1.0,
+    "age": 1.0,
+    "citizenship": 1.0,
+    "education": 1.0,
+}
+GENDER_CODES = {"male": 1, "female": 2}
+EDUCATION_RANKS = {
+    value: rank for rank, (value, _) in enumerate(EDUCATION_CHOICES) if value
+}
+
+
+def normalize_country(value: Optional[str]) -> str:
+    """Map a country code or name to its ISO alpha-2 code where possible."""
+    value = (value or "").strip()
+    if not value:
+        return ""
+    code = countries.alpha2(value) or countries.by_name(value)
+    return code or value.lower()
+
+
+class CandidateArrays:
+    """Columnar view of every active candidate's matchable attributes."""
+
+    def __init__(
+        self, rows: Iterable[Tuple[Any, ...]], country_ids: Dict[str, int]
+    ) -> None:
+        today = datetime.date.today()
+        ids: List[int] = []
+        genders: List[int] = []
+        ages: List[float] = []
+        education: List[int] = []
+        citizenship: List[int] = []
+        for pk, gender, edu, birth_year, date_of_birth, country in rows:
+            ids.append(pk)
+            genders.append(GENDER_CODES.get((gender or "").lower(), 0))
+            ages.append(_age(today, date_of_birth, birth_year))
+            education.append(EDUCATION_RANKS.get(edu or "", -1))
+            citizenship.append(country_ids.get(normalize_country(country), -1))
+        self.ids = np.array(ids, dtype=np.int64)
+        self.gender = np.array(genders, dtype=np.int8)
+        self.age = np.array(ages, dtype=np.float32)
+        self.education = np.array(education, dtype=np.int8)
+        self.citizenship = np.array(citizenship, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class JobArrays:
+    """Columnar view of every active job's combined requirements."""
+
+    def __init__(
+        self,
+        rows: Iterable[Tuple[Any, ...]],
+        job_countries: Dict[int, List[str]],
+        country_ids: Dict[str, int],
+    ) -> None:
+        ids: List[int] = []
+        genders: List[int] = []
+        age_low: List[float] = []
+        age_high: List[float] = []
+        education: List[int] = []
+        allowed: List[List[int]] = []
+        for (
+            pk,
+            gender,
+            low,
+            high,
+            employer_low,
+            employer_high,
+            employer_education,
+            employer_country,
+        ) in rows:
+            ids.append(pk)
+            genders.append(GENDER_CODES.get((gender or "").lower(), 0))
+            low = low if low is not None else employer_low
+            high = high if high is not None else employer_high
+            age_low.append(float(low) if low is not None else np.nan)
+            age_high.append(float(high) if high is not None else np.nan)
+            education.append(EDUCATION_RANKS.get(employer_education or "", -1))
+            names = {normalize_country(name) for name in job_countries.get(pk, [])}
+            names.add(normalize_country(employer_country))
+            names.discard("")
+            allowed.append([country_ids[name] for name in names])
+
+        self.ids = np.array(ids, dtype=np.int64)
+        self.gender = np.array(genders, dtype=np.int8)
+        self.age_low = np.array(age_low, dtype=np.float32)
+        self.age_high = np.array(age_high, dtype=np.float32)
+        self.education = np.array(education, dtype=np.int8)
+        # One extra, always-False column absorbs candidates with no country.
+        self.citizenship = np.zeros((len(ids), len(country_ids) + 1), dtype=bool)
+        for row, country_list in enumerate(allowed):
+            self.citizenship[row, country_list] = True
+        self.citizenship_required = self.citizenship.any(axis=1)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def _age(
+    today: datetime.date,
+    date_of_birth: Optional[datetime.date],
+    birth_year: Optional[str],
+) -> float:
+    """Return a candidate's age in years, or NaN if unknown."""
+    if date_of_birth:
+        had_birthday = (today.month, today.day) >= (
+            date_of_birth.month,
+            date_of_birth.day,
+        )
+        return float(today.year - date_of_birth.year - (0 if had_birthday else 1))
+    try:
+        return float(today.year - int(birth_year or ""))
+    except ValueError:
+        return np.nan
+
+
+def load_arrays(
+    candidates: Optional[QuerySet[Any]] = None, jobs: Optional[QuerySet[Any]] = None
+) -> Tuple[CandidateArrays, JobArrays]:
+    """Load candidates and job requirements into columnar arrays."""
+    if candidates is None:
+        candidates = Candidate.objects.filter(is_active=True)
+    if jobs is None:
+        jobs = Job.objects.filter(is_active=True)
+
+    candidate_rows = list(
+        candidates.order_by("pk").values_list(
+            "pk",
+            "gender",
+            "education",
+            "birth_year",
+            "date_of_birth",
+            "user__userprofile__citizenship",
+        )
+    )
+    job_rows = list(
+        jobs.order_by("pk").values_list(
+            "pk",
+            "jobrequirements__gender",
+            "jobrequirements__age_low",
+            "jobrequirements__age_high",
+            "employer__employerrequirements__age_range_low",
+            "employer__employerrequirements__age_range_high",
+            "employer__employerrequirements__education",
+            "employer__employerrequirements__citizenship",
+        )
+    )
+    job_countries: Dict[int, List[str]] = {}
+    through = JobRequirements.citizenship.through.objects.filter(
+        jobrequirements__job__in=jobs
+    ).values_list("jobrequirements__job_id", "country__country")
+    for job_id, country in through:
+        job_countries.setdefault(job_id, []).append(country)
+
+    names = {normalize_country(row[-1]) for row in candidate_rows}
+    names.update(normalize_country(row[-1]) for row in job_rows)
+    for country_list in job_countries.values():
+        names.update(normalize_country(country) for country in country_list)
+    names.discard("")
+    country_ids = {name: index for index, name in enumerate(sorted(names))}
+
+    return (
+        CandidateArrays(candidate_rows, country_ids),
+        JobArrays(job_rows, job_countries, country_ids),
+    )
+
+
+def score_block(cands: CandidateArrays, jobs: JobArrays, block: slice) -> np.ndarray:
+    """
+    Score every candidate against the jobs in `block`.
+
+    Returns a float32 (candidates x jobs) matrix in [0, 1]. Each score is the
+    weighted share of the job's specified requirements the candidate meets;
+    a gender or citizenship mismatch is disqualifying and scores 0. Jobs with
+    no requirements score every candidate 1.
+    """
+    gender_req = jobs.gender[block][None, :]
+    gender_ok = (gender_req == 0) | (gender_req == cands.gender[:, None])
+
+    low = np.nan_to_num(jobs.age_low[block], nan=-np.inf)[None, :]
+    high = np.nan_to_num(jobs.age_high[block], nan=np.inf)[None, :]
+    age = cands.age[:, None]
+    with np.errstate(invalid="ignore"):
+        age_ok = (age >= low) & (age <= high)
+    age_required = ~(np.isnan(jobs.age_low[block]) & np.isnan(jobs.age_high[block]))
+
+    no_country = jobs.citizenship.shape[1] - 1
+    citizenship = np.where(cands.citizenship < 0, no_country, cands.citizenship)
+    citizenship_ok = jobs.citizenship[block][:, citizenship].T
+    citizenship_required = jobs.citizenship_required[block]
+    citizenship_ok |= ~citizenship_required[None, :]
+
+    edu_req = jobs.education[block][None, :]
+    education_ok = (edu_req < 0) | (cands.education[:, None] >= edu_req)
+    education_required = jobs.education[block] >= 0
+
+    gender_required = jobs.gender[block] > 0
+    earned = (
+        WEIGHTS["gender"] * (gender_ok & gender_required)
+        + WEIGHTS["age"] * (age_ok & age_required)
+        + WEIGHTS["citizenship"] * (citizenship_ok & citizenship_required)
+        + WEIGHTS["education"] * (education_ok & education_required)
+    )
+    possible = (
+        WEIGHTS["gender"] * gender_required
+        + WEIGHTS["age"] * age_required
+        + WEIGHTS["citizenship"] * citizenship_required
+        + WEIGHTS["education"] * education_required
+    ).astype(np.float32)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scores = np.where(possible > 0, earned / possible, 1.0).astype(np.float32)
+    scores[~(gender_ok & citizenship_ok)] = 0.0
+    return scores
+
+
+def _top_k_indices(
+    scores: np.ndarray, positions: np.ndarray, k: int, axis: int
+) -> np.ndarray:
+    """
+    Return the indices of the k best entries along `axis`, unordered.
+
+    Entries compare by score and then by lower position (array order follows
+    primary keys), so ties are broken the same way on every run.
+    """
+    size = scores.shape[axis]
+    if size <= k:
+        shape = [1, 1]
+        shape[axis] = size
+        index = np.arange(size).reshape(shape)
+        return np.broadcast_to(index, scores.shape)
+    keys = np.rint(scores.astype(np.float64) * SCORE_SCALE).astype(np.int64)
+    keys = keys * POSITION_LIMIT - positions
+    return np.argpartition(-keys, k - 1, axis=axis).take(range(k), axis=axis)
+
+
+def compute_matches(
+    cands: CandidateArrays, jobs: JobArrays, top_k: int = DEFAULT_TOP_K
+) -> Dict[Tuple[int, int], Dict[str, Any]]:
+    """
+    Return the top-k matches per job and per candidate.
+
+    The result maps (job_id, candidate_id) to the pair's score and its ranks;
+    a pair can appear in a job's top-k, a candidate's top-k or both.
+    """
+    n_candidates, n_jobs = len(cands), len(jobs)
+    matches: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    if not n_candidates or not n_jobs:
+        return matches
+
+    block_size = max(1, BLOCK_CELLS // n_candidates)
+    candidate_positions = np.arange(n_candidates, dtype=np.int64)[:, None]
+    best_scores = np.full((n_candidates, 0), -1.0, dtype=np.float32)
+    best_jobs = np.zeros((n_candidates, 0), dtype=np.int64)
+
+    for start in range(0, n_jobs, block_size):
+        block = slice(start, min(start + block_size, n_jobs))
+        scores = score_block(cands, jobs, block)
+
+        # Best candidates for each job in this block.
+        rows = _top_k_indices(scores, candidate_positions, top_k, axis=0)
+        for column in range(scores.shape[1]):
+            candidates_idx = rows[:, column]
+            column_scores = scores[candidates_idx, column]
+            order = np.lexsort((cands.ids[candidates_idx], -column_scores))
+            rank = 0
+            for position in order:
+                score = float(column_scores[position])
+                if score <= 0:
+                    break
+                rank += 1
+                job_id = int(jobs.ids[start + column])
+                candidate_id = int(cands.ids[candidates_idx[position]])
+                matches[(job_id, candidate_id)] = {
+                    "score": score,
+                    "job_rank": rank,
+                    "candidate_rank": None,
+                }
+
+        # Merge this block into each candidate's running best jobs.
+        block_jobs = np.broadcast_to(
+            np.arange(block.start, block.stop, dtype=np.int64), scores.shape
+        )
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_jobs = np.concatenate([best_jobs, block_jobs], axis=1)
+        keep = _top_k_indices(merged_scores, merged_jobs, top_k, axis=1)
+        best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        best_jobs = np.take_along_axis(merged_jobs, keep, axis=1)
+
+    for row in range(n_candidates):
+        order = np.lexsort((jobs.ids[best_jobs[row]], -best_scores[row]))
+        rank = 0
+        for position in order:
+            score = float(best_scores[row, position])
+            if score <= 0:
+                break
+            rank += 1
+            key = (int(jobs.ids[best_jobs[row, position]]), int(cands.ids[row]))
+            match = matches.setdefault(key, {"score": score, "job_rank": None})
+            match["candidate_rank"] = rank
+    return matches
+
+
+def rebuild_matches(top_k: int = DEFAULT_TOP_K) -> int:
+    """Score every active candidate against every active job and persist."""
+    cands, jobs = load_arrays()
+    matches = compute_matches(cands, jobs, top_k=top_k)
+    rows = [
+        CandidateJobMatch(
+            job_id=job_id,
+            candidate_id=candidate_id,
+            score=match["score"],
+            job_rank=match["job_rank"],
+            candidate_rank=match["candidate_rank"],
+        )
+        for (job_id, candidate_id), match in matches.items()
+    ]
+    with transaction.atomic():
+        CandidateJobMatch.objects.all().delete()
+        CandidateJobMatch.objects.bulk_create(rows, batch_size=WRITE_BATCH_SIZE)
+    return len(rows)
+
+
+def best_candidates(
+    job: Any, limit: int = DEFAULT_TOP_K
+) -> QuerySet[CandidateJobMatch]:
+    """Return the stored best matches for a job, best first."""
+    return (
+        CandidateJobMatch.objects.filter(job=job, job_rank__isnull=False)
+        .select_related("candidate__user")
+        .order_by("job_rank")[:limit]
+    )
+
+
+def best_jobs(
+    candidate: Any, limit: int = DEFAULT_TOP_K
+) -> QuerySet[CandidateJobMatch]:
+    """Return the stored best matching jobs for a candidate, best first."""
+    return (
+        CandidateJobMatch.objects.filter(
+            candidate=candidate, candidate_rank__isnull=False
+        )
+        .select_related("job__employer")
+        .order_by("candidate_rank")[:limit]
+    )
@@ -1,6 +1,95 @@
 """Models for the jobs application."""
 
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
 # Import models from centralized location
 from recruit_models.jobs import Country, Job, JobRequirements
 
-__all__ = ["Job", "Country", "JobRequirements"]
+
+class JobSearchDocument(models.Model):
+    """Denormalized, search-ready copy of a Job used by the job board."""
+
+    job = models.OneToOneField(
+        Job,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    title = models.CharField(max_length=255)
+    location = models.CharField(max_length=255, blank=True)
+    employer_name = models.CharField(max_length=255, blank=True)
+    content = models.TextField(blank=True)
+    salary_low = models.IntegerField(null=True, blank=True)
+    salary_high = models.IntegerField(null=True, blank=True)
+    compensation_type = models.CharField(max_length=100, blank=True)
+    accommodation_included = models.BooleanField(default=False)
+    insurance_included = models.BooleanField(default=False)
+    is_featured = models.BooleanField(default=False)
+    is_active = models.BooleanField(default=True)
+    created = models.DateTimeField(null=True, blank=True)
+    # Only populated on PostgreSQL; SQLite uses an FTS5 shadow table instead.
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["is_active", "compensation_type"],
+                name="jobs_search_comp_idx",
+            ),
+            models.Index(
+                fields=["is_active", "salary_low", "salary_high"],
+                name="jobs_search_salary_idx",
+            ),
+            models.Index(
+                fields=["is_active", "accommodation_included", "insurance_included"],
+                name="jobs_search_benefits_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Search document for {self.title}"
+
+
+class CandidateJobMatch(models.Model):
+    """Precomputed match score between a candidate and a job."""
+
+    job = models.ForeignKey(
+        Job, on_delete=models.CASCADE, related_name="candidate_matches"
+    )
+    candidate = models.ForeignKey(
+        "candidates.Candidate", on_delete=models.CASCADE, related_name="job_matches"
+    )
+    score = models.FloatField()
+    # Position among the job's best candidates, or None if outside the top-k.
+    job_rank = models.PositiveIntegerField(null=True, blank=True)
+    # Position among the candidate's best jobs, or None if outside the top-k.
+    candidate_rank = models.PositiveIntegerField(null=True, blank=True)
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "candidate"], name="jobs_match_job_candidate_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["job", "job_rank"], name="jobs_match_job_rank_idx"),
+            models.Index(
+                fields=["candidate", "candidate_rank"],
+                name="jobs_match_candidate_rank_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.candidate} - {self.job} ({self.score:.2f})"
+
+
+__all__ = [
+    "Job",
+    "Country",
+    "JobRequirements",
+    "JobSearchDocument",
+    "CandidateJobMatch",
+]
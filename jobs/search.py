@@ -0,0 +1,341 @@
+"""Full-text search and faceting over denormalized job search documents.
+
+Each Job has a JobSearchDocument row holding the searchable text and the
+filterable columns, so a search never joins back to Job or Employer. Text
+matching uses the best engine the database offers: a tsvector column on
+PostgreSQL, an FTS5 shadow table on SQLite and plain `icontains` elsewhere.
+"""
+
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Case, Count, Q, QuerySet, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Job, JobSearchDocument
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "jobs_jobsearch_fts"
+INDEX_BATCH_SIZE = 500
+
+# (label, lowest salary_high included, highest salary_high excluded)
+SALARY_BANDS: Tuple[Tuple[str, int, Optional[int]], ...] = (
+    ("Under 2000", 0, 2000),
+    ("2000 - 3999", 2000, 4000),
+    ("4000 - 5999", 4000, 6000),
+    ("6000 - 9999", 6000, 10000),
+    ("10000+", 10000, None),
+)
+
+DOCUMENT_FIELDS = (
+    "title",
+    "location",
+    "employer_name",
+    "content",
+    "salary_low",
+    "salary_high",
+    "compensation_type",
+    "accommodation_included",
+    "insurance_included",
+    "is_featured",
+    "is_active",
+    "created",
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchBackend:
+    """Fallback backend matching with case-insensitive substring lookups."""
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS) -> None:
+        self.connection = connections[using]
+
+    def install(self) -> None:
+        """Create any database objects the backend needs."""
+
+    def clear(self) -> None:
+        """Empty the text index ahead of a full rebuild."""
+
+    def index(self, documents: List[JobSearchDocument]) -> None:
+        """Refresh the text index for the given documents."""
+
+    def remove(self, job_ids: Iterable[int]) -> None:
+        """Drop the given jobs from the text index."""
+
+    def match(
+        self, queryset: QuerySet[JobSearchDocument], query: str
+    ) -> QuerySet[JobSearchDocument]:
+        """Restrict `queryset` to documents matching the text `query`."""
+        condition = Q()
+        for token in _TOKEN_RE.findall(query):
+            condition &= (
+                Q(title__icontains=token)
+                | Q(location__icontains=token)
+                | Q(employer_name__icontains=token)
+            )
+        return queryset.filter(condition)
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Backend using an SQLite FTS5 table keyed by job id."""
+
+    def install(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                "USING fts5(title, location, employer_name, content)"
+            )
+
+    def clear(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def index(self, documents: List[JobSearchDocument]) -> None:
+        if not documents:
+            return
+        self.remove(doc.pk for doc in documents)
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} "
+                "(rowid, title, location, employer_name, content) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [
+                    (
+                        doc.pk,
+                        doc.title,
+                        doc.location,
+                        doc.employer_name,
+                        doc.content,
+                    )
+                    for doc in documents
+                ],
+            )
+
+    def remove(self, job_ids: Iterable[int]) -> None:
+        ids = list(job_ids)
+        if not ids:
+            return
+        placeholders = ", ".join(["%s"] * len(ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", ids
+            )
+
+    def match(
+        self, queryset: QuerySet[JobSearchDocument], query: str
+    ) -> QuerySet[JobSearchDocument]:
+        tokens = _TOKEN_RE.findall(query)
+        if not tokens:
+            return queryset
+        # Quote every token so user input cannot inject FTS5 operators and
+        # allow prefix matches so "teach" finds "teacher".
+        expression = " ".join(f'"{token}"*' for token in tokens)
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                (expression,),
+            )
+        )
+
+
+class PostgresBackend(SearchBackend):
+    """Backend using a GIN-indexed tsvector column on the document table."""
+
+    config = "english"
+
+    def install(self) -> None:
+        table = JobSearchDocument._meta.db_table
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_vector_idx "
+                f"ON {table} USING gin (search_vector)"
+            )
+
+    def index(self, documents: List[JobSearchDocument]) -> None:
+        if not documents:
+            return
+        vector = (
+            SearchVector("title", weight="A", config=self.config)
+            + SearchVector(
+                "employer_name", "location", weight="B", config=self.config
+            )
+            + SearchVector("content", weight="C", config=self.config)
+        )
+        ids = [doc.pk for doc in documents]
+        JobSearchDocument.objects.filter(pk__in=ids).update(search_vector=vector)
+
+    def match(
+        self, queryset: QuerySet[JobSearchDocument], query: str
+    ) -> QuerySet[JobSearchDocument]:
+        if not query.strip():
+            return queryset
+        search_query = SearchQuery(query, search_type="websearch", config=self.config)
+        return queryset.filter(search_vector=search_query)
+
+
+def get_backend(using: str = DEFAULT_DB_ALIAS) -> SearchBackend:
+    """Return the search backend matching the database's vendor."""
+    vendor = connections[using].vendor
+    if vendor == "postgresql":
+        return PostgresBackend(using)
+    if vendor == "sqlite":
+        return SQLiteFTSBackend(using)
+    return SearchBackend(using)
+
+
+def install_search_index(using: str = DEFAULT_DB_ALIAS, **kwargs: Any) -> None:
+    """Create the text index objects; connected to `post_migrate`."""
+    get_backend(using).install()
+
+
+def build_document(job: Any) -> JobSearchDocument:
+    """Build (without saving) the search document for a job."""
+    employer = job.employer
+    employer_name = ""
+    if employer is not None:
+        employer_name = employer.name_english or employer.name_local or ""
+    content = " ".join(
+        part
+        for part in (
+            job.compensation_terms,
+            job.accommodation_stipend,
+            job.travel_stipend,
+            job.insurance_stipend,
+        )
+        if part
+    )
+    return JobSearchDocument(
+        job=job,
+        title=(job.title or "")[:255],
+        location=(job.location or "")[:255],
+        employer_name=employer_name[:255],
+        content=content,
+        salary_low=job.salary_low,
+        salary_high=job.salary_high,
+        compensation_type=(job.compensation_type or "")[:100],
+        accommodation_included=bool(job.accommodation_included),
+        insurance_included=bool(job.insurance_included),
+        is_featured=bool(job.is_featured),
+        is_active=bool(job.is_active),
+        created=getattr(job, "created", None),
+    )
+
+
+def index_jobs(job_ids: Iterable[int]) -> int:
+    """(Re)build the search documents for the given jobs."""
+    ids = list(job_ids)
+    backend = get_backend()
+    indexed = 0
+    for start in range(0, len(ids), INDEX_BATCH_SIZE):
+        batch = ids[start : start + INDEX_BATCH_SIZE]
+        jobs = Job.objects.filter(pk__in=batch).select_related("employer")
+        documents = [build_document(job) for job in jobs]
+        JobSearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=["job"],
+            update_fields=list(DOCUMENT_FIELDS),
+        )
+        backend.index(documents)
+        found = {doc.pk for doc in documents}
+        missing = [job_id for job_id in batch if job_id not in found]
+        if missing:
+            remove_jobs(missing)
+        indexed += len(documents)
+    return indexed
+
+
+def remove_jobs(job_ids: Iterable[int]) -> None:
+    """Remove the given jobs from the search index."""
+    ids = list(job_ids)
+    JobSearchDocument.objects.filter(pk__in=ids).delete()
+    try:
+        get_backend().remove(ids)
+    except DatabaseError:
+        logger.exception("Failed to remove jobs %s from the text index", ids)
+
+
+def rebuild_index() -> int:
+    """Install the text index and rebuild every job's search document."""
+    backend = get_backend()
+    backend.install()
+    backend.clear()
+    job_ids = Job.objects.order_by("pk").values_list("pk", flat=True)
+    return index_jobs(job_ids.iterator())
+
+
+def search_documents(
+    query: str = "", filters: Optional[Dict[str, Any]] = None
+) -> QuerySet[JobSearchDocument]:
+    """Return the active search documents matching a text query and filters."""
+    filters = filters or {}
+    documents = JobSearchDocument.objects.filter(is_active=True)
+
+    if filters.get("salary_min") is not None:
+        documents = documents.filter(salary_high__gte=filters["salary_min"])
+    if filters.get("salary_max") is not None:
+        documents = documents.filter(salary_low__lte=filters["salary_max"])
+    if filters.get("compensation_type"):
+        documents = documents.filter(compensation_type=filters["compensation_type"])
+    if filters.get("accommodation_included") is not None:
+        documents = documents.filter(
+            accommodation_included=filters["accommodation_included"]
+        )
+    if filters.get("insurance_included") is not None:
+        documents = documents.filter(insurance_included=filters["insurance_included"])
+
+    if query:
+        documents = get_backend().match(documents, query)
+    return documents
+
+
+def salary_band_expression() -> Case:
+    """Return an expression labelling each document with its salary band."""
+    whens = []
+    for label, low, high in SALARY_BANDS:
+        condition = Q(salary_high__gte=low)
+        if high is not None:
+            condition &= Q(salary_high__lt=high)
+        whens.append(When(condition, then=Value(label)))
+    return Case(*whens, default=Value(""))
+
+
+def facet_counts(documents: QuerySet[JobSearchDocument]) -> Dict[str, Dict[str, int]]:
+    """
+    Count matching documents per facet value in a single grouped query.
+
+    The database groups by every facet column at once; the (small) grouped
+    result is then folded into one counter per facet. Boolean facets are
+    keyed "yes"/"no" so templates can look them up.
+    """
+    rows = (
+        documents.order_by()
+        .annotate(salary_band=salary_band_expression())
+        .values(
+            "compensation_type",
+            "accommodation_included",
+            "insurance_included",
+            "salary_band",
+        )
+        .annotate(total=Count("pk"))
+    )
+    facets: Dict[str, Dict[str, int]] = {
+        "compensation_type": {},
+        "accommodation_included": {},
+        "insurance_included": {},
+        "salary_band": {label: 0 for label, _, _ in SALARY_BANDS},
+    }
+    for row in rows:
+        for name, counts in facets.items():
+            value = row[name]
+            if isinstance(value, bool):
+                value = "yes" if value else "no"
+            elif value == "":
+                continue
+            counts[value] = counts.get(value, 0) + row["total"]
+    return facets
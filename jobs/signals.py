@@ -0,0 +1,74 @@
+"""Signal handlers keeping job search documents and page caches in sync."""
+
+from typing import Any
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from employers.models import Employer
+
+from .cache import bump_job_versions, forget_job_versions
+from .models import Job, JobRequirements
+from .search import index_jobs, remove_jobs
+
+
+@receiver(post_save, sender=Job)
+def reindex_job(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Refresh a job's search document once the saving transaction commits."""
+    if kwargs.get("raw"):
+        return
+    job_id = instance.pk
+    transaction.on_commit(lambda: index_jobs([job_id]))
+    transaction.on_commit(lambda: bump_job_versions([job_id]))
+
+
+@receiver(post_delete, sender=Job)
+def unindex_job(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Drop a deleted job from the search index and the page cache."""
+    job_id = instance.pk
+    transaction.on_commit(lambda: remove_jobs([job_id]))
+    transaction.on_commit(lambda: forget_job_versions([job_id]))
+
+
+@receiver(post_save, sender=Employer)
+def reindex_employer_jobs(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Refresh the documents of every job posted by an updated employer."""
+    if kwargs.get("raw") or kwargs.get("created"):
+        return
+    employer_id = instance.pk
+
+    def reindex() -> None:
+        job_ids = list(
+            Job.objects.filter(employer_id=employer_id).values_list("pk", flat=True)
+        )
+        index_jobs(job_ids)
+        bump_job_versions(job_ids)
+
+    transaction.on_commit(reindex)
+
+
+@receiver(post_save, sender=JobRequirements)
+@receiver(post_delete, sender=JobRequirements)
+def invalidate_requirements_job(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Invalidate the cached page of a job whose requirements changed."""
+    if kwargs.get("raw"):
+        return
+    job_id = instance.job_id
+    transaction.on_commit(lambda: bump_job_versions([job_id]))
+
+
+@receiver(m2m_changed, sender=JobRequirements.citizenship.through)
+def invalidate_citizenship_job(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Invalidate the cached page of a job whose citizenship list changed."""
+    if not kwargs.get("action", "").startswith("post_"):
+        return
+    if isinstance(instance, JobRequirements):
+        job_ids = [instance.job_id]
+    else:
+        job_ids = list(
+            JobRequirements.objects.filter(
+                pk__in=kwargs.get("pk_set") or ()
+            ).values_list("job_id", flat=True)
+        )
+    transaction.on_commit(lambda: bump_job_versions(job_ids))
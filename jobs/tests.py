@@ -3,11 +3,23 @@
 from datetime import date
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from model_bakery import baker
 
+from candidates.models import Candidate
+from employers.models import Employer
+from interviews.models import InterviewRequest
+from recruit.pagination import decode_cursor, encode_cursor, keyset_filter
 from recruiters.models import Recruiter
 
-from .models import Country
+from .cache import DETAIL_TIMEOUT, VERSION_KEY, get_job_version, get_timeouts
+from .matching import CandidateArrays, JobArrays, compute_matches, score_block
+from .models import Country, Job, JobRequirements, JobSearchDocument
+from .search import facet_counts, search_documents
+from .views import create_interview_requests
 
 
 class JobModelTest(TestCase):
@@ -38,3 +50,212 @@ class JobModelTest(TestCase):
         # This test would need an Employer instance
         # Commented out until Employer model is available
         pass
+
+
+class KeysetPaginationTest(SimpleTestCase):
+    """Test cases for the job board cursor helpers."""
+
+    def test_cursor_round_trip(self) -> None:
+        """Test that encoded cursors decode to the same ordering values."""
+        cursor = encode_cursor([True, "2024-01-02T03:04:05Z", 42])
+        self.assertEqual(decode_cursor(cursor, 3), [True, "2024-01-02T03:04:05Z", 42])
+
+    def test_malformed_cursor_is_ignored(self) -> None:
+        """Test that garbage or mismatched cursors fall back to the first page."""
+        self.assertIsNone(decode_cursor("not-a-cursor", 3))
+        self.assertIsNone(decode_cursor(encode_cursor([1, 2]), 3))
+        self.assertIsNone(decode_cursor(None, 3))
+
+    def test_keyset_filter_descending(self) -> None:
+        """Test the seek condition for a descending multi-column ordering."""
+        condition = keyset_filter(("-is_featured", "-id"), [True, 10])
+        expected = Q(is_featured__lt=True) | (Q(is_featured=True) & Q(id__lt=10))
+        self.assertEqual(condition, expected)
+
+
+class JobSearchTest(TestCase):
+    """Test cases for the job search index."""
+
+    def setUp(self) -> None:
+        """Create a few indexed jobs."""
+        employer = baker.make(Employer, name_english="Acme Academy")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher = baker.make(
+                Job,
+                employer=employer,
+                title="English Teacher",
+                location="Seoul",
+                salary_low=2000,
+                salary_high=2500,
+                compensation_type="Monthly",
+                accommodation_included=True,
+                is_active=True,
+            )
+            self.manager = baker.make(
+                Job,
+                employer=employer,
+                title="Academy Manager",
+                location="Busan",
+                salary_low=4000,
+                salary_high=5000,
+                compensation_type="Monthly",
+                accommodation_included=False,
+                is_active=True,
+            )
+
+    def test_documents_follow_jobs(self) -> None:
+        """Test that saving a job creates its search document."""
+        self.assertEqual(JobSearchDocument.objects.count(), 2)
+        document = JobSearchDocument.objects.get(pk=self.teacher.pk)
+        self.assertEqual(document.employer_name, "Acme Academy")
+
+    def test_text_search(self) -> None:
+        """Test that title words, including prefixes, match."""
+        results = search_documents("teach")
+        matched = list(results.values_list("pk", flat=True))
+        self.assertEqual(matched, [self.teacher.pk])
+
+    def test_filters_and_facets(self) -> None:
+        """Test salary filtering and facet counts over the filtered set."""
+        documents = search_documents("", {"salary_min": 3000})
+        matched = list(documents.values_list("pk", flat=True))
+        self.assertEqual(matched, [self.manager.pk])
+
+        facets = facet_counts(search_documents())
+        self.assertEqual(facets["compensation_type"], {"Monthly": 2})
+        self.assertEqual(facets["accommodation_included"], {"yes": 1, "no": 1})
+        self.assertEqual(facets["salary_band"]["2000 - 3999"], 1)
+
+
+class MatchingEngineTest(SimpleTestCase):
+    """Test cases for the vectorized candidate/job scorer."""
+
+    def setUp(self) -> None:
+        """Build three candidates and two jobs as columnar arrays."""
+        country_ids = {"CA": 0, "US": 1}
+        self.candidates = CandidateArrays(
+            [
+                (1, "female", "Master's Degree", "1990", None, "US"),
+                (2, "male", "PhD", "1990", None, "US"),
+                (3, "female", "High School", "1995", None, "CA"),
+            ],
+            country_ids,
+        )
+        self.jobs = JobArrays(
+            [
+                (10, "female", 20, 60, None, None, "Bachelor's Degree", "US"),
+                (11, "", None, None, None, None, None, None),
+            ],
+            {},
+            country_ids,
+        )
+
+    def test_scores(self) -> None:
+        """Test that hard mismatches score zero and open jobs score one."""
+        scores = score_block(self.candidates, self.jobs, slice(0, 2))
+        self.assertEqual(scores.shape, (3, 2))
+        self.assertAlmostEqual(float(scores[0, 0]), 1.0)
+        self.assertEqual(float(scores[1, 0]), 0.0)  # gender mismatch
+        self.assertEqual(float(scores[2, 0]), 0.0)  # citizenship mismatch
+        self.assertTrue((scores[:, 1] == 1.0).all())
+
+    def test_top_k_per_job_and_candidate(self) -> None:
+        """Test that ranks are assigned per job and per candidate."""
+        matches = compute_matches(self.candidates, self.jobs, top_k=1)
+        self.assertEqual(matches[(10, 1)]["job_rank"], 1)
+        # Ties on the open job go to the lowest candidate id.
+        self.assertEqual(matches[(11, 1)]["job_rank"], 1)
+        self.assertEqual(matches[(11, 2)]["candidate_rank"], 1)
+        self.assertNotIn((10, 2), matches)
+
+
+class InterviewRequestBulkTest(TestCase):
+    """Test cases for bulk interview request creation."""
+
+    def setUp(self) -> None:
+        """Create a candidate and a few active jobs."""
+        self.candidate = baker.make(Candidate)
+        self.jobs = baker.make(Job, is_active=True, _quantity=3)
+
+    def test_creates_requests_in_bulk(self) -> None:
+        """Test that all selected jobs are requested with a fixed query count."""
+        job_ids = [str(job.pk) for job in self.jobs]
+        # savepoint, candidate lock, job lookup, existing requests, insert, release
+        with self.assertNumQueries(6):
+            summary = create_interview_requests(self.candidate, job_ids)
+        self.assertEqual(summary, {"created": 3, "skipped": 0, "missing": 0})
+        self.assertEqual(InterviewRequest.objects.count(), 3)
+
+    def test_resubmission_is_idempotent(self) -> None:
+        """Test that resubmitting skips existing requests and unknown ids."""
+        create_interview_requests(self.candidate, [self.jobs[0].pk])
+        summary = create_interview_requests(
+            self.candidate, [job.pk for job in self.jobs] + ["999999", "bogus"]
+        )
+        self.assertEqual(summary, {"created": 2, "skipped": 1, "missing": 1})
+        self.assertEqual(
+            InterviewRequest.objects.filter(candidate=self.candidate).count(), 3
+        )
+
+
+class JobDetailCacheTest(TestCase):
+    """Test cases for the cached job detail page."""
+
+    def setUp(self) -> None:
+        """Create a job and start from an empty cache."""
+        cache.clear()
+        self.employer = baker.make(Employer, name_english="Acme Academy")
+        self.job = baker.make(Job, employer=self.employer, title="English Teacher")
+        self.url = reverse("job_details", args=[self.job.pk])
+
+    def test_missing_job_is_404(self) -> None:
+        """Test that an unknown job id returns 404 and caches nothing."""
+        response = self.client.get(reverse("job_details", args=[self.job.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header("ETag"))
+        self.assertIsNone(cache.get(VERSION_KEY.format(self.job.pk + 1)))
+
+    def test_deleted_job_forgets_its_version(self) -> None:
+        """Test that deleting a job drops its version key."""
+        job_id = self.job.pk
+        get_job_version(job_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.job.delete()
+        self.assertIsNone(cache.get(VERSION_KEY.format(job_id)))
+        self.assertIsNone(get_job_version(job_id))
+
+    def test_local_cache_timeouts(self) -> None:
+        """Test that a per-process cache bounds how long pages stay cached."""
+        locmem = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        with override_settings(
+            CACHES={"default": locmem}, JOB_DETAIL_LOCAL_TIMEOUT=60
+        ):
+            self.assertEqual(get_timeouts(), (60, 60))
+        dummy = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+        with override_settings(CACHES={"default": dummy}):
+            self.assertEqual(get_timeouts(), (None, DETAIL_TIMEOUT))
+
+    def test_rendered_fragment_is_cached(self) -> None:
+        """Test that a second request does not query the job again."""
+        response = self.client.get(self.url)
+        self.assertContains(response, "English Teacher")
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_conditional_get(self) -> None:
+        """Test that an unchanged page is answered with 304."""
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_saves_bump_the_version(self) -> None:
+        """Test that job, requirements and employer saves invalidate the page."""
+        for instance in (
+            self.job,
+            baker.prepare(JobRequirements, job=self.job),
+            self.employer,
+        ):
+            before = get_job_version(self.job.pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                instance.save()
+            self.assertNotEqual(get_job_version(self.job.pk), before)
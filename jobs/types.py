@@ -1,6 +1,6 @@
 """Type definitions for the jobs application."""
 
-from typing import Any, Protocol, runtime_checkable
+from typing import Any, Protocol, TypedDict, runtime_checkable
 
 from django.db import models
 
@@ -47,3 +47,11 @@ class JobRequirementsType(Protocol):
     age_low: int
     gender: str
     citizenship: models.ManyToManyField[Any, Any]
+
+
+class InterviewRequestSummary(TypedDict):
+    """Outcome of a bulk interview request submission."""
+
+    created: int
+    skipped: int
+    missing: int
@@ -1,43 +1,110 @@
 """Views for the jobs application."""
 
-from typing import Any, List, Union
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Set, Union
 
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
-from django.shortcuts import render
+from django.db import transaction
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404, render
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
 from accounts.models import UserProfile
 from candidates.models import Candidate
 from interviews.models import InterviewRequest
+from recruit.pagination import clamp_page_size, paginate_keyset
 
+from .cache import get_detail_fragment, get_job_version, set_detail_fragment
+from .forms import JobSearchForm
 from .models import Job
+from .search import facet_counts, search_documents
+
+if TYPE_CHECKING:
+    import datetime
+
+    from .cache import JobVersion
+    from .types import InterviewRequestSummary
+
+# Featured postings first, then newest; `id` breaks ties so the order is total.
+JOB_BOARD_ORDERING = ("-is_featured", "-created", "-id")
+
+
+def create_interview_requests(
+    candidate: Candidate, jobs_ids: Iterable[Any]
+) -> InterviewRequestSummary:
+    """
+    Create interview requests for a candidate in bulk, skipping duplicates.
+
+    The jobs are resolved with a single query and the new requests inserted
+    with a single INSERT inside one transaction. Requests the candidate has
+    already made are skipped, so resubmitting the form is harmless.
+    InterviewRequest has no unique constraint on (candidate, job), so the
+    candidate row is locked to serialize concurrent submissions between the
+    existence check and the insert.
+    """
+    requested: Set[int] = set()
+    for job_id in jobs_ids:
+        try:
+            requested.add(int(job_id))
+        except (TypeError, ValueError):
+            continue
+
+    with transaction.atomic():
+        Candidate.objects.select_for_update().values_list("pk", flat=True).get(
+            pk=candidate.pk
+        )
+        jobs = Job.objects.filter(is_active=True).only("pk").in_bulk(requested)
+        already_requested = set(
+            InterviewRequest.objects.filter(
+                candidate=candidate, job__in=jobs
+            ).values_list("job_id", flat=True)
+        )
+        created = len(
+            InterviewRequest.objects.bulk_create(
+                [
+                    InterviewRequest(candidate=candidate, job=job)
+                    for job_id, job in sorted(jobs.items())
+                    if job_id not in already_requested
+                ]
+            )
+        )
+
+    return {
+        "created": created,
+        "skipped": len(jobs) - created,
+        "missing": len(requested) - len(jobs),
+    }
 
 
 def add_interview_requests(
     request: HttpRequest, user: User, jobs_ids: List[str]
-) -> None:
+) -> Optional[InterviewRequestSummary]:
     """Add interview requests for the given user and job IDs."""
     try:
         candidate = Candidate.objects.get(user=user)
     except Candidate.DoesNotExist:
         messages.add_message(request, messages.ERROR, "This user is not a candidate.")
-        return
+        return None
     except ObjectDoesNotExist:
         messages.add_message(request, messages.ERROR, "Candidate not found.")
-        return
+        return None
 
-    for job_id in jobs_ids:
-        job = Job.objects.get(pk=int(job_id))
-        ir = InterviewRequest(candidate=candidate, job=job)
-        ir.save()
+    summary = create_interview_requests(candidate, jobs_ids)
 
     if "requested_jobs" in request.session:
         del request.session["requested_jobs"]
 
-    messages.add_message(request, messages.SUCCESS, "Form submitted successfully.")
+    message = "Form submitted successfully."
+    if summary["skipped"]:
+        message += f" {summary['skipped']} of the selected jobs were already requested."
+    messages.add_message(request, messages.SUCCESS, message)
+    return summary
 
 
 def view_jobs(request: HttpRequest) -> Union[HttpResponseRedirect, HttpResponse]:
@@ -47,8 +114,31 @@ def view_jobs(request: HttpRequest) -> Union[HttpResponseRedirect, HttpResponse]
     context: dict[str, Any] = {}
 
     if request.method == "GET":
-        jobs = Job.objects.all()
-        context = {"jobs": jobs}
+        form = JobSearchForm(request.GET)
+        filters = form.cleaned_data if form.is_valid() else {}
+        documents = search_documents(filters.get("q", ""), filters)
+
+        jobs = Job.objects.filter(is_active=True).select_related(
+            "employer", "recruiter"
+        )
+        if any(value not in (None, "") for value in filters.values()):
+            jobs = jobs.filter(pk__in=documents.values("pk"))
+
+        page = paginate_keyset(
+            jobs,
+            JOB_BOARD_ORDERING,
+            cursor=request.GET.get("cursor"),
+            page_size=clamp_page_size(request.GET.get("page_size")),
+        )
+        params = request.GET.copy()
+        params.pop("cursor", None)
+        context = {
+            "jobs": page,
+            "page": page,
+            "form": form,
+            "facets": facet_counts(documents),
+            "query_string": params.urlencode(),
+        }
 
     if request.method == "POST":
         jobs_ids = request.POST.getlist("requested_jobs[]")
@@ -68,8 +158,59 @@ def view_jobs(request: HttpRequest) -> Union[HttpResponseRedirect, HttpResponse]
     return render(request, "jobs/jobs.html", context)
 
 
+def _job_version(request: HttpRequest, job_id: str) -> Optional[JobVersion]:
+    """Return the job's cached version, looked up once per request."""
+    versions = request.__dict__.setdefault("_job_versions", {})
+    if job_id not in versions:
+        versions[job_id] = get_job_version(job_id)
+    return versions[job_id]
+
+
+def _job_details_etag(request: HttpRequest, job_id: str) -> Optional[str]:
+    """
+    Return the ETag of a job page, or None for a missing job.
+
+    The page embeds the navbar and a CSRF token, so the viewer is part of
+    the tag as well as the job version.
+    """
+    version = _job_version(request, job_id)
+    if version is None:
+        return None
+    return f"{version[0]}-{request.user.pk or 0}"
+
+
+def _job_details_last_modified(
+    request: HttpRequest, job_id: str
+) -> Optional[datetime.datetime]:
+    """Return when a job page last changed, or None for a missing job."""
+    version = _job_version(request, job_id)
+    return None if version is None else version[1]
+
+
+@cache_control(private=True, max_age=0, must_revalidate=True)
+@condition(
+    etag_func=_job_details_etag, last_modified_func=_job_details_last_modified
+)
 def view_job_details(request: HttpRequest, job_id: str) -> HttpResponse:
-    """Display details for a specific job."""
-    job = Job.objects.get(id=job_id)
-    context = {"job": job}
-    return render(request, "jobs/details.html", context)
+    """
+    Display details for a specific job.
+
+    The job-specific part of the page is rendered once per job version and
+    served from the cache until the job, its requirements or its employer
+    change; unchanged pages are answered with 304 Not Modified.
+    """
+    version = _job_version(request, job_id)
+    if version is None:
+        raise Http404("No Job matches the given query.")
+    token, _ = version
+    fragment = get_detail_fragment(job_id, token)
+    if fragment is None:
+        job = get_object_or_404(
+            Job.objects.select_related("employer"), pk=job_id
+        )
+        fragment = {
+            "title": job.title,
+            "body": render_to_string("jobs/_details_body.html", {"job": job}),
+        }
+        set_detail_fragment(job_id, token, fragment)
+    return render(request, "jobs/details.html", fragment)
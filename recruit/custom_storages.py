@@ -1,9 +1,21 @@
-"""Custom storage backends for static and media files using Amazon S3."""
+"""Custom storage backends for static and media files using Amazon S3.
 
-from typing import Any
+The content-addressed media storages store every upload once, under the
+SHA-256 of its content: `objects/ab/cd/<digest><ext>`. Uploading a file
+that is already stored costs a hash and an existence check instead of a
+transfer. Because one object can be shared by many model fields, objects
+are only deleted once nothing refers to them (see the `uploads` app), and
+every save first reserves the object's reference count row, so that a
+concurrent purge cannot delete an object an upload is about to reuse.
+"""
+
+import hashlib
+import os
+import re
+from typing import Any, Optional
 
 from django.conf import settings
-from django.core.files.storage import DefaultStorage
+from django.core.files.storage import DefaultStorage, FileSystemStorage
 
 try:
     from storages.backends.s3boto3 import S3Boto3Storage  # type: ignore[import-untyped]
@@ -52,3 +64,70 @@ class MediaStorage(S3Boto3Storage):  # type: ignore[misc]
     def path(self, _name: str) -> str:
         """Raise NotImplementedError as this backend doesn't support local paths."""
         raise NotImplementedError("This backend doesn't support local file paths.")
+
+
+CONTENT_PREFIX = "objects"
+OBJECT_NAME_RE = re.compile(
+    rf"^{CONTENT_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.[^/.]+)?$"
+)
+
+
+def content_digest(content: Any) -> str:
+    """Return the SHA-256 of a file, unless it was hashed during the upload."""
+    digest = getattr(content, "content_digest", None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def object_name(digest: str, name: str) -> str:
+    """Return the name of the object with content `digest` uploaded as `name`."""
+    # Keep the extension, which S3 uses to set the Content-Type.
+    extension = os.path.splitext(name)[1].lower()
+    return f"{CONTENT_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def is_object_name(name: str) -> bool:
+    """Return whether `name` is a content-addressed object."""
+    return bool(OBJECT_NAME_RE.match(name))
+
+
+def is_content_addressed(name: str) -> bool:
+    """Return whether `name` is an object or a file derived from one."""
+    return name.startswith(f"{CONTENT_PREFIX}/")
+
+
+class ContentAddressedMixin:
+    """Store uploads under the digest of their content, once each."""
+
+    content_addressed = True
+
+    def get_available_name(self, name: str, max_length: Optional[int] = None) -> str:
+        """Return `name`; equal names hold equal content."""
+        return name
+
+    def _save(self, name: str, content: Any) -> str:
+        if is_content_addressed(name):
+            # Files derived from an object, such as image variants.
+            return super()._save(name, content)  # type: ignore[misc]
+        name = object_name(content_digest(content), name)
+        # Imported here: the uploads app itself builds on this module.
+        from uploads.refcounts import reserve_object
+
+        # Reserve first: a purge deleting the object makes this wait until
+        # it is done, so the existence check below sees the outcome.
+        reserve_object(name)
+        if self.exists(name):  # type: ignore[attr-defined]
+            return name
+        return super()._save(name, content)  # type: ignore[misc]
+
+
+class ContentAddressedMediaStorage(ContentAddressedMixin, MediaStorage):
+    """Content-addressed media storage on S3."""
+
+
+class ContentAddressedFileSystemStorage(ContentAddressedMixin, FileSystemStorage):
+    """Content-addressed media storage in MEDIA_ROOT, for development and tests."""
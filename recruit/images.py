@@ -0,0 +1,451 @@
+"""Background generation of resized image variants.
+
+Uploaded photos and scans are stored as-is by the request that receives
+them. After the transaction commits, the upload is handed to a background
+thread, which reads the original back from storage and has a worker
+process decode it once and encode every size of `IMAGE_VARIANT_SIZES` in
+the source format and as WebP. JPEGs are decoded in draft mode, which lets
+the decoder scale down by up to 8x instead of expanding every pixel of a
+phone photo. The variants are stored next to the original as
+`<name>-<size>.<ext>` and the "thumb" variant is recorded in the model's
+thumbnail field, so web workers never spend CPU on image processing.
+`regenerate_variants` rebuilds the variants of existing rows, e.g. after
+the sizes change. The variants of a replaced or deleted image are deleted
+by the models' signal handlers (`recruit.utils.purge_variants`).
+"""
+
+import atexit
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.db import connections, models, transaction
+from django.db.models import Case, F, Q, Value, When
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int]
+T = TypeVar("T")
+
+DEFAULT_SIZES: Dict[str, Box] = {
+    "thumb": (100, 100),
+    "medium": (480, 480),
+    "large": (1280, 1280),
+}
+THUMB_SIZE = "thumb"
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+# Recycle worker processes now and then to return fragmented memory.
+MAX_TASKS_PER_CHILD = 200
+BACKFILL_BATCH_SIZE = 500
+
+# Image fields with variants: (model label, image field, thumbnail field)
+IMAGE_FIELDS = [
+    ("candidates.Candidate", "image", "thumb"),
+    ("recruiters.Recruiter", "image", "thumb"),
+    ("employers.EmployerImages", "image", "thumb"),
+    ("employers.Employer", "business_license", "business_license_thumb"),
+]
+
+# Pillow format of the source -> (output format, extension)
+SOURCE_FORMATS = {
+    "JPEG": ("JPEG", "jpg"),
+    "MPO": ("JPEG", "jpg"),
+    "PNG": ("PNG", "png"),
+    "WEBP": ("WEBP", "webp"),
+}
+
+_lock = threading.Lock()
+_threads: Optional[ThreadPoolExecutor] = None
+_processes: Optional[ProcessPoolExecutor] = None
+
+
+class BackfillBatch(NamedTuple):
+    """Outcome of a batch of `regenerate_variants`."""
+
+    last_pk: Any
+    regenerated: int
+    failed: int
+
+
+class Variant(NamedTuple):
+    """An encoded image variant."""
+
+    size: str
+    extension: str
+    data: bytes
+
+
+def get_sizes() -> List[Tuple[str, Box]]:
+    """Return the configured variant sizes as (name, bounding box) pairs."""
+    sizes = dict(getattr(settings, "IMAGE_VARIANT_SIZES", DEFAULT_SIZES))
+    # The thumbnail fields always get a variant.
+    sizes.setdefault(THUMB_SIZE, DEFAULT_SIZES[THUMB_SIZE])
+    return [(name, (int(box[0]), int(box[1]))) for name, box in sizes.items()]
+
+
+def get_workers() -> int:
+    """Return the number of worker processes; 0 processes inline."""
+    return int(getattr(settings, "IMAGE_PIPELINE_WORKERS", 2))
+
+
+def variant_prefix(name: str, size: str) -> str:
+    """Return the storage name of a variant, without its extension."""
+    root, _ = os.path.splitext(name)
+    return f"{root}-{size}."
+
+
+def variant_name(name: str, size: str, extension: str) -> str:
+    """Return the storage name of a variant of the file `name`."""
+    return variant_prefix(name, size) + extension
+
+
+def variant_names(name: str) -> List[str]:
+    """Return every name a variant of the file `name` may be stored under."""
+    extensions = sorted({extension for _, extension in SOURCE_FORMATS.values()})
+    return [
+        variant_name(name, size, extension)
+        for size, _ in get_sizes()
+        for extension in extensions
+    ]
+
+
+def has_alpha(image: Image.Image) -> bool:
+    """Return whether an image has transparency."""
+    return image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+
+
+def encode(image: Image.Image, image_format: str) -> bytes:
+    """Encode an RGB or RGBA image."""
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        image.convert("RGB").save(
+            buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True
+        )
+    elif image_format == "WEBP":
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, image_format, optimize=True)
+    return buffer.getvalue()
+
+
+def render_variants(
+    data: bytes, sizes: Sequence[Tuple[str, Box]], webp: bool = True
+) -> List[Variant]:
+    """
+    Decode an image once and encode it at every size.
+
+    Each size is a bounding box the image is scaled down to fit, keeping
+    its aspect ratio. Variants are encoded in the format of the image as
+    detected from its content, and also as WebP if `webp` is true. This
+    runs in the worker processes and uses no Django state.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        fallback = ("PNG", "png") if has_alpha(source) else ("JPEG", "jpg")
+        image_format, extension = SOURCE_FORMATS.get(source.format or "", fallback)
+        largest = max(max(box) for _, box in sizes)
+        # JPEG only: decode at the smallest scale still covering the largest box.
+        source.draft("RGB", (largest, largest))
+        mode = "RGBA" if has_alpha(source) else "RGB"
+        base = ImageOps.exif_transpose(source).convert(mode)
+
+    formats = [(image_format, extension)]
+    if webp and image_format != "WEBP":
+        formats.append(("WEBP", "webp"))
+    variants = []
+    previous: Optional[Tuple[Box, Image.Image]] = None
+    for size, box in sorted(sizes, key=lambda item: item[1], reverse=True):
+        # Scale down from the previous variant when it still covers this box.
+        if previous and previous[0][0] >= box[0] and previous[0][1] >= box[1]:
+            image = previous[1].copy()
+        else:
+            image = base.copy()
+        image.thumbnail(box, Image.Resampling.LANCZOS)
+        previous = (box, image)
+        for output_format, output_extension in formats:
+            encoded = encode(image, output_format)
+            variants.append(Variant(size, output_extension, encoded))
+    return variants
+
+
+def stored_image_name(instance: models.Model, field: str) -> str:
+    """Return the stored name an image field of an instance holds, or ''."""
+    value = instance.__dict__.get(field)
+    if isinstance(value, str):
+        return value
+    if getattr(value, "_committed", False):
+        return value.name or ""
+    return ""
+
+
+def remember_image(instance: models.Model, field: str) -> None:
+    """Note the stored name of a loaded instance's image."""
+    names = instance.__dict__.setdefault("_image_names", {})
+    names[field] = stored_image_name(instance, field)
+
+
+def replaced_image(instance: models.Model, field: str) -> str:
+    """Return the name of the image a save replaced, or '' if none was."""
+    names = instance.__dict__.setdefault("_image_names", {})
+    old, new = names.get(field, ""), stored_image_name(instance, field)
+    names[field] = new
+    return old if old != new else ""
+
+
+def needs_variants(instance: models.Model, field: str, thumb_field: str) -> bool:
+    """Return whether the thumbnail of an instance is missing or stale."""
+    source = getattr(instance, field)
+    if not source:
+        return False
+    thumb = getattr(instance, thumb_field)
+    prefix = variant_prefix(source.name, THUMB_SIZE)
+    return not (thumb and thumb.name.startswith(prefix))
+
+
+def queue_variants(instance: models.Model, field: str, thumb_field: str) -> None:
+    """Generate the variants of an instance's image after the commit."""
+    if not needs_variants(instance, field, thumb_field):
+        return
+    model, pk, name = type(instance), instance.pk, getattr(instance, field).name
+    transaction.on_commit(lambda: submit(model, pk, field, thumb_field, name))
+
+
+def _executors(workers: int) -> Tuple[ThreadPoolExecutor, ProcessPoolExecutor]:
+    """Return the shared thread and process pools, starting them on first use."""
+    global _threads, _processes
+    with _lock:
+        if _threads is None or _processes is None:
+            _threads = ThreadPoolExecutor(workers, thread_name_prefix="images")
+            _processes = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=MAX_TASKS_PER_CHILD,
+            )
+            atexit.register(shutdown)
+        return _threads, _processes
+
+
+def shutdown() -> None:
+    """Stop the pools, waiting for queued images; run at exit once started."""
+    global _threads, _processes
+    with _lock:
+        threads, processes, _threads, _processes = _threads, _processes, None, None
+    atexit.unregister(shutdown)
+    if threads is not None:
+        threads.shutdown()
+    if processes is not None:
+        processes.shutdown()
+
+
+def submit(
+    model: Type[models.Model], pk: Any, field: str, thumb_field: str, name: str
+) -> None:
+    """Process an image in the background, or inline without workers."""
+    workers = get_workers()
+    if workers <= 0:
+        process_image(model, pk, field, thumb_field, name)
+        return
+    threads, processes = _executors(workers)
+    threads.submit(_process_in_thread, processes, model, pk, field, thumb_field, name)
+
+
+def _process_in_thread(executor: Executor, *args: Any) -> None:
+    """Run process_image in a pool thread, closing its database connections."""
+    try:
+        process_image(*args, executor=executor)
+    finally:
+        connections.close_all()
+
+
+def process_image(
+    model: Type[models.Model],
+    pk: Any,
+    field: str,
+    thumb_field: str,
+    name: str,
+    executor: Optional[Executor] = None,
+) -> Optional[str]:
+    """
+    Store the variants of the image `name` of one instance.
+
+    The thumbnail field is only updated while the instance still has that
+    image. Returns the name of the thumbnail, or None if the image could
+    not be processed.
+    """
+    storage = model._meta.get_field(field).storage  # type: ignore[union-attr]
+    try:
+        with storage.open(name, "rb") as handle:
+            data = handle.read()
+        sizes = get_sizes()
+        if executor is None:
+            variants = render_variants(data, sizes)
+        else:
+            variants = executor.submit(render_variants, data, sizes).result()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning("Could not create variants of image %s", name, exc_info=True)
+        return None
+    except Exception:
+        logger.exception("Image processing failed for %s", name)
+        return None
+
+    thumb = store_variants(storage, name, variants)
+    if thumb is not None:
+        model._default_manager.filter(pk=pk, **{field: name}).update(
+            **{thumb_field: thumb}
+        )
+    return thumb
+
+
+def store_variants(
+    storage: Storage, name: str, variants: Sequence[Variant]
+) -> Optional[str]:
+    """Store the variants of the image `name`, returning the thumbnail's name."""
+    thumb = None
+    for variant in variants:
+        target = variant_name(name, variant.size, variant.extension)
+        if storage.exists(target):
+            storage.delete(target)
+        stored = storage.save(target, ContentFile(variant.data))
+        if variant.size == THUMB_SIZE and thumb is None:
+            thumb = stored
+    return thumb
+
+
+def batched(rows: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Yield lists of up to `size` rows."""
+    batch: List[T] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _setup_worker() -> None:
+    """Set up Django in a spawned backfill worker."""
+    import django
+
+    django.setup()
+
+
+def rebuild_stored(
+    label: str, field: str, pk: Any, name: str, sizes: Sequence[Tuple[str, Box]]
+) -> Tuple[Any, Optional[str]]:
+    """Regenerate the variants of one stored image; return (pk, thumbnail)."""
+    storage = apps.get_model(label)._meta.get_field(field).storage  # type: ignore
+    try:
+        with storage.open(name, "rb") as handle:
+            variants = render_variants(handle.read(), sizes)
+        return pk, store_variants(storage, name, variants)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning("Could not create variants of image %s", name, exc_info=True)
+    except Exception:
+        logger.exception("Image processing failed for %s", name)
+    return pk, None
+
+
+def regenerate_variants(
+    label: str,
+    field: str,
+    thumb_field: str,
+    after: Any = None,
+    workers: int = 0,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    missing_only: bool = False,
+) -> Iterator[BackfillBatch]:
+    """
+    Regenerate the variants of every stored image of a model, in pk order.
+
+    Rows are read with a server-side iterator and handed to `workers`
+    processes (inline if 0) a batch at a time; the next batch is rendered
+    while the results of the previous one are written back with one
+    UPDATE, skipping rows whose image changed meanwhile. Yields a
+    BackfillBatch per batch, whose `last_pk` is a safe checkpoint to
+    resume from with `after`.
+    """
+    model = apps.get_model(label)
+    rows = model._default_manager.exclude(**{field: ""}).exclude(
+        **{f"{field}__isnull": True}
+    )
+    if after is not None:
+        rows = rows.filter(pk__gt=after)
+    if missing_only:
+        rows = rows.filter(
+            Q(**{thumb_field: ""}) | Q(**{f"{thumb_field}__isnull": True})
+        )
+    rows = rows.order_by("pk").values_list("pk", field)
+    sizes = get_sizes()
+    executor = None
+    if workers > 0:
+        executor = ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_setup_worker,
+            max_tasks_per_child=MAX_TASKS_PER_CHILD,
+        )
+
+    def start(batch: List[Tuple[Any, str]]) -> List[Any]:
+        if executor is None:
+            return [rebuild_stored(label, field, pk, name, sizes) for pk, name in batch]
+        return [
+            executor.submit(rebuild_stored, label, field, pk, name, sizes)
+            for pk, name in batch
+        ]
+
+    def finish(batch: List[Tuple[Any, str]], jobs: List[Any]) -> BackfillBatch:
+        results = [job.result() if executor else job for job in jobs]
+        names = dict(batch)
+        thumbs = {pk: thumb for pk, thumb in results if thumb is not None}
+        regenerated = 0
+        if thumbs:
+            # Like process_image, only rows still holding the rendered image
+            # get its thumbnail; a photo replaced meanwhile keeps its own.
+            current = Q()
+            for pk in thumbs:
+                current |= Q(pk=pk, **{field: names[pk]})
+            whens = [When(pk=pk, then=Value(thumb)) for pk, thumb in thumbs.items()]
+            thumbnail = Case(
+                *whens,
+                default=F(thumb_field),
+                output_field=model._meta.get_field(thumb_field),
+            )
+            regenerated = model._default_manager.filter(current).update(
+                **{thumb_field: thumbnail}
+            )
+        return BackfillBatch(batch[-1][0], regenerated, len(results) - len(thumbs))
+
+    try:
+        pending = None
+        for batch in batched(rows.iterator(chunk_size=batch_size), batch_size):
+            jobs = start(batch)
+            if pending is not None:
+                yield finish(*pending)
+            pending = (batch, jobs)
+        if pending is not None:
+            yield finish(*pending)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
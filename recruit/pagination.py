@@ -0,0 +1,126 @@
+"""Keyset (cursor) pagination helpers for large, ordered querysets."""
+
+import base64
+import datetime
+import json
+from typing import Any, List, Optional, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """JSON encoder that keeps full microsecond precision for datetimes."""
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+    """A single page of results together with the cursor for the next page."""
+
+    def __init__(
+        self, object_list: List[Any], next_cursor: Optional[str], page_size: int
+    ) -> None:
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.page_size = page_size
+
+    def __iter__(self) -> Any:
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    @property
+    def has_next(self) -> bool:
+        """Return True if another page follows this one."""
+        return self.next_cursor is not None
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the ordering values of a row into an opaque, URL-safe cursor."""
+    raw = json.dumps(list(values), cls=CursorEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], length: int) -> Optional[List[Any]]:
+    """Decode a cursor, returning None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != length:
+        return None
+    return values
+
+
+def keyset_filter(ordering: Sequence[str], values: Sequence[Any]) -> Q:
+    """
+    Build the filter selecting rows strictly after `values` in `ordering`.
+
+    Every field in `ordering` must be non-nullable and the last one must be
+    unique (usually the primary key) so that the ordering is total.
+    """
+    condition = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        clause = Q()
+        for prior_field, prior_value in zip(ordering[:index], values[:index]):
+            clause &= Q(**{prior_field.lstrip("-"): prior_value})
+        condition |= clause & Q(**{f"{name}__{lookup}": values[index]})
+    return condition
+
+
+def clamp_page_size(value: Any, default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Parse a requested page size, falling back to `default` and capping it."""
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def paginate_keyset(
+    queryset: QuerySet[Any],
+    ordering: Sequence[str],
+    cursor: Optional[str] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> KeysetPage:
+    """
+    Return the page of `queryset` that follows `cursor`.
+
+    Unlike offset pagination the cost of a page does not depend on how deep it
+    is: the database seeks straight to the cursor position using the index on
+    the ordering columns and reads at most `page_size + 1` rows.
+    """
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(cursor, len(ordering))
+    if values is not None:
+        queryset = queryset.filter(keyset_filter(ordering, values))
+
+    rows = list(queryset[: page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            [_resolve(last, field.lstrip("-")) for field in ordering]
+        )
+    return KeysetPage(rows, next_cursor, page_size)
+
+
+def _resolve(obj: Any, path: str) -> Any:
+    """Follow a `__` separated field path on a model instance."""
+    for part in path.split("__"):
+        obj = getattr(obj, part)
+    return obj
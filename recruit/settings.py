@@ -58,6 +58,7 @@ INSTALLED_APPS = [
     "candidates",
     "dashboards",
     "sendgrid",  # Add the new SendGrid app
+    "uploads",
 ]
 
 MIDDLEWARE_CLASSES = [
@@ -103,6 +104,25 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/ref/settings/#caches
+# Job page invalidation relies on a cache shared by every worker process, so
+# deployments running more than one process should point this at Redis or
+# Memcached. Under the per-process LocMemCache, cached job pages expire after
+# JOB_DETAIL_LOCAL_TIMEOUT seconds instead of a day.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "recruit"),
+    }
+}
+
+JOB_DETAIL_LOCAL_TIMEOUT = 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
 
@@ -165,14 +185,52 @@ AWS_HEADERS = {
     "Cache-Control": "max-age=94608000",
 }
 AWS_S3_CUSTOM_DOMAIN = f"{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com"
+AWS_S3_URL_PROTOCOL = "https:"
+# A local S3-compatible server (e.g. MinIO at http://localhost:9000) to use
+# instead of AWS, for development and testing.
+AWS_S3_ENDPOINT_URL = os.environ.get("AWS_S3_ENDPOINT_URL") or None
+if AWS_S3_ENDPOINT_URL:
+    AWS_S3_ADDRESSING_STYLE = "path"
+    AWS_S3_URL_PROTOCOL, endpoint_host = AWS_S3_ENDPOINT_URL.rstrip("/").split("//", 1)
+    AWS_S3_CUSTOM_DOMAIN = f"{endpoint_host}/{AWS_STORAGE_BUCKET_NAME}"
+# Let browsers upload application files straight to S3 (uploads.presigned).
+# Off by default: the bucket must first allow the site's cross-origin POSTs,
+# with a CORS rule such as
+#   [{"AllowedOrigins": ["https://<site host>"], "AllowedMethods": ["POST"],
+#     "AllowedHeaders": ["*"], "MaxAgeSeconds": 3000}]
+# Without one every upload fails in the browser and falls back to the
+# slower upload through the server.
+PRESIGNED_UPLOADS = os.environ.get("PRESIGNED_UPLOADS", "false").lower() == "true"
+PRESIGNED_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
 
 STATICFILES_LOCATION = "static"
 STATICFILES_STORAGE = "recruit.custom_storages.StaticStorage"
-STATIC_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/{STATICFILES_LOCATION}/"
+STATIC_URL = f"{AWS_S3_URL_PROTOCOL}//{AWS_S3_CUSTOM_DOMAIN}/{STATICFILES_LOCATION}/"
 
 MEDIAFILES_LOCATION = "media"
-MEDIA_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/{MEDIAFILES_LOCATION}/"
+MEDIA_URL = f"{AWS_S3_URL_PROTOCOL}//{AWS_S3_CUSTOM_DOMAIN}/{MEDIAFILES_LOCATION}/"
 DEFAULT_FILE_STORAGE = "recruit.custom_storages.MediaStorage"
+# Store each distinct upload once, named by its SHA-256; see the uploads app.
+MEDIA_CONTENT_ADDRESSED = (
+    os.environ.get("MEDIA_CONTENT_ADDRESSED", "false").lower() == "true"
+)
+if MEDIA_CONTENT_ADDRESSED:
+    DEFAULT_FILE_STORAGE = "recruit.custom_storages.ContentAddressedMediaStorage"
+    # Hash uploads while they are received, so saving them needs no extra pass.
+    FILE_UPLOAD_HANDLERS = [
+        "uploads.handlers.HashingMemoryFileUploadHandler",
+        "uploads.handlers.HashingTemporaryFileUploadHandler",
+    ]
+
+# Image variants generated in the background for uploaded photos, as
+# bounding boxes; each is stored in the upload's format and as WebP.
+IMAGE_VARIANT_SIZES = {
+    "thumb": (100, 100),
+    "medium": (480, 480),
+    "large": (1280, 1280),
+}
+# Worker processes decoding images; 0 processes uploads inline.
+IMAGE_PIPELINE_WORKERS = int(os.environ.get("IMAGE_PIPELINE_WORKERS", "2"))
 
 # All auth configurations
 ACCOUNT_ADAPTER = "accounts.adapter.MyAccountAdapter"
@@ -211,6 +269,19 @@ EMAIL_BACKEND = "sendgrid.backends.SendGridBackend"
 SENDGRID_USER = os.environ.get("SENDGRID_USER", "")
 SENDGRID_PASSWORD = os.environ.get("SENDGRID_PASSWORD", "")
 SENDGRID_API_KEY = os.environ.get("SENDGRID_API_KEY", "")
+SENDGRID_API_HOST = os.environ.get("SENDGRID_API_HOST", "https://api.sendgrid.com")
+# Keep-alive connections shared by all threads of a process.
+SENDGRID_POOL_SIZE = int(os.environ.get("SENDGRID_POOL_SIZE", "10"))
+# Group messages that differ only in recipients into one API request.
+SENDGRID_BATCH_SEND = os.environ.get("SENDGRID_BATCH_SEND", "true").lower() == "true"
+# Verification key of the signed Event Webhook (base64, from the SendGrid UI).
+SENDGRID_WEBHOOK_PUBLIC_KEY = os.environ.get("SENDGRID_WEBHOOK_PUBLIC_KEY", "")
+# Requests per second the SendGrid account allows, shared by all processes;
+# 429 and 5xx responses lower the actual rate until sends succeed again.
+# Off by default: the shared bucket is one database row, so every API call
+# then costs two or three extra queries against it. Enable it when several
+# workers send enough email to hit the account's limit.
+SENDGRID_RATE_LIMIT = float(os.environ.get("SENDGRID_RATE_LIMIT", "0"))
 
 MESSAGE_TAGS = {
     messages.DEBUG: "debug",
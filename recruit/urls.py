@@ -27,6 +27,7 @@ from dashboards import views as dashboardViews
 from interviews import views as interviewsViews
 from jobs import views as jobsViews
 from recruiters import views as recruitersViews
+from sendgrid import views as sendgridViews
 
 urlpatterns: List[Union[URLPattern, URLResolver]] = [
     path("", dashboardViews.dashboards, name="dashboards"),
@@ -35,6 +36,16 @@ urlpatterns: List[Union[URLPattern, URLResolver]] = [
     path("jobs/", jobsViews.view_jobs, name="jobs"),
     re_path(r"^jobs/(?P<job_id>\d+)/$", jobsViews.view_job_details, name="job_details"),
     path("candidates/apply/", candidatesViews.apply, name="candidate_apply"),
+    path(
+        "candidates/apply/uploads/",
+        candidatesViews.apply_uploads,
+        name="candidate_apply_uploads",
+    ),
+    path(
+        "candidates/apply/uploads/complete/",
+        candidatesViews.apply_uploads_complete,
+        name="candidate_apply_uploads_complete",
+    ),
     path(
         "candidates/apply/success/",
         candidatesViews.apply_success,
@@ -55,6 +66,9 @@ urlpatterns: List[Union[URLPattern, URLResolver]] = [
         name="availability",
     ),
     path("interviews/", interviewsViews.interview_requests, name="interviews"),
+    path(
+        "sendgrid/events/", sendgridViews.event_webhook, name="sendgrid_event_webhook"
+    ),
 ]
 
 if settings.DEBUG:
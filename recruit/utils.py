@@ -1,35 +1,262 @@
 """Utility functions for file processing and S3 operations."""
 
+import atexit
+import logging
 import mimetypes
-from io import BytesIO
-from typing import Any, List
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 from django.core.files.uploadedfile import SimpleUploadedFile
-from PIL import Image
+from django.db import connections, transaction
+
+from .custom_storages import is_content_addressed
+from .images import (
+    DEFAULT_SIZES,
+    THUMB_SIZE,
+    render_variants,
+    variant_name,
+    variant_names,
+)
+
+try:
+    from storages.utils import clean_name  # type: ignore[import-untyped]
+except ImportError:
+    clean_name = None
+
+logger = logging.getLogger(__name__)
+
+# Most keys S3 accepts in one DeleteObjects request.
+DELETE_BATCH_SIZE = 1000
+# How long the delete thread waits for more files to fill a batch.
+DELETE_LINGER = 0.1
+DELETE_ATTEMPTS = 3
+# Seconds before the first retry of failed deletions; doubled for each next one.
+DELETE_BACKOFF = 0.5
+# How long an exiting process waits for its queued deletions.
+DELETE_DRAIN_TIMEOUT = 30.0
+
+_delete_queue: "queue.Queue[StoredFile]" = queue.Queue()
+_delete_lock = threading.Lock()
+_delete_thread: Optional[threading.Thread] = None
 
 
 def generate_thumbnail(file: Any) -> SimpleUploadedFile:
-    """Generate a thumbnail from an uploaded image file."""
-    size = (100, 100)
-    im = Image.open(file)
-    filename = file.name.split("/")[-1].split(".")[0]
-    mime = mimetypes.guess_type(file.name)[0]
+    """
+    Generate a thumbnail from an uploaded image file.
+
+    Uploads get their thumbnails in the background from `recruit.images`;
+    this is for callers that need one right away.
+    """
+    file.seek(0)
+    variant, = render_variants(
+        file.read(), [(THUMB_SIZE, DEFAULT_SIZES[THUMB_SIZE])], webp=False
+    )
+    filename = variant_name(os.path.basename(file.name), THUMB_SIZE, variant.extension)
+    mime = mimetypes.guess_type(filename)[0] or "image/jpeg"
+    return SimpleUploadedFile(filename, variant.data, content_type=mime)
+
+
+class StoredFile(NamedTuple):
+    """A file name in a storage; FieldFile objects work alike."""
+
+    storage: Any
+    name: str
+
+
+class DeleteFailure(NamedTuple):
+    """A file that could not be deleted, and why."""
+
+    file: StoredFile
+    error: str
+
+
+class DeleteResult(NamedTuple):
+    """Outcome of `delete_objects`; failed files can be passed to it again."""
+
+    deleted: int
+    failed: List[DeleteFailure]
+
+
+def image_files(file: Any) -> List[StoredFile]:
+    """Return an image file and every variant it may have."""
+    if not file:
+        return []
+    names = [file.name, *variant_names(file.name)]
+    return [StoredFile(file.storage, name) for name in names]
+
+
+def s3_key(storage: Any, name: str) -> str:
+    """Return the bucket key of a file of an S3 storage."""
+    if clean_name is not None:
+        name = clean_name(name)
+    return storage._normalize_name(name)
+
+
+def delete_objects(files: Iterable[Any]) -> DeleteResult:
+    """
+    Delete files, with one DeleteObjects request per 1000 keys of a bucket.
+
+    `files` are FieldFile or StoredFile objects. Files of other storages
+    are deleted one by one. A failure does not stop the other deletions;
+    the failed files are returned instead.
+    """
+    buckets: Dict[str, List[Tuple[str, StoredFile]]] = {}
+    storages: Dict[str, Any] = {}
+    deleted = 0
+    failed: List[DeleteFailure] = []
+    for file in files:
+        stored = StoredFile(file.storage, file.name)
+        if not stored.name:
+            continue
+        bucket_name = getattr(stored.storage, "bucket_name", None)
+        if bucket_name is None:
+            try:
+                stored.storage.delete(stored.name)
+                deleted += 1
+            except Exception as e:
+                failed.append(DeleteFailure(stored, str(e)))
+            continue
+        storages.setdefault(bucket_name, stored.storage)
+        buckets.setdefault(bucket_name, []).append(
+            (s3_key(stored.storage, stored.name), stored)
+        )
+
+    for bucket_name, keys in buckets.items():
+        bucket = storages[bucket_name].bucket
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = dict(keys[start : start + DELETE_BATCH_SIZE])
+            try:
+                response = bucket.delete_objects(
+                    Delete={
+                        "Objects": [{"Key": key} for key in batch],
+                        "Quiet": True,
+                    }
+                )
+            except Exception as e:
+                failed.extend(DeleteFailure(file, str(e)) for file in batch.values())
+                continue
+            errors = response.get("Errors", [])
+            for error in errors:
+                message = f"{error.get('Code')}: {error.get('Message')}"
+                failed.append(DeleteFailure(batch[error["Key"]], message))
+            deleted += len(batch) - len(errors)
+    return DeleteResult(deleted, failed)
+
+
+def delete_with_backoff(files: Iterable[Any]) -> DeleteResult:
+    """
+    Delete files, retrying failed ones with exponential backoff.
+
+    Failures are retried DELETE_ATTEMPTS - 1 times, waiting DELETE_BACKOFF
+    seconds before the first retry and twice as long before each next one,
+    so that throttling (S3 SlowDown) has time to pass.
+    """
+    result = delete_objects(files)
+    deleted = result.deleted
+    for attempt in range(1, DELETE_ATTEMPTS):
+        if not result.failed:
+            break
+        time.sleep(DELETE_BACKOFF * 2 ** (attempt - 1))
+        result = delete_objects(failure.file for failure in result.failed)
+        deleted += result.deleted
+    return DeleteResult(deleted, result.failed)
+
+
+def record_failed_deletes(failures: List[DeleteFailure]) -> None:
+    """Log files that could not be deleted and record them for a retry."""
+    for failure in failures:
+        logger.error("Could not delete %s: %s", failure.file.name, failure.error)
+    # Imported here: the uploads app itself builds on this module.
+    from uploads.deletions import record_failures
+
+    record_failures(failures)
+
+
+def _delete_worker() -> None:
+    """Delete queued files in batches, recording the ones that fail."""
+    while True:
+        items = [_delete_queue.get()]
+        deadline = time.monotonic() + DELETE_LINGER
+        while len(items) < DELETE_BATCH_SIZE:
+            try:
+                items.append(
+                    _delete_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                )
+            except queue.Empty:
+                break
+        try:
+            result = delete_with_backoff(items)
+            if result.failed:
+                try:
+                    record_failed_deletes(result.failed)
+                finally:
+                    connections.close_all()
+        except Exception:
+            logger.exception("Deleting %d queued files failed", len(items))
+        finally:
+            for _ in items:
+                _delete_queue.task_done()
+
+
+def _drain_deletes() -> None:
+    """Let queued deletions finish at exit, recording those that cannot."""
+    if wait_for_deletes(DELETE_DRAIN_TIMEOUT):
+        return
+    left: List[StoredFile] = []
+    while True:
+        try:
+            left.append(_delete_queue.get_nowait())
+        except queue.Empty:
+            break
+    if left:
+        error = "Still queued when the process exited"
+        record_failed_deletes([DeleteFailure(file, error) for file in left])
+
+
+def queue_delete(files: Iterable[Any]) -> None:
+    """Delete files in a background thread, batched with other deletions."""
+    global _delete_thread
+    with _delete_lock:
+        if _delete_thread is None:
+            _delete_thread = threading.Thread(
+                target=_delete_worker, name="delete-objects", daemon=True
+            )
+            _delete_thread.start()
+            atexit.register(_drain_deletes)
+    for file in files:
+        if file.name:
+            _delete_queue.put(StoredFile(file.storage, file.name))
+
+
+def wait_for_deletes(timeout: Optional[float] = None) -> bool:
+    """
+    Block until every queued deletion has been attempted.
+
+    Returns False if `timeout` seconds pass first.
+    """
+    with _delete_queue.all_tasks_done:
+        return _delete_queue.all_tasks_done.wait_for(
+            lambda: not _delete_queue.unfinished_tasks, timeout
+        )
 
-    if not mime:
-        mime = "image/jpeg"  # Default fallback
 
-    file_type = mime.split("/")[-1]
-    filename = filename + "-thumb." + file_type
-    im.thumbnail(size)
-    memory_file = BytesIO()
-    im.save(memory_file, file_type.upper())
-    suf = SimpleUploadedFile(filename, memory_file.getvalue(), content_type=mime)
-    return suf
+def purge_variants(storage: Any, name: str) -> None:
+    """Delete the variants of an image once the transaction commits."""
+    # Shared content-addressed objects go once unreferenced (uploads app).
+    if not name or is_content_addressed(name):
+        return
+    files = [StoredFile(storage, variant) for variant in variant_names(name)]
+    transaction.on_commit(lambda: queue_delete(files))
 
 
 def delete_from_s3(instances_list: List[Any]) -> List[Any]:
-    """Delete files from S3 storage for given instances."""
-    for instance in instances_list:
-        if hasattr(instance, "storage") and hasattr(instance, "name"):
-            instance.storage.delete(name=instance.name)
+    """Queue the deletion of files from S3 storage for given instances."""
+    queue_delete(
+        instance
+        for instance in instances_list
+        if hasattr(instance, "storage") and hasattr(instance, "name")
+    )
     return instances_list
@@ -8,3 +8,7 @@ class RecruitersConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "recruiters"
+
+    def ready(self) -> None:
+        """Connect signal handlers."""
+        from . import signals  # noqa: F401
@@ -1,6 +1,7 @@
 """SendGrid app configuration."""
 
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class SendgridConfig(AppConfig):
@@ -8,4 +9,11 @@ class SendgridConfig(AppConfig):
     
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sendgrid'
-    verbose_name = 'SendGrid Email Service'
\ No newline at end of file
+    verbose_name = 'SendGrid Email Service'
+
+    def ready(self) -> None:
+        """Connect signal handlers."""
+        from . import signals  # noqa: F401
+        from .indexes import install_indexes
+
+        post_migrate.connect(install_indexes, sender=self)
@@ -0,0 +1,113 @@
+"""Streaming attachments for the SendGrid v3 API.
+
+The API takes attachments base64-encoded inside the JSON request body.
+Rather than reading a file into memory and encoding it whole, the body is
+produced as a stream: attachment content is read and encoded in chunks of
+CHUNK_SIZE bytes, a multiple of 3 so that every chunk encodes without
+padding and the encoded chunks simply concatenate. Memory use per send is
+a few chunks however large the attachments are.
+"""
+
+import base64
+import contextlib
+import io
+import json
+from email.mime.base import MIMEBase
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Sequence
+
+CHUNK_SIZE = 3 * 64 * 1024
+DEFAULT_MIMETYPE = "application/octet-stream"
+
+
+class Attachment(NamedTuple):
+    """
+    An attachment to stream.
+
+    `content` is bytes, a str, a binary file-like object or a Django
+    `File`/`FieldFile`, which is opened for reading if it is closed.
+    """
+
+    filename: str
+    content: Any
+    mimetype: str = DEFAULT_MIMETYPE
+
+    def base64_chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the base64 encoding of the content in chunks."""
+        with open_content(self.content) as stream:
+            yield from base64_chunks(stream, chunk_size)
+
+
+def to_attachment(attachment: Any) -> Attachment:
+    """Convert an EmailMessage attachment entry to an Attachment."""
+    if isinstance(attachment, MIMEBase):
+        return Attachment(
+            attachment.get_filename() or "attachment",
+            attachment.get_payload(decode=True) or b"",
+            attachment.get_content_type(),
+        )
+    filename, content, *rest = attachment
+    mimetype = (rest[0] if rest else None) or DEFAULT_MIMETYPE
+    return Attachment(filename, content, mimetype)
+
+
+@contextlib.contextmanager
+def open_content(content: Any) -> Iterator[BinaryIO]:
+    """Open attachment content as a binary stream positioned at its start."""
+    if isinstance(content, str):
+        content = content.encode()
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(content)
+        return
+    # Django File and FieldFile objects can be reopened from their storage.
+    reopened = bool(getattr(content, "closed", False)) and hasattr(content, "open")
+    if reopened:
+        content.open("rb")
+    elif hasattr(content, "seek"):
+        content.seek(0)
+    try:
+        yield content
+    finally:
+        if reopened:
+            content.close()
+
+
+def base64_chunks(stream: Any, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the base64 encoding of a stream, read `chunk_size` bytes at a time."""
+    chunk_size = max(3, chunk_size - chunk_size % 3)
+    pending = b""
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        if isinstance(data, str):
+            data = data.encode()
+        if pending:
+            data = pending + data
+        # Short reads can leave bytes that only encode cleanly with the next.
+        cut = len(data) - len(data) % 3
+        pending = data[cut:]
+        if cut:
+            yield base64.b64encode(data[:cut])
+    if pending:
+        yield base64.b64encode(pending)
+
+
+def json_stream(
+    payload: Dict[str, Any], attachments: Sequence[Attachment]
+) -> Iterator[bytes]:
+    """Yield the JSON of a mail/send payload with its attachments streamed in."""
+    head = json.dumps(payload)[:-1]
+    yield f'{head}{", " if payload else ""}"attachments": ['.encode()
+    for index, attachment in enumerate(attachments):
+        meta = json.dumps(
+            {"filename": attachment.filename, "type": attachment.mimetype}
+        )
+        yield f'{", " if index else ""}{meta[:-1]}, "content": "'.encode()
+        yield from attachment.base64_chunks()
+        yield b'"}'
+    yield b"]}"
+
+
+def prepare_attachments(attachments: Sequence[Any]) -> List[Attachment]:
+    """Convert every attachment entry of an EmailMessage."""
+    return [to_attachment(attachment) for attachment in attachments]
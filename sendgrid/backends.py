@@ -1,99 +1,76 @@
 """SendGrid email backend implementation."""
 
-import base64
+import json
 import logging
-from typing import Any, List, Optional, Sequence
-
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import requests
 from django.conf import settings
 from django.core.mail.backends.base import BaseEmailBackend
 from django.core.mail.message import EmailMessage
 
-logger = logging.getLogger(__name__)
-
-# Try importing SendGrid with proper error handling
-try:
-    from sendgrid import SendGridAPIClient as SGAPIClient
-    from sendgrid.helpers.mail import Attachment as SGAttachment, Mail as SGMail
-
-    # Use imported classes
-    SendGridAPIClient = SGAPIClient
-    Mail = SGMail
-    Attachment = SGAttachment
-
-    def is_sendgrid_available() -> bool:
-        """Check if SendGrid is available."""
-        return True
-
-except ImportError:
-    # Create stub classes for type hints when SendGrid is not available
-
-    class Mail:
-        """Stub Mail class."""
-
-        def __init__(self, *args: Any, **kwargs: Any) -> None:
-            _ = args, kwargs  # Mark as used
-
-        def add_cc(self, email: str) -> None:
-            """Add CC recipient."""
-            _ = email  # Mark as used
-
-        def add_bcc(self, email: str) -> None:
-            """Add BCC recipient."""
-            _ = email  # Mark as used
-
-        def add_attachment(self, attachment: Any) -> None:
-            """Add attachment."""
-            _ = attachment  # Mark as used
-
-        def get_version(self) -> str:
-            """Get version for pylint compliance."""
-            return "stub"
-
-    class Attachment:
-        """Stub Attachment class."""
-
-        def __init__(self, *args: Any, **kwargs: Any) -> None:
-            _ = args, kwargs  # Mark as used
+from .attachments import Attachment, prepare_attachments
+from .client import SendGridClient, connection_stats, get_client
+from .ratelimit import RETRYABLE_STATUS_CODES, get_limiter, parse_retry_after
 
-        def get_version(self) -> str:
-            """Get version for pylint compliance."""
-            return "stub"
+logger = logging.getLogger(__name__)
 
-    class SendGridAPIClient:
-        """Stub SendGridAPIClient class."""
+SUCCESS_STATUS_CODES = (200, 201, 202)
 
-        def __init__(self, *args: Any, **kwargs: Any) -> None:
-            _ = args, kwargs  # Mark as used
+# Limits of a single v3 mail/send request.
+MAX_PERSONALIZATIONS = 1000
+MAX_RECIPIENTS = 1000
 
-        def send(self, mail: Any) -> Any:
-            """Send mail."""
-            _ = mail  # Mark as used
 
-        def get_version(self) -> str:
-            """Get version for pylint compliance."""
-            return "stub"
+class SendResult(NamedTuple):
+    """Delivery outcome of one message."""
 
-    def is_sendgrid_available() -> bool:
-        """Check if SendGrid is available."""
-        return False
+    message: EmailMessage
+    sent: bool
+    status_code: Optional[int] = None
+    message_id: str = ""
+    # Throttled before SendGrid accepted it; the send was never attempted
+    # or was answered with 429, so it should simply be tried again later.
+    deferred: bool = False
 
 
 class SendGridBackend(BaseEmailBackend):
     """
     Django email backend using SendGrid API v3.
 
-    Supports both API key and username/password authentication methods.
-    Falls back gracefully when SendGrid is not available.
+    Messages are posted through the process-wide pooled client from
+    `sendgrid.client`, so connections are reused across calls and threads.
+
+    In batch mode (the default, see `SENDGRID_BATCH_SEND`) messages that
+    share sender, reply-to, content and template are sent as one request
+    with a personalization per message, which carries the message's
+    recipients, its subject and its optional `substitutions` or
+    `dynamic_template_data` attributes. Messages with attachments are
+    always sent on their own, with the attachments streamed from memory,
+    file-like objects or `FieldFile`s (see `sendgrid.attachments`).
     """
 
-    def __init__(self, fail_silently: bool = False, **kwargs: Any) -> None:
+    def __init__(
+        self, fail_silently: bool = False, batch: Optional[bool] = None, **kwargs: Any
+    ) -> None:
         """Initialize the SendGrid backend with configuration from Django settings."""
         super().__init__(fail_silently=fail_silently, **kwargs)
 
-        # Primary authentication method: API Key
+        # The v3 API only accepts API keys, sent as a Bearer token.
         self.api_key: Optional[str] = getattr(settings, "SENDGRID_API_KEY", None)
 
-        # Fallback authentication method: Username/Password (deprecated but supported)
+        # Legacy username/password credentials are kept for reference only;
+        # SendGrid no longer accepts them, so they never authenticate a send.
         if not self.api_key:
             self.username: Optional[str] = getattr(settings, "SENDGRID_USER", None)
             self.password: Optional[str] = getattr(settings, "SENDGRID_PASSWORD", None)
@@ -103,135 +80,275 @@ class SendGridBackend(BaseEmailBackend):
             settings, "DEFAULT_FROM_EMAIL", "noreply@example.com"
         )
 
+        self.batch: bool = (
+            getattr(settings, "SENDGRID_BATCH_SEND", True) if batch is None else batch
+        )
+
     def send_messages(self, email_messages: Sequence[EmailMessage]) -> int:
         """Send multiple email messages."""
-        if not is_sendgrid_available():
-            logger.warning("SendGrid library is not available. No emails sent.")
+        if not self.api_key:
+            if getattr(self, "username", None):
+                logger.warning(
+                    "SENDGRID_USER is set but SendGrid only accepts API keys; "
+                    "configure SENDGRID_API_KEY. No emails sent."
+                )
+            else:
+                logger.warning("SENDGRID_API_KEY is not configured. No emails sent.")
             return 0
 
-        # Initialize SendGrid client
+        client = get_client()
+
         try:
-            sg = SendGridAPIClient(api_key=self.api_key)
+            if self.batch:
+                results = self.send_batch(client, email_messages)
+            else:
+                results = [
+                    self._deliver(client, [message])[0] for message in email_messages
+                ]
         except (ValueError, TypeError, AttributeError) as e:
-            logger.error("Failed to initialize SendGrid client: %s", e)
+            logger.error("Failed to send %d emails: %s", len(email_messages), e)
             if not self.fail_silently:
                 raise
             return 0
 
-        num_sent = 0
-        for message in email_messages:
-            try:
-                sent = self._send_single_message(sg, message)
-                if sent:
-                    num_sent += 1
-            except (ValueError, TypeError, AttributeError) as e:
-                logger.error("Failed to send email to %s: %s", message.to, e)
-                if not self.fail_silently:
-                    raise
+        stats = connection_stats()
+        logger.debug(
+            "SendGrid pool: %d requests over %d connections (%.0f%% reused)",
+            stats.requests,
+            stats.connections,
+            stats.reuse_ratio * 100,
+        )
+        return sum(result.sent for result in results)
+
+    def send_batch(
+        self,
+        sg_client: SendGridClient,
+        email_messages: Sequence[EmailMessage],
+        before_request: Optional[Callable[[], None]] = None,
+    ) -> List[SendResult]:
+        """
+        Send messages in as few requests as possible.
 
-        return num_sent
+        Args:
+            sg_client: Pooled SendGrid API client
+            email_messages: Django EmailMessage objects
+            before_request: Called before each API request
 
-    def _prepare_recipients(self, recipients: List[str]) -> List[str]:
+        Returns:
+            One SendResult per message, in the order of `email_messages`
+        """
+        results: List[Optional[SendResult]] = [None] * len(email_messages)
+        for batch in self._batches(email_messages):
+            if before_request is not None:
+                before_request()
+            batch_results = self._deliver(sg_client, [message for _, message in batch])
+            for (index, _), result in zip(batch, batch_results):
+                results[index] = result
+        return [
+            result or SendResult(message, False)
+            for message, result in zip(email_messages, results)
+        ]
+
+    def _batches(
+        self, email_messages: Sequence[EmailMessage]
+    ) -> Iterator[List[Tuple[int, EmailMessage]]]:
+        """Yield indexed groups of compatible messages within the request limits."""
+        groups: Dict[str, List[Tuple[int, EmailMessage]]] = {}
+        for index, message in enumerate(email_messages):
+            if not message.recipients():
+                continue
+            if message.attachments:
+                yield [(index, message)]
+                continue
+            key = json.dumps(self._shared_payload(message), sort_keys=True)
+            groups.setdefault(key, []).append((index, message))
+
+        for group in groups.values():
+            batch: List[Tuple[int, EmailMessage]] = []
+            recipients = 0
+            for index, message in group:
+                count = len(message.recipients())
+                if batch and (
+                    len(batch) == MAX_PERSONALIZATIONS
+                    or recipients + count > MAX_RECIPIENTS
+                ):
+                    yield batch
+                    batch, recipients = [], 0
+                batch.append((index, message))
+                recipients += count
+            if batch:
+                yield batch
+
+    def _prepare_recipients(self, recipients: List[str]) -> List[Dict[str, str]]:
         """Prepare recipient list."""
-        return recipients if recipients else []
+        return [{"email": recipient} for recipient in recipients or []]
 
-    def _send_single_message(self, sg_client: Any, message: EmailMessage) -> bool:
+    def _shared_payload(self, message: EmailMessage) -> Dict[str, Any]:
         """
-        Send a single email message.
+        Build the parts of the payload that batched messages share.
 
-        Args:
-            sg_client: SendGrid API client instance
-            message: Django EmailMessage object
+        The subject is left out: it can differ per personalization, so
+        messages with different subjects still go in one request.
+        """
+        payload: Dict[str, Any] = {
+            "from": {"email": message.from_email or self.default_from_email},
+        }
+        template_id = getattr(message, "template_id", None)
+        if template_id:
+            payload["template_id"] = template_id
+        else:
+            content = [
+                {"type": f"text/{message.content_subtype}", "value": message.body}
+            ]
+            for alternative, mimetype in getattr(message, "alternatives", []):
+                content.append({"type": mimetype, "value": alternative})
+            # SendGrid requires text/plain to come first.
+            content.sort(key=lambda part: part["type"] != "text/plain")
+            payload["content"] = content
+        if message.reply_to:
+            payload["reply_to"] = {"email": message.reply_to[0]}
+        return payload
+
+    def _personalization(self, message: EmailMessage, subject: str) -> Dict[str, Any]:
+        """Build the personalization of a message sent with the given subject."""
+        personalization: Dict[str, Any] = {
+            "to": self._prepare_recipients(message.to)
+        }
+        cc_emails = self._prepare_recipients(getattr(message, "cc", []))
+        bcc_emails = self._prepare_recipients(getattr(message, "bcc", []))
+        if cc_emails:
+            personalization["cc"] = cc_emails
+        if bcc_emails:
+            personalization["bcc"] = bcc_emails
+        if message.subject != subject:
+            personalization["subject"] = message.subject
+        substitutions = getattr(message, "substitutions", None)
+        if substitutions:
+            personalization["substitutions"] = substitutions
+        dynamic_template_data = getattr(message, "dynamic_template_data", None)
+        if dynamic_template_data:
+            personalization["dynamic_template_data"] = dynamic_template_data
+        return personalization
+
+    def _build_payload(self, messages: Sequence[EmailMessage]) -> Dict[str, Any]:
+        """Build the v3 mail/send payload for compatible messages."""
+        payload = self._shared_payload(messages[0])
+        payload["subject"] = messages[0].subject
+        payload["personalizations"] = [
+            self._personalization(message, payload["subject"]) for message in messages
+        ]
+        return payload
+
+    def _deliver(
+        self, sg_client: SendGridClient, messages: List[EmailMessage]
+    ) -> List[SendResult]:
+        """
+        Send compatible messages in one request.
 
-        Returns:
-            True if message was sent successfully, False otherwise
+        A batch the API rejects as invalid is retried one message at a time,
+        so a single bad address only fails its own message.
         """
         try:
-            # Prepare sender email
-            from_email = message.from_email or self.default_from_email
-
-            # Handle multiple recipients
-            to_emails = self._prepare_recipients(message.to)
-            cc_emails = self._prepare_recipients(getattr(message, "cc", []))
-            bcc_emails = self._prepare_recipients(getattr(message, "bcc", []))
-
-            # Create mail object
-            mail = Mail(
-                from_email=from_email,
-                to_emails=to_emails,
-                subject=message.subject,
-                html_content=(
-                    message.body if message.content_subtype == "html" else None
-                ),
-                plain_text_content=(
-                    message.body if message.content_subtype == "plain" else None
-                ),
-            )
+            payload = self._build_payload(messages)
 
-            # Add CC and BCC if present
-            if cc_emails:
-                for cc_email in cc_emails:
-                    mail.add_cc(cc_email)
-
-            if bcc_emails:
-                for bcc_email in bcc_emails:
-                    mail.add_bcc(bcc_email)
-
-            # Add attachments if present
-            if message.attachments:
-                self._add_attachments(mail, message.attachments)
+            # Attachments are streamed into the request body, not the payload.
+            attachments = (
+                prepare_attachments(messages[0].attachments)
+                if len(messages) == 1
+                else []
+            )
 
             # Send the email
-            response = sg_client.send(mail)
-
-            # Check response status
-            if hasattr(response, "status_code") and response.status_code in [
-                200,
-                201,
-                202,
-            ]:
-                logger.info("Email sent successfully to %s", message.to)
-                return True
+            response = self._post(sg_client, payload, attachments)
+
+        except (
+            ValueError,
+            TypeError,
+            AttributeError,
+            OSError,
+            requests.RequestException,
+        ) as e:
+            logger.error("Error sending %d emails: %s", len(messages), e)
+            return [SendResult(message, False) for message in messages]
+
+        if response is None:
+            logger.warning(
+                "SendGrid rate limit wait too long, %d emails not sent", len(messages)
+            )
+            return [SendResult(message, False, deferred=True) for message in messages]
+
+        # Check response status
+        if response.status_code in SUCCESS_STATUS_CODES:
+            message_id = response.headers.get("X-Message-Id", "")
+            for message in messages:
+                # Kept on the message so callers can record it for webhooks.
+                setattr(message, "sendgrid_message_id", message_id)
+            logger.info("Sent %d emails in one request", len(messages))
+            return [
+                SendResult(message, True, response.status_code, message_id)
+                for message in messages
+            ]
+
+        if response.status_code == 400 and len(messages) > 1:
+            logger.warning(
+                "SendGrid rejected a batch of %d emails, sending them one by one",
+                len(messages),
+            )
+            return [self._deliver(sg_client, [message])[0] for message in messages]
 
-            logger.warning("SendGrid returned unexpected response")
-            return False
+        logger.warning(
+            "SendGrid returned status %s: %s", response.status_code, response.text
+        )
+        return [
+            SendResult(
+                message,
+                False,
+                response.status_code,
+                deferred=response.status_code == 429,
+            )
+            for message in messages
+        ]
+
+    def _post(
+        self,
+        sg_client: SendGridClient,
+        payload: Dict[str, Any],
+        attachments: List[Attachment],
+    ) -> Optional[requests.Response]:
+        """
+        Send a payload, paced by the shared rate limiter.
 
-        except (ValueError, TypeError, AttributeError) as e:
-            logger.error("Error sending email: %s", e)
-            return False
+        Requests rejected with 429 or 5xx are retried up to the limiter's
+        `max_retries` times. Returns None if the limiter would make the
+        send wait longer than its `max_wait`.
+        """
+        limiter = get_limiter()
+        if limiter is None:
+            return sg_client.send(payload, attachments)
+        response = None
+        for _ in range(limiter.max_retries + 1):
+            if not limiter.acquire():
+                break
+            response = sg_client.send(payload, attachments)
+            limiter.record(
+                response.status_code,
+                parse_retry_after(response.headers.get("Retry-After")),
+            )
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                break
+        return response
 
-    def _add_attachments(self, mail: Mail, attachments: List[Any]) -> None:
+    def _send_single_message(
+        self, sg_client: SendGridClient, message: EmailMessage
+    ) -> bool:
         """
-        Add attachments to the mail object.
+        Send a single email message.
 
         Args:
-            mail: SendGrid Mail object
-            attachments: List of attachment tuples (filename, content, mimetype)
+            sg_client: Pooled SendGrid API client
+            message: Django EmailMessage object
+
+        Returns:
+            True if message was sent successfully, False otherwise
         """
-        try:
-            for attachment in attachments:
-                if len(attachment) >= 2:
-                    filename = attachment[0]
-                    content = attachment[1]
-                    mimetype = (
-                        attachment[2]
-                        if len(attachment) > 2
-                        else "application/octet-stream"
-                    )
-
-                    # Encode content to base64 if it's bytes
-                    if isinstance(content, bytes):
-                        encoded_content = base64.b64encode(content).decode()
-                    else:
-                        encoded_content = base64.b64encode(content.encode()).decode()
-
-                    attached_file = Attachment(
-                        file_content=encoded_content,
-                        file_name=filename,
-                        file_type=mimetype,
-                    )
-
-                    mail.add_attachment(attached_file)
-
-        except (TypeError, ValueError, AttributeError, UnicodeDecodeError) as e:
-            logger.error("Error adding attachments: %s", e)
+        return self._deliver(sg_client, [message])[0].sent
@@ -0,0 +1,171 @@
+"""Process-wide HTTP client for the SendGrid v3 API.
+
+A single `requests.Session` is shared by every backend instance and thread
+in the process. Its urllib3 pool keeps HTTPS connections alive between
+sends, so a burst of emails pays for one TLS handshake per pooled
+connection instead of one per message.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Sequence
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .attachments import Attachment, json_stream
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_HOST = "https://api.sendgrid.com"
+MAIL_SEND_PATH = "/v3/mail/send"
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 30.0
+
+
+class ConnectionStats(NamedTuple):
+    """Connection reuse counters of a client's pool."""
+
+    requests: int
+    connections: int
+
+    @property
+    def reused(self) -> int:
+        """Return how many requests went over an already open connection."""
+        return max(0, self.requests - self.connections)
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Return the fraction of requests that reused a connection."""
+        return self.reused / self.requests if self.requests else 0.0
+
+
+class SendGridClient:
+    """
+    Thread-safe SendGrid API client over a keep-alive connection pool.
+
+    The session is configured once and only used for sending afterwards;
+    urllib3 hands each thread its own connection from the pool, blocking
+    when all `pool_size` connections are busy instead of opening more.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        host: str = DEFAULT_API_HOST,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        self.api_key = api_key
+        self.host = host.rstrip("/")
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self.adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update(
+            {
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            }
+        )
+
+    def post(self, path: str, payload: Any) -> requests.Response:
+        """POST a JSON payload to an API path."""
+        return self.session.post(
+            f"{self.host}{path}", json=payload, timeout=self.timeout
+        )
+
+    def send(
+        self, payload: Dict[str, Any], attachments: Sequence[Attachment] = ()
+    ) -> requests.Response:
+        """
+        Send one v3 mail/send payload.
+
+        With attachments the JSON body is streamed with chunked transfer
+        encoding, encoding the attachments as it goes.
+        """
+        if not attachments:
+            return self.post(MAIL_SEND_PATH, payload)
+        return self.session.post(
+            f"{self.host}{MAIL_SEND_PATH}",
+            data=json_stream(payload, attachments),
+            timeout=self.timeout,
+        )
+
+    def stats(self) -> ConnectionStats:
+        """Return request and connection counts across the pool."""
+        total_requests = total_connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                total_requests += pool.num_requests
+                total_connections += pool.num_connections
+        return ConnectionStats(total_requests, total_connections)
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        self.session.close()
+
+
+_client: Optional[SendGridClient] = None
+_client_lock = threading.Lock()
+
+
+def _client_settings() -> Dict[str, Any]:
+    """Read the client configuration from Django settings."""
+    return {
+        "api_key": getattr(settings, "SENDGRID_API_KEY", None) or "",
+        "host": getattr(settings, "SENDGRID_API_HOST", None) or DEFAULT_API_HOST,
+        "pool_size": getattr(settings, "SENDGRID_POOL_SIZE", DEFAULT_POOL_SIZE),
+        "timeout": getattr(settings, "SENDGRID_TIMEOUT", DEFAULT_TIMEOUT),
+    }
+
+
+def get_client() -> SendGridClient:
+    """Return the process-wide client, rebuilt after a settings change or fork."""
+    global _client  # pylint: disable=global-statement
+    config = _client_settings()
+    client = _client
+    if client is not None and _matches(client, config):
+        return client
+    with _client_lock:
+        if _client is None or not _matches(_client, config):
+            # Sockets inherited from a parent process are left to the parent.
+            if _client is not None and _client.pid == os.getpid():
+                _client.close()
+            _client = SendGridClient(**config)
+        return _client
+
+
+def _matches(client: SendGridClient, config: Dict[str, Any]) -> bool:
+    """Return True if a client was built from the given configuration."""
+    return (
+        client.pid == os.getpid()
+        and client.api_key == config["api_key"]
+        and client.host == config["host"].rstrip("/")
+        and client.timeout == config["timeout"]
+        and client.adapter._pool_maxsize == config["pool_size"]
+    )
+
+
+def reset_client() -> None:
+    """Close and forget the process-wide client."""
+    global _client  # pylint: disable=global-statement
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+
+def connection_stats() -> ConnectionStats:
+    """Return the connection reuse counters of the process-wide client."""
+    client = _client
+    return client.stats() if client is not None else ConnectionStats(0, 0)
@@ -0,0 +1,156 @@
+"""Local stand-in for the SendGrid v3 mail/send endpoint.
+
+FakeSendGridServer accepts mail/send requests on a local port, so the
+email path can be exercised and load-tested without the real API. Latency,
+server error and throttling rates are configurable; throttled requests get
+429 with a Retry-After header like the real API. Point
+`SENDGRID_API_HOST` at `server.url` to use it.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from .client import MAIL_SEND_PATH
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler of FakeSendGridServer."""
+
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def read_body(self) -> bytes:
+        """Read a request body sent with Content-Length or chunked encoding."""
+        if "Content-Length" in self.headers:
+            return self.rfile.read(int(self.headers["Content-Length"]))
+        chunks = []
+        while size := int(self.rfile.readline().strip() or b"0", 16):
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+        self.rfile.readline()
+        return b"".join(chunks)
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = self.read_body()
+        fake = self.server.fake
+        if self.path != MAIL_SEND_PATH:
+            self.respond(404)
+            return
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.respond(400)
+            return
+        if fake.latency:
+            time.sleep(fake.latency)
+        status = fake.outcome()
+        fake.record(status, payload)
+        if status == 429:
+            self.respond(429, {"Retry-After": str(fake.retry_after)})
+        elif status == 202:
+            self.respond(202, {"X-Message-Id": uuid.uuid4().hex[:22]})
+        else:
+            self.respond(status)
+
+    def respond(self, status: int, headers: Optional[Dict[str, str]] = None) -> None:
+        """Send an empty response."""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeSendGridServer"
+
+
+class FakeSendGridServer:
+    """
+    A threaded HTTP server answering like the mail/send endpoint.
+
+    `latency` is in seconds; `error_rate` and `throttle_rate` are the
+    fractions of requests answered with 500 and 429. With `keep_payloads`
+    the decoded request payloads are kept in `payloads`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        keep_payloads: bool = False,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.keep_payloads = keep_payloads
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = self.accepted = self.errors = self.throttled = 0
+        self.messages = 0
+        self.payloads: List[Dict[str, Any]] = []
+        self.httpd: Optional[_Server] = None
+
+    @property
+    def url(self) -> str:
+        """Return the base URL to use as SENDGRID_API_HOST."""
+        assert self.httpd is not None, "server is not running"
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def outcome(self) -> int:
+        """Draw the status of the next response."""
+        with self.lock:
+            draw = self.random.random()
+        if draw < self.throttle_rate:
+            return 429
+        if draw < self.throttle_rate + self.error_rate:
+            return 500
+        return 202
+
+    def record(self, status: int, payload: Dict[str, Any]) -> None:
+        """Count a handled request."""
+        with self.lock:
+            self.requests += 1
+            if status == 202:
+                self.accepted += 1
+                self.messages += len(payload.get("personalizations", []))
+                if self.keep_payloads:
+                    self.payloads.append(payload)
+            elif status == 429:
+                self.throttled += 1
+            else:
+                self.errors += 1
+
+    def start(self) -> "FakeSendGridServer":
+        """Start serving on a free local port."""
+        self.httpd = _Server(("127.0.0.1", 0), _Handler)
+        self.httpd.fake = self
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self) -> "FakeSendGridServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
@@ -0,0 +1,24 @@
+"""Index backing webhook status updates.
+
+EmailLog is defined in the shared model package, so the index webhook
+events are matched on is created here from `post_migrate` instead of
+through the model's Meta.
+"""
+
+from typing import Any
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .models import EmailLog
+
+
+def install_indexes(using: str = DEFAULT_DB_ALIAS, **kwargs: Any) -> None:
+    """Create the EmailLog message id index; connected to `post_migrate`."""
+    connection = connections[using]
+    table = EmailLog._meta.db_table
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote(f'{table}_message_id_idx')} "
+            f"ON {quote(table)} ({quote('sendgrid_message_id')}, {quote('recipient')})"
+        )
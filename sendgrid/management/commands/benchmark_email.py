@@ -0,0 +1,157 @@
+"""Management command benchmarking the email path against a fake SendGrid."""
+
+import math
+import time
+import tracemalloc
+from typing import Any, List, Tuple
+
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from django.test import override_settings
+
+from sendgrid.backends import SendGridBackend
+from sendgrid.client import reset_client
+from sendgrid.fake_server import FakeSendGridServer
+from sendgrid.models import EmailLog, EmailTemplate
+from sendgrid.outbox import process_outbox
+from sendgrid.utils import send_template_email
+
+BENCHMARK_TEMPLATE = "benchmark"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of `values`."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(fraction * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+class Command(BaseCommand):
+    """Send emails through a local stand-in for the SendGrid API."""
+
+    help = (
+        "Measure email throughput, latency and allocations against a local fake "
+        "of the SendGrid mail/send endpoint. Database writes are rolled back."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--mode",
+            choices=["backend", "template"],
+            default="backend",
+            help="Drive SendGridBackend.send_messages or send_template_email.",
+        )
+        parser.add_argument("--messages", type=int, default=1000)
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Messages per send_messages call or outbox batch.",
+        )
+        parser.add_argument(
+            "--latency", type=float, default=0.0, help="Fake API latency in ms."
+        )
+        parser.add_argument("--error-rate", type=float, default=0.0)
+        parser.add_argument("--throttle-rate", type=float, default=0.0)
+        parser.add_argument(
+            "--rate-limit",
+            type=float,
+            default=0.0,
+            help="SENDGRID_RATE_LIMIT to use; 0 disables the rate limiter.",
+        )
+        parser.add_argument(
+            "--no-batch", action="store_true", help="Send one request per message."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        server = FakeSendGridServer(
+            latency=options["latency"] / 1000,
+            error_rate=options["error_rate"],
+            throttle_rate=options["throttle_rate"],
+            retry_after=0,
+        )
+        with server, override_settings(
+            EMAIL_BACKEND="sendgrid.backends.SendGridBackend",
+            SENDGRID_API_KEY="benchmark",
+            SENDGRID_API_HOST=server.url,
+            SENDGRID_BATCH_SEND=not options["no_batch"],
+            SENDGRID_RATE_LIMIT=options["rate_limit"],
+        ):
+            reset_client()
+            tracemalloc.start()
+            try:
+                with transaction.atomic():
+                    if options["mode"] == "backend":
+                        sent, latencies, elapsed = self.run_backend(options)
+                    else:
+                        sent, latencies, elapsed = self.run_template(options)
+                    transaction.set_rollback(True)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+                reset_client()
+
+        total = options["messages"]
+        self.stdout.write(
+            f"Fake API: {server.requests} requests, {server.throttled} throttled, "
+            f"{server.errors} errors."
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {sent}/{total} emails in {elapsed:.2f}s: "
+                f"{sent / elapsed if elapsed else 0:.0f} msgs/s, "
+                f"p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+                f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms per call, "
+                f"peak {peak / 1024 / 1024:.1f} MiB allocated."
+            )
+        )
+
+    def run_backend(self, options: Any) -> Tuple[int, List[float], float]:
+        """Send alert-style messages in chunks through the backend."""
+        backend = SendGridBackend()
+        messages = []
+        for i in range(options["messages"]):
+            message = EmailMessage(
+                "New jobs for you",
+                "Hi -name-, new jobs match your profile.",
+                "jobs@example.com",
+                [f"user{i}@example.com"],
+            )
+            setattr(message, "substitutions", {"-name-": f"User {i}"})
+            messages.append(message)
+
+        sent = 0
+        latencies = []
+        started = time.perf_counter()
+        chunk_size = max(1, options["chunk_size"])
+        for start in range(0, len(messages), chunk_size):
+            call_started = time.perf_counter()
+            sent += backend.send_messages(messages[start : start + chunk_size])
+            latencies.append(time.perf_counter() - call_started)
+        return sent, latencies, time.perf_counter() - started
+
+    def run_template(self, options: Any) -> Tuple[int, List[float], float]:
+        """Queue template emails, timing each call, then drain the outbox."""
+        EmailTemplate.objects.filter(name=BENCHMARK_TEMPLATE).delete()
+        EmailTemplate.objects.create(
+            name=BENCHMARK_TEMPLATE,
+            subject="New jobs for {{ name }}",
+            html_content="<p>Hi {{ name }}, new jobs match your profile.</p>",
+        )
+        latencies = []
+        started = time.perf_counter()
+        for i in range(options["messages"]):
+            call_started = time.perf_counter()
+            send_template_email(
+                BENCHMARK_TEMPLATE, f"user{i}@example.com", {"name": f"User {i}"}
+            )
+            latencies.append(time.perf_counter() - call_started)
+        process_outbox(max(1, options["chunk_size"]))
+        elapsed = time.perf_counter() - started
+        sent = EmailLog.objects.filter(
+            template__name=BENCHMARK_TEMPLATE, status="sent"
+        ).count()
+        return sent, latencies, elapsed
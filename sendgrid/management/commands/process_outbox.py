@@ -0,0 +1,55 @@
+"""Management command sending queued outbox emails."""
+
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from sendgrid.outbox import BATCH_SIZE, process_outbox
+
+
+class Command(BaseCommand):
+    """Send the emails waiting in the outbox."""
+
+    help = (
+        "Send queued emails. Run several processes with --loop for a worker "
+        "pool; each claims its own batches."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Emails claimed and sent per batch.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for new emails instead of exiting when done.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls of an empty outbox with --loop.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        while True:
+            started = time.monotonic()
+            result = process_outbox(options["batch_size"])
+            elapsed = time.monotonic() - started
+            if result.sent or result.retried or result.failed or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Sent {result.sent} emails ({result.retried} to retry, "
+                        f"{result.failed} failed) in {elapsed:.1f}s."
+                    )
+                )
+            if not options["loop"]:
+                return
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                return
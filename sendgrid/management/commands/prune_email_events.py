@@ -0,0 +1,33 @@
+"""Management command forgetting old SendGrid webhook events."""
+
+import datetime
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from sendgrid.webhooks import apply_pending_events, prune_events
+
+
+class Command(BaseCommand):
+    """Delete the dedupe records of old webhook events."""
+
+    help = (
+        "Apply webhook events still waiting for their email, then forget "
+        "events older than SendGrid's redelivery window."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=3,
+            help="Keep events received within this many days.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        updated = apply_pending_events()
+        self.stdout.write(f"Applied pending webhook events to {updated} emails.")
+        before = timezone.now() - datetime.timedelta(days=options["days"])
+        deleted = prune_events(before)
+        self.stdout.write(self.style.SUCCESS(f"Removed {deleted} webhook events."))
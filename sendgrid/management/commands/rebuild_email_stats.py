@@ -0,0 +1,34 @@
+"""Management command recomputing the daily email statistics."""
+
+import datetime
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from sendgrid.stats import log_day, rebuild_stats
+
+
+class Command(BaseCommand):
+    """Rebuild the daily email rollup from EmailLog."""
+
+    help = "Recount the daily email statistics from the email log."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Only rebuild this many recent days (default: all history).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        started = time.monotonic()
+        since = None
+        if options["days"] is not None:
+            since = log_day(timezone.now() - datetime.timedelta(days=options["days"]))
+        rows = rebuild_stats(since)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {rows} daily statistics rows in {elapsed:.1f}s.")
+        )
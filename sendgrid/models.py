@@ -1,6 +1,123 @@
 """SendGrid models for tracking email statistics and templates."""
 
+from django.db import models
+from django.utils import timezone
+
 # Import models from centralized location
 from recruit_models.sendgrid import EmailLog, EmailTemplate
 
-__all__ = ["EmailTemplate", "EmailLog"]
+
+class OutboxMessage(models.Model):
+    """
+    A rendered email waiting to be handed to the email backend.
+
+    Created together with its pending EmailLog by `sendgrid.outbox.enqueue`
+    and removed by the outbox worker once the email was sent or gave up.
+    """
+
+    log = models.OneToOneField(
+        EmailLog,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="outbox",
+    )
+    text_body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    claim_token = models.UUIDField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Outbox message {self.pk}"
+
+
+class EmailEvent(models.Model):
+    """
+    A SendGrid webhook event already received, kept to drop redeliveries.
+
+    Status events that arrive before their EmailLog has its message id are
+    kept with `applied` unset and applied once the log is recorded as sent.
+    """
+
+    event_id = models.CharField(max_length=100, primary_key=True)
+    event = models.CharField(max_length=32)
+    message_id = models.CharField(max_length=100, blank=True)
+    email = models.EmailField(blank=True)
+    timestamp = models.DateTimeField()
+    applied = models.BooleanField(default=True, db_index=True)
+    received_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.event} event {self.pk}"
+
+
+class EmailDailyStat(models.Model):
+    """
+    How many EmailLogs of a UTC day and template are in a status.
+
+    Maintained incrementally by `sendgrid.stats`; logs without a template
+    are counted under a NULL template.
+    """
+
+    day = models.DateField()
+    # No foreign key constraint: counts outlive deleted templates.
+    template = models.ForeignKey(
+        EmailTemplate,
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "template", "status"],
+                condition=models.Q(template__isnull=False),
+                name="sendgrid_emaildailystat_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["day", "status"],
+                condition=models.Q(template__isnull=True),
+                name="sendgrid_emaildailystat_unique_untemplated",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.count} {self.status} emails on {self.day}"
+
+
+class SendRateLimit(models.Model):
+    """
+    Token bucket state shared by every process sending through a limiter.
+
+    Times are epoch seconds; `version` guards the compare-and-swap updates
+    of `sendgrid.ratelimit`.
+    """
+
+    name = models.CharField(max_length=50, primary_key=True)
+    tokens = models.FloatField(default=0)
+    rate = models.FloatField(default=0)
+    checked_at = models.FloatField(default=0)
+    blocked_until = models.FloatField(default=0)
+    decreased_at = models.FloatField(default=0)
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.name} at {self.rate:.1f} requests/s"
+
+
+__all__ = [
+    "EmailTemplate",
+    "EmailLog",
+    "EmailDailyStat",
+    "EmailEvent",
+    "OutboxMessage",
+    "SendRateLimit",
+]
@@ -0,0 +1,273 @@
+"""Transactional outbox for outgoing email.
+
+`enqueue` stores a rendered email as a pending EmailLog plus an
+OutboxMessage row in the caller's transaction, so web requests never wait
+on the email provider and an email is only sent if the transaction that
+asked for it commits. Worker processes (`manage.py process_outbox`) claim
+due rows in batches, send them and record the outcome; failed sends are
+retried with exponential backoff and jitter until MAX_ATTEMPTS is reached.
+Sends deferred by the rate limiter are rescheduled without counting as an
+attempt. A claim is a lease that other workers respect until it expires;
+it is renewed while the batch is sent, before any request that could
+outlast it.
+"""
+
+import datetime
+import logging
+import random
+import uuid
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .backends import SendGridBackend, SendResult
+from .client import DEFAULT_TIMEOUT, get_client
+from .models import EmailLog, EmailTemplate, OutboxMessage
+from .ratelimit import get_limiter
+from .stats import Deltas, add_deltas, apply_deltas, record_created, transition
+from .webhooks import apply_pending_events
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+LEASE = datetime.timedelta(minutes=5)
+MAX_ATTEMPTS = getattr(settings, "SENDGRID_OUTBOX_MAX_ATTEMPTS", 8)
+BACKOFF_BASE = datetime.timedelta(
+    seconds=getattr(settings, "SENDGRID_OUTBOX_BACKOFF_SECONDS", 30)
+)
+BACKOFF_MAX = datetime.timedelta(hours=6)
+
+# Statuses the provider answers for requests that will never succeed.
+PERMANENT_STATUS_CODES = (400, 413)
+
+
+class OutboxResult(NamedTuple):
+    """Outcome of an outbox run."""
+
+    sent: int
+    retried: int
+    failed: int
+
+
+def enqueue(
+    recipient: str,
+    sender: str,
+    subject: str,
+    text_body: str,
+    html_body: str = "",
+    template: Optional[EmailTemplate] = None,
+) -> EmailLog:
+    """Queue an email for the outbox worker and return its pending log."""
+    with transaction.atomic():
+        log = EmailLog.objects.create(
+            recipient=recipient,
+            sender=sender,
+            subject=subject,
+            template=template,
+            status="pending",
+        )
+        OutboxMessage.objects.create(log=log, text_body=text_body, html_body=html_body)
+        apply_deltas(record_created([log]))
+    return log
+
+
+def backoff(attempts: int) -> datetime.timedelta:
+    """Return the delay before the next try after `attempts` failed ones."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+    # Jitter spreads out retries of emails that failed together.
+    return delay * random.uniform(0.5, 1.0)
+
+
+def due(now: datetime.datetime) -> Q:
+    """Return the condition for rows ready to send and not claimed."""
+    return Q(next_attempt_at__lte=now) & (
+        Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+    )
+
+
+def claim(limit: int, now: datetime.datetime) -> List[OutboxMessage]:
+    """
+    Claim up to `limit` due rows for this worker.
+
+    Rows locked by another worker are skipped rather than waited for. On
+    databases without row locks, such as SQLite, the conditional UPDATE
+    decides: writes are serialized there, and the claim token read back
+    afterwards only matches rows this worker's UPDATE won.
+    """
+    token = uuid.uuid4()
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects.filter(due(now))
+            .order_by("next_attempt_at")
+            .select_for_update(skip_locked=True)
+            .values_list("pk", flat=True)[:limit]
+        )
+        OutboxMessage.objects.filter(due(now), pk__in=ids).update(
+            claimed_until=now + LEASE, claim_token=token
+        )
+    return list(
+        OutboxMessage.objects.filter(pk__in=ids, claim_token=token).select_related(
+            "log"
+        )
+    )
+
+
+def request_time() -> datetime.timedelta:
+    """Return the longest one send can take, rate limit waits included."""
+    timeout = float(getattr(settings, "SENDGRID_TIMEOUT", DEFAULT_TIMEOUT))
+    limiter = get_limiter()
+    if limiter is None:
+        return datetime.timedelta(seconds=timeout)
+    tries = limiter.max_retries + 1
+    return datetime.timedelta(seconds=(limiter.max_wait + timeout) * tries)
+
+
+class Lease:
+    """A worker's claim on a batch of rows, renewed while it is sent."""
+
+    def __init__(self, rows: List[OutboxMessage], now: datetime.datetime) -> None:
+        self.ids = [row.pk for row in rows]
+        self.token = rows[0].claim_token if rows else None
+        self.until = now + LEASE
+        self.margin = request_time()
+
+    def renew(self) -> None:
+        """Extend the lease if the next send could outlast it."""
+        now = timezone.now()
+        if self.until - now > self.margin:
+            return
+        self.until = now + LEASE + self.margin
+        OutboxMessage.objects.filter(pk__in=self.ids, claim_token=self.token).update(
+            claimed_until=self.until
+        )
+
+
+def build_message(row: OutboxMessage) -> EmailMultiAlternatives:
+    """Build the email of an outbox row."""
+    message = EmailMultiAlternatives(
+        subject=row.log.subject,
+        body=row.text_body,
+        from_email=row.log.sender,
+        to=[row.log.recipient],
+    )
+    if row.html_body:
+        message.attach_alternative(row.html_body, "text/html")
+    return message
+
+
+def send_all(
+    connection: Any,
+    messages: List[EmailMultiAlternatives],
+    before_request: Optional[Callable[[], None]] = None,
+) -> List[SendResult]:
+    """Send messages and return a result for each of them."""
+    if isinstance(connection, SendGridBackend) and connection.api_key:
+        return connection.send_batch(get_client(), messages, before_request)
+    results = []
+    for message in messages:
+        if before_request is not None:
+            before_request()
+        try:
+            sent = bool(connection.send_messages([message]))
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Error sending email to %s: %s", message.to, e)
+            sent = False
+        message_id = getattr(message, "sendgrid_message_id", "")
+        results.append(SendResult(message, sent, message_id=message_id))
+    return results
+
+
+def record(
+    rows: List[OutboxMessage], results: List[SendResult], now: datetime.datetime
+) -> OutboxResult:
+    """Store the outcome of sending claimed rows."""
+    sent: Dict[str, List[Any]] = {}
+    failed: Dict[str, List[Any]] = {}
+    retry = []
+    for row, result in zip(rows, results):
+        if result.sent:
+            sent.setdefault(result.message_id, []).append(row.pk)
+            continue
+        if result.deferred:
+            # Rate limited: try again soon without using up an attempt.
+            row.next_attempt_at = now + backoff(1)
+            row.last_error = "Deferred by the SendGrid rate limit"
+        else:
+            error = (
+                f"Email provider returned status {result.status_code}"
+                if result.status_code
+                else "Email backend did not send the message"
+            )
+            row.attempts += 1
+            if (
+                result.status_code in PERMANENT_STATUS_CODES
+                or row.attempts >= MAX_ATTEMPTS
+            ):
+                failed.setdefault(error, []).append(row.pk)
+                continue
+            row.next_attempt_at = now + backoff(row.attempts)
+            row.last_error = error
+        row.claimed_until = None
+        row.claim_token = None
+        retry.append(row)
+
+    with transaction.atomic():
+        deltas: Deltas = {}
+        for message_id, ids in sent.items():
+            _, changes = transition(
+                EmailLog.objects.filter(pk__in=ids),
+                "sent",
+                sendgrid_message_id=message_id,
+            )
+            add_deltas(deltas, changes)
+        for error, ids in failed.items():
+            _, changes = transition(
+                EmailLog.objects.filter(pk__in=ids), "failed", error_message=error
+            )
+            add_deltas(deltas, changes)
+        apply_deltas(deltas)
+        # Webhook events that arrived before the message ids were stored.
+        apply_pending_events(sent)
+        done = [pk for ids in (*sent.values(), *failed.values()) for pk in ids]
+        OutboxMessage.objects.filter(pk__in=done).delete()
+        OutboxMessage.objects.bulk_update(
+            retry,
+            [
+                "attempts",
+                "next_attempt_at",
+                "claimed_until",
+                "claim_token",
+                "last_error",
+            ],
+        )
+    return OutboxResult(
+        sum(map(len, sent.values())), len(retry), sum(map(len, failed.values()))
+    )
+
+
+def process_outbox(
+    batch_size: int = BATCH_SIZE, connection: Optional[Any] = None
+) -> OutboxResult:
+    """Send every due outbox email, one claimed batch at a time."""
+    sent = retried = failed = 0
+    connection = connection or get_connection()
+    with connection:
+        while True:
+            now = timezone.now()
+            rows = claim(batch_size, now)
+            if not rows:
+                break
+            results = send_all(
+                connection,
+                [build_message(row) for row in rows],
+                before_request=Lease(rows, now).renew,
+            )
+            result = record(rows, results, timezone.now())
+            sent += result.sent
+            retried += result.retried
+            failed += result.failed
+    return OutboxResult(sent, retried, failed)
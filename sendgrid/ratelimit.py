@@ -0,0 +1,191 @@
+"""Adaptive rate limiting of SendGrid API requests across processes.
+
+Every process sending email draws request tokens from one token bucket
+stored in a SendRateLimit row. The bucket refills at the current rate,
+which starts at `SENDGRID_RATE_LIMIT` requests per second. Rejections
+(429 and 5xx responses) halve it, at most once per second however many
+workers see them, and each success adds back a twentieth of the ceiling:
+additive increase, multiplicative decrease. A Retry-After header blocks
+every process until it has passed. The row is updated by compare-and-swap
+on its version, so the bucket stays consistent on databases without row
+locks.
+"""
+
+import datetime
+import email.utils
+import logging
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+from django.conf import settings
+
+from .models import SendRateLimit
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+DECREASE_FACTOR = 0.5
+DECREASE_INTERVAL = 1.0
+INCREASE_STEPS = 20
+MAX_CAS_ATTEMPTS = 10
+
+T = TypeVar("T")
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> float:
+    """Return the seconds a Retry-After header asks to wait (0 if none)."""
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, retry_at.timestamp() - (time.time() if now is None else now))
+
+
+class RateLimiter:
+    """
+    A token bucket of API requests shared through the database.
+
+    `max_rate` is the account's requests per second ceiling, `burst` the
+    bucket size and `max_wait` the longest `acquire` waits before giving up.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_rate: float,
+        burst: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        max_wait: float = 60.0,
+        max_retries: int = 3,
+        clock: Optional[Callable[[], float]] = None,
+        sleep: Optional[Callable[[float], Any]] = None,
+    ) -> None:
+        self.name = name
+        self.max_rate = max_rate
+        self.burst = burst or max_rate
+        self.min_rate = min_rate or max_rate / INCREASE_STEPS
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.clock = clock or time.time
+        self.sleep = sleep or time.sleep
+        # The shared rate as last seen by this process.
+        self.rate = max_rate
+
+    def _load(self) -> SendRateLimit:
+        """Return the bucket row, creating it full on first use."""
+        row = SendRateLimit.objects.filter(pk=self.name).first()
+        if row is None:
+            SendRateLimit.objects.bulk_create(
+                [
+                    SendRateLimit(
+                        name=self.name,
+                        tokens=self.burst,
+                        rate=self.max_rate,
+                        checked_at=self.clock(),
+                    )
+                ],
+                ignore_conflicts=True,
+            )
+            row = SendRateLimit.objects.get(pk=self.name)
+        return row
+
+    def _update(self, change: Callable[[SendRateLimit, float], T]) -> Optional[T]:
+        """
+        Refill the bucket, apply `change` to it and store it.
+
+        Returns the result of `change`, or None if other processes kept
+        winning the compare-and-swap.
+        """
+        for _ in range(MAX_CAS_ATTEMPTS):
+            row = self._load()
+            version = row.version
+            now = self.clock()
+            # Configuration may have changed since the row was written.
+            row.rate = min(max(row.rate, self.min_rate), self.max_rate)
+            elapsed = max(0.0, now - row.checked_at)
+            row.tokens = min(self.burst, row.tokens + elapsed * row.rate)
+            row.checked_at = now
+            result = change(row, now)
+            updated = SendRateLimit.objects.filter(
+                pk=self.name, version=version
+            ).update(
+                tokens=row.tokens,
+                rate=row.rate,
+                checked_at=row.checked_at,
+                blocked_until=row.blocked_until,
+                decreased_at=row.decreased_at,
+                version=version + 1,
+            )
+            if updated:
+                self.rate = row.rate
+                return result
+        return None
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take `tokens` if available; otherwise return the seconds to wait."""
+
+        def take(row: SendRateLimit, now: float) -> float:
+            if row.blocked_until > now:
+                return row.blocked_until - now
+            if row.tokens >= tokens:
+                row.tokens -= tokens
+                return 0.0
+            return (tokens - row.tokens) / row.rate
+
+        wait = self._update(take)
+        return 1.0 / self.max_rate if wait is None else wait
+
+    def acquire(self, tokens: float = 1.0) -> bool:
+        """Wait for `tokens`; return False if that would take over `max_wait`."""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            if waited + wait > self.max_wait:
+                return False
+            self.sleep(wait)
+            waited += wait
+
+    def record(self, status_code: int, retry_after: float = 0.0) -> None:
+        """Adapt the shared rate to the status of an API response."""
+        if status_code in RETRYABLE_STATUS_CODES:
+
+            def slow_down(row: SendRateLimit, now: float) -> None:
+                if now - row.decreased_at >= DECREASE_INTERVAL:
+                    row.rate = max(self.min_rate, row.rate * DECREASE_FACTOR)
+                    row.decreased_at = now
+                if status_code == 429:
+                    row.tokens = min(row.tokens, 0.0)
+                if retry_after:
+                    row.blocked_until = max(row.blocked_until, now + retry_after)
+
+            self._update(slow_down)
+        elif status_code < 400 and self.rate < self.max_rate:
+
+            def speed_up(row: SendRateLimit, now: float) -> None:
+                row.rate = min(self.max_rate, row.rate + self.max_rate / INCREASE_STEPS)
+
+            self._update(speed_up)
+
+
+def get_limiter() -> Optional[RateLimiter]:
+    """Return the limiter configured in settings, or None if disabled."""
+    max_rate = float(getattr(settings, "SENDGRID_RATE_LIMIT", 0) or 0)
+    if max_rate <= 0:
+        return None
+    return RateLimiter(
+        "sendgrid",
+        max_rate,
+        burst=getattr(settings, "SENDGRID_RATE_BURST", None),
+        max_wait=getattr(settings, "SENDGRID_RATE_MAX_WAIT", 60.0),
+        max_retries=getattr(settings, "SENDGRID_MAX_RETRIES", 3),
+    )
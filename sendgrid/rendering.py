@@ -0,0 +1,110 @@
+"""Compiled EmailTemplate cache and bulk rendering.
+
+Parsing a template is far more expensive than rendering it, so the parsed
+subject, HTML and plain-text templates of each EmailTemplate are kept in a
+per-process LRU cache keyed on (name, updated_at). Saving a template bumps
+`updated_at`, which makes every process miss and recompile; the local entry
+is also dropped right away by a signal handler. Cache hits only load the
+template's name and timestamp, not its content.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+
+from django.conf import settings
+from django.template import Context, Template
+from django.utils.html import strip_tags
+
+from .models import EmailTemplate
+
+CACHE_SIZE = getattr(settings, "SENDGRID_TEMPLATE_CACHE_SIZE", 128)
+CONTENT_FIELDS = ("subject", "html_content", "plain_content")
+
+
+class CompiledTemplate(NamedTuple):
+    """The parsed parts of an EmailTemplate."""
+
+    subject: Template
+    html: Optional[Template]
+    plain: Optional[Template]
+
+
+class RenderedEmail(NamedTuple):
+    """An EmailTemplate rendered for one context."""
+
+    subject: str
+    html_content: str
+    plain_content: str
+
+
+_cache: "OrderedDict[Tuple[str, Any], CompiledTemplate]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_template(name: str) -> EmailTemplate:
+    """Return an active template without loading its content."""
+    return EmailTemplate.objects.only("pk", "name", "updated_at", "is_active").get(
+        name=name, is_active=True
+    )
+
+
+def compile_template(template: EmailTemplate) -> CompiledTemplate:
+    """Return the parsed parts of a template, from the cache if possible."""
+    key = (template.name, template.updated_at)
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+
+    deferred = template.get_deferred_fields().intersection(CONTENT_FIELDS)
+    if deferred:
+        template.refresh_from_db(fields=list(deferred))
+    compiled = CompiledTemplate(
+        subject=Template(template.subject),
+        html=Template(template.html_content) if template.html_content else None,
+        plain=Template(template.plain_content) if template.plain_content else None,
+    )
+    with _cache_lock:
+        _cache[key] = compiled
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def invalidate(name: str) -> None:
+    """Drop every cached version of a template."""
+    with _cache_lock:
+        for key in [key for key in _cache if key[0] == name]:
+            del _cache[key]
+
+
+def clear_cache() -> None:
+    """Drop every cached template."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def render(compiled: CompiledTemplate, context: Dict[str, Any]) -> RenderedEmail:
+    """Render compiled template parts with one context."""
+    template_context = Context(context)
+    html_content = compiled.html.render(template_context) if compiled.html else ""
+    if compiled.plain:
+        plain_content = compiled.plain.render(template_context)
+    else:
+        plain_content = strip_tags(html_content)
+    return RenderedEmail(
+        compiled.subject.render(template_context), html_content, plain_content
+    )
+
+
+def render_many(
+    template: Union[EmailTemplate, str], contexts: Iterable[Dict[str, Any]]
+) -> Iterator[RenderedEmail]:
+    """Render a template, given by instance or name, once per context."""
+    if isinstance(template, str):
+        template = get_template(template)
+    compiled = compile_template(template)
+    return (render(compiled, context) for context in contexts)
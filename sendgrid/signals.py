@@ -0,0 +1,16 @@
+"""Signal handlers keeping the compiled template cache current."""
+
+from typing import Any
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import EmailTemplate
+from .rendering import invalidate
+
+
+@receiver(post_save, sender=EmailTemplate)
+@receiver(post_delete, sender=EmailTemplate)
+def invalidate_template(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Drop the compiled versions of a changed template."""
+    invalidate(instance.name)
@@ -0,0 +1,135 @@
+"""Incrementally maintained daily email statistics.
+
+EmailDailyStat holds, per UTC day of `EmailLog.sent_at`, template and
+status, how many logs are in that status. Code that creates logs or
+changes their status goes through `record_created` and `transition`, which
+return the rollup changes to apply with `apply_deltas` in the same
+transaction. Statistics for a window then sum a few rows per day instead
+of counting every log. `rebuild_stats` recounts the rollup from EmailLog
+and repairs it after writes that bypassed these helpers.
+"""
+
+import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, QuerySet
+from django.db.models.functions import TruncDate
+
+from .models import EmailDailyStat, EmailLog
+
+REBUILD_BATCH_SIZE = 500
+
+# (day, template id, status)
+StatKey = Tuple[datetime.date, Optional[int], str]
+Deltas = Dict[StatKey, int]
+
+
+def log_day(sent_at: datetime.datetime) -> datetime.date:
+    """Return the UTC day a log is counted on."""
+    return sent_at.astimezone(datetime.timezone.utc).date()
+
+
+def day_range(day: datetime.date) -> Tuple[datetime.datetime, datetime.datetime]:
+    """Return the start and end of a UTC day."""
+    start = datetime.datetime.combine(day, datetime.time(), datetime.timezone.utc)
+    return start, start + datetime.timedelta(days=1)
+
+
+def add_deltas(total: Deltas, deltas: Deltas) -> Deltas:
+    """Add `deltas` into `total` and return it."""
+    for key, value in deltas.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def record_created(logs: Iterable[EmailLog]) -> Deltas:
+    """Return the rollup changes of newly created logs."""
+    deltas: Deltas = {}
+    for log in logs:
+        add_deltas(deltas, {(log_day(log.sent_at), log.template_id, log.status): 1})
+    return deltas
+
+
+def transition(
+    queryset: "QuerySet[EmailLog]", status: str, **fields: Any
+) -> Tuple[int, Deltas]:
+    """
+    Move the logs of `queryset` to `status`.
+
+    The rows are updated with one UPDATE per (day, template, old status)
+    group, so each group's row count, and with it the rollup change, is
+    exact even when other writers change the same logs concurrently.
+    Returns the number of rows updated and the rollup changes.
+    """
+    groups = list(
+        queryset.exclude(status=status)
+        .annotate(day=TruncDate("sent_at", tzinfo=datetime.timezone.utc))
+        .values_list("day", "template_id", "status")
+        .distinct()
+        .order_by()
+    )
+    updated = 0
+    deltas: Deltas = {}
+    for day, template_id, old_status in groups:
+        start, end = day_range(day)
+        count = queryset.filter(
+            status=old_status,
+            template_id=template_id,
+            sent_at__gte=start,
+            sent_at__lt=end,
+        ).update(status=status, **fields)
+        updated += count
+        add_deltas(
+            deltas,
+            {(day, template_id, old_status): -count, (day, template_id, status): count},
+        )
+    return updated, deltas
+
+
+def apply_deltas(deltas: Deltas) -> None:
+    """Add rollup changes, creating missing rollup rows."""
+    changes = sorted(
+        ((key, value) for key, value in deltas.items() if value),
+        key=lambda item: (item[0][0], item[0][1] or 0, item[0][2]),
+    )
+    if not changes:
+        return
+    EmailDailyStat.objects.bulk_create(
+        [
+            EmailDailyStat(day=day, template_id=template_id, status=status)
+            for (day, template_id, status), _ in changes
+        ],
+        ignore_conflicts=True,
+    )
+    for (day, template_id, status), value in changes:
+        EmailDailyStat.objects.filter(
+            day=day, template_id=template_id, status=status
+        ).update(count=F("count") + value)
+
+
+def rebuild_stats(since: Optional[datetime.date] = None) -> int:
+    """Recount the rollup from EmailLog, from `since` on (default: all days)."""
+    logs = EmailLog.objects.all()
+    stale = EmailDailyStat.objects.all()
+    if since is not None:
+        logs = logs.filter(sent_at__gte=day_range(since)[0])
+        stale = stale.filter(day__gte=since)
+    rows = (
+        logs.annotate(day=TruncDate("sent_at", tzinfo=datetime.timezone.utc))
+        .values_list("day", "template_id", "status")
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+    with transaction.atomic():
+        stale.delete()
+        created = EmailDailyStat.objects.bulk_create(
+            [
+                EmailDailyStat(
+                    day=day, template_id=template_id, status=status, count=count
+                )
+                for day, template_id, status, count in rows
+            ],
+            batch_size=REBUILD_BATCH_SIZE,
+        )
+    return len(created)
@@ -1,25 +1,66 @@
 """Tests for SendGrid integration."""
 
-from unittest.mock import Mock, patch
-from django.test import TestCase, override_settings
+import base64
+import datetime
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import MagicMock, Mock, patch
+
+from django.core import mail
+from django.core.management import call_command
+from django.core.files import File
 from django.core.mail import EmailMessage
+from django.db import connection, transaction
+from django.template import Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
-from .backends import SendGridBackend
-from .models import EmailTemplate, EmailLog
-from .utils import send_template_email
+from .attachments import Attachment, base64_chunks, json_stream
+from .backends import SendGridBackend, SendResult
+from .client import connection_stats, get_client, reset_client
+from .fake_server import FakeSendGridServer
+from .models import (
+    EmailDailyStat,
+    EmailEvent,
+    EmailLog,
+    EmailTemplate,
+    OutboxMessage,
+    SendRateLimit,
+)
+from .outbox import (
+    LEASE,
+    MAX_ATTEMPTS,
+    Lease,
+    OutboxResult,
+    claim,
+    enqueue,
+    process_outbox,
+)
+from .ratelimit import RateLimiter, parse_retry_after
+from .rendering import RenderedEmail, clear_cache, render_many
+from .stats import rebuild_stats
+from .utils import get_email_statistics, send_template_email
+from .webhooks import verify_signature
 
 
 class SendGridBackendTest(TestCase):
     """Test cases for SendGrid email backend."""
     
     @override_settings(SENDGRID_API_KEY='test-api-key')
-    @patch('sendgrid.SendGridAPIClient')
-    def test_send_messages_success(self, mock_sg_client):
+    @patch('sendgrid.backends.get_client')
+    def test_send_messages_success(self, mock_get_client):
         """Test successful email sending."""
         # Setup mock
         mock_response = Mock()
         mock_response.status_code = 202
-        mock_sg_client.return_value.send.return_value = mock_response
+        mock_response.headers = {'X-Message-Id': 'abc123'}
+        mock_get_client.return_value.send.return_value = mock_response
         
         # Create backend and message
         backend = SendGridBackend()
@@ -31,11 +72,15 @@ class SendGridBackendTest(TestCase):
         )
         
         # Send message
-        with patch('sendgrid.SendGridAPIClient', mock_sg_client):
-            num_sent = backend.send_messages([message])
+        num_sent = backend.send_messages([message])
         
         self.assertEqual(num_sent, 1)
-        mock_sg_client.return_value.send.assert_called_once()
+        mock_get_client.return_value.send.assert_called_once()
+        payload = mock_get_client.return_value.send.call_args[0][0]
+        self.assertEqual(
+            payload['personalizations'], [{'to': [{'email': 'to@example.com'}]}]
+        )
+        self.assertEqual(message.sendgrid_message_id, 'abc123')
     
     @override_settings(SENDGRID_API_KEY=None)
     def test_send_messages_no_credentials(self):
@@ -51,6 +96,378 @@ class SendGridBackendTest(TestCase):
         num_sent = backend.send_messages([message])
         self.assertEqual(num_sent, 0)
 
+    @override_settings(SENDGRID_API_KEY=None, SENDGRID_USER='legacy-user')
+    def test_legacy_credentials_are_not_used(self):
+        """Test that username/password settings do not authenticate a send."""
+        backend = SendGridBackend(fail_silently=True)
+        message = EmailMessage(
+            subject='Test Subject',
+            body='Test Body',
+            from_email='from@example.com',
+            to=['to@example.com']
+        )
+
+        with self.assertLogs('sendgrid.backends', 'WARNING') as logs:
+            self.assertEqual(backend.send_messages([message]), 0)
+        self.assertIn('only accepts API keys', logs.output[0])
+
+
+class SendGridBatchTest(TestCase):
+    """Test cases for batched sending through personalizations."""
+
+    def setUp(self):
+        """Set up a mocked client recording every payload."""
+        self.client = Mock()
+        self.client.send.side_effect = self.respond
+        self.payloads = []
+        self.rejected = set()
+        self.backend = SendGridBackend()
+
+    def respond(self, payload, attachments=()):
+        """Accept a payload unless it addresses a rejected recipient."""
+        self.payloads.append(payload)
+        recipients = {
+            to['email']
+            for personalization in payload['personalizations']
+            for to in personalization['to']
+        }
+        response = Mock()
+        response.status_code = 400 if recipients & self.rejected else 202
+        response.headers = {'X-Message-Id': f'id{len(self.payloads)}'}
+        return response
+
+    def alert(self, recipient, body='New jobs for you', **attrs):
+        """Build a job alert message."""
+        message = EmailMessage(
+            f'Alert for {recipient}', body, 'jobs@example.com', [recipient]
+        )
+        for name, value in attrs.items():
+            setattr(message, name, value)
+        return message
+
+    def test_compatible_messages_share_a_request(self):
+        """Test that messages differing in recipient and subject are batched."""
+        messages = [
+            self.alert(f'user{i}@example.com', substitutions={'-name-': f'User {i}'})
+            for i in range(3)
+        ]
+        results = self.backend.send_batch(self.client, messages)
+
+        self.assertEqual(len(self.payloads), 1)
+        personalizations = self.payloads[0]['personalizations']
+        self.assertEqual(len(personalizations), 3)
+        self.assertEqual(personalizations[1]['to'], [{'email': 'user1@example.com'}])
+        self.assertEqual(personalizations[1]['subject'], 'Alert for user1@example.com')
+        self.assertEqual(personalizations[2]['substitutions'], {'-name-': 'User 2'})
+        self.assertEqual([result.message for result in results], messages)
+        self.assertTrue(all(result.sent for result in results))
+        self.assertEqual(messages[2].sendgrid_message_id, 'id1')
+
+    def test_incompatible_messages_are_split(self):
+        """Test that different content or attachments get their own requests."""
+        with_attachment = self.alert('c@example.com')
+        with_attachment.attach('cv.txt', 'resume', 'text/plain')
+        messages = [
+            self.alert('a@example.com'),
+            self.alert('b@example.com', body='Other body'),
+            with_attachment,
+            self.alert('d@example.com'),
+        ]
+        results = self.backend.send_batch(self.client, messages)
+
+        self.assertEqual(len(self.payloads), 3)
+        self.assertEqual(
+            sorted(len(payload['personalizations']) for payload in self.payloads),
+            [1, 1, 2],
+        )
+        self.assertEqual([result.message for result in results], messages)
+
+    def test_batches_respect_personalization_limit(self):
+        """Test that large fan-outs are split into requests of 1000."""
+        messages = [self.alert(f'user{i}@example.com') for i in range(2500)]
+        with override_settings(SENDGRID_API_KEY='test-api-key'):
+            with patch('sendgrid.backends.get_client', return_value=self.client):
+                num_sent = SendGridBackend().send_messages(messages)
+
+        self.assertEqual(num_sent, 2500)
+        self.assertEqual(
+            [len(payload['personalizations']) for payload in self.payloads],
+            [1000, 1000, 500],
+        )
+
+    def test_rejected_batch_falls_back_to_single_sends(self):
+        """Test that one bad recipient only fails its own message."""
+        self.rejected.add('bad@example.com')
+        messages = [
+            self.alert('a@example.com'),
+            self.alert('bad@example.com'),
+            self.alert('b@example.com'),
+        ]
+        results = self.backend.send_batch(self.client, messages)
+
+        self.assertEqual(len(self.payloads), 4)
+        self.assertEqual([result.sent for result in results], [True, False, True])
+        self.assertEqual(results[1].status_code, 400)
+
+
+class RateLimiterTest(TestCase):
+    """Test cases for the shared adaptive rate limiter."""
+
+    def setUp(self):
+        """Set up a fake clock."""
+        self.now = 1000.0
+        self.slept = []
+
+    def sleep(self, seconds):
+        """Advance the fake clock instead of sleeping."""
+        self.slept.append(seconds)
+        self.now += seconds
+
+    def limiter(self, **kwargs):
+        """Build a limiter of 10 requests/s on the fake clock."""
+        return RateLimiter(
+            'test', 10.0, clock=lambda: self.now, sleep=self.sleep, **kwargs
+        )
+
+    def test_bucket_is_shared(self):
+        """Test that limiters in different processes draw from one bucket."""
+        first, second = self.limiter(burst=2), self.limiter(burst=2)
+
+        self.assertEqual(first.try_acquire(), 0)
+        self.assertEqual(second.try_acquire(), 0)
+        self.assertAlmostEqual(first.try_acquire(), 0.1)
+
+        self.assertTrue(second.acquire())
+        self.assertEqual(len(self.slept), 1)
+        self.assertAlmostEqual(self.slept[0], 0.1)
+
+    def test_rejections_slow_down_and_successes_recover(self):
+        """Test additive increase and multiplicative decrease of the rate."""
+        limiter = self.limiter()
+        limiter.record(503)
+        limiter.record(503)
+        self.assertEqual(SendRateLimit.objects.get().rate, 5.0)
+
+        self.now += 1
+        limiter.record(503)
+        self.assertEqual(limiter.rate, 2.5)
+        for _ in range(20):
+            limiter.record(202)
+        self.assertEqual(SendRateLimit.objects.get().rate, 10.0)
+
+    def test_retry_after_blocks_everyone(self):
+        """Test that a 429 with Retry-After pauses the bucket."""
+        self.limiter().record(429, parse_retry_after('5'))
+
+        self.assertAlmostEqual(self.limiter().try_acquire(), 5.0)
+        self.assertFalse(self.limiter(max_wait=1).acquire())
+
+    def test_retry_after_dates(self):
+        """Test that HTTP-date Retry-After values are understood."""
+        self.assertEqual(
+            parse_retry_after('Thu, 01 Jan 1970 00:01:00 GMT', now=30), 30
+        )
+        self.assertEqual(parse_retry_after('soon'), 0)
+
+    @override_settings(SENDGRID_API_KEY='key')
+    @patch('sendgrid.backends.get_client')
+    def test_backend_retries_rejected_sends(self, get_client):
+        """Test that a 429 is waited out and the send retried."""
+        throttled = Mock(status_code=429, headers={'Retry-After': '2'})
+        accepted = Mock(status_code=202, headers={'X-Message-Id': 'abc'})
+        get_client.return_value.send.side_effect = [throttled, accepted]
+
+        message = EmailMessage('Hi', 'Body', 'from@example.com', ['to@example.com'])
+        with patch('sendgrid.backends.get_limiter', return_value=self.limiter()):
+            self.assertEqual(SendGridBackend().send_messages([message]), 1)
+
+        self.assertEqual(get_client.return_value.send.call_count, 2)
+        self.assertEqual(self.slept, [2.0])
+
+    @override_settings(SENDGRID_API_KEY='key')
+    @patch('sendgrid.backends.get_client')
+    def test_backend_defers_sends_over_max_wait(self, get_client):
+        """Test that a send the limiter will not wait for is deferred."""
+        self.limiter().record(429, parse_retry_after('120'))
+
+        message = EmailMessage('Hi', 'Body', 'from@example.com', ['to@example.com'])
+        with patch('sendgrid.backends.get_limiter', return_value=self.limiter()):
+            result, = SendGridBackend().send_batch(get_client.return_value, [message])
+
+        self.assertEqual((result.sent, result.deferred), (False, True))
+        get_client.return_value.send.assert_not_called()
+
+
+class StreamingAttachmentTest(TestCase):
+    """Test cases for attachments encoded while the request is sent."""
+
+    def temp_file(self, size):
+        """Return the path of a temporary file of random bytes."""
+        handle = tempfile.NamedTemporaryFile(delete=False)
+        self.addCleanup(os.unlink, handle.name)
+        with handle:
+            for _ in range(size // 65536):
+                handle.write(os.urandom(65536))
+            handle.write(os.urandom(size % 65536))
+        return handle.name
+
+    def test_chunks_concatenate_to_full_encoding(self):
+        """Test that chunked encoding matches encoding the whole content."""
+
+        class ShortReads(io.BytesIO):
+            def read(self, size=-1):
+                return super().read(min(size, 5))
+
+        for size in (0, 1, 2, 3, 100, 1001):
+            data = os.urandom(size)
+            for chunk_size in (3, 4, 7, 3000):
+                for stream in (io.BytesIO(data), ShortReads(data)):
+                    encoded = b''.join(base64_chunks(stream, chunk_size))
+                    self.assertEqual(encoded, base64.b64encode(data))
+
+    def test_body_is_the_json_payload(self):
+        """Test that the streamed body is the payload with its attachments."""
+        path = self.temp_file(70000)
+        attachments = [
+            Attachment('notes.txt', 'plain text', 'text/plain'),
+            Attachment('resume.pdf', File(open(path, 'rb')), 'application/pdf'),
+        ]
+        self.addCleanup(attachments[1].content.close)
+
+        body = json.loads(b''.join(json_stream({'subject': 'Hi'}, attachments)))
+
+        self.assertEqual(body['subject'], 'Hi')
+        self.assertEqual(
+            [(a['filename'], a['type']) for a in body['attachments']],
+            [('notes.txt', 'text/plain'), ('resume.pdf', 'application/pdf')],
+        )
+        with open(path, 'rb') as handle:
+            self.assertEqual(
+                base64.b64decode(body['attachments'][1]['content']), handle.read()
+            )
+
+    def test_closed_files_are_reopened_and_closed_again(self):
+        """Test that a closed FieldFile-like attachment is opened for the send."""
+        document = File(open(self.temp_file(10), 'rb'))
+        document.close()
+
+        chunks = list(Attachment('cv.pdf', document).base64_chunks())
+
+        self.assertEqual(len(base64.b64decode(b''.join(chunks))), 10)
+        self.assertTrue(document.closed)
+
+    def test_memory_stays_flat(self):
+        """Test that encoding a large file only holds a few chunks at once."""
+        path = self.temp_file(8 * 1024 * 1024)
+        with open(path, 'rb') as handle:
+            tracemalloc.start()
+            try:
+                for _ in json_stream({}, [Attachment('big.bin', handle)]):
+                    pass
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        self.assertLess(peak, 1024 * 1024)
+
+    def test_backend_streams_attachments(self):
+        """Test an attachment sent through the backend to a local server."""
+        server = FakeSendGridServer(keep_payloads=True).start()
+        self.addCleanup(server.stop)
+        self.addCleanup(reset_client)
+        path = self.temp_file(300000)
+        message = EmailMessage('Packet', 'Body', 'from@example.com', ['to@example.com'])
+        with open(path, 'rb') as handle:
+            message.attach('resume.pdf', File(handle), 'application/pdf')
+            with override_settings(
+                SENDGRID_API_KEY='key', SENDGRID_API_HOST=server.url
+            ):
+                self.assertEqual(SendGridBackend().send_messages([message]), 1)
+            handle.seek(0)
+            expected = handle.read()
+
+        attachment, = server.payloads[0]['attachments']
+        self.assertEqual(base64.b64decode(attachment['content']), expected)
+
+
+class SendGridClientTest(TestCase):
+    """Test cases for the pooled SendGrid client."""
+
+    def setUp(self):
+        """Start a local HTTP server to send to."""
+        self.server = FakeSendGridServer().start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(reset_client)
+        self.host = self.server.url
+
+    def test_connections_are_reused(self):
+        """Test that consecutive sends share one kept-alive connection."""
+        with override_settings(SENDGRID_API_KEY='key', SENDGRID_API_HOST=self.host):
+            backend = SendGridBackend()
+            messages = [
+                EmailMessage(
+                    'Subject', f'Body {i}', 'from@example.com', ['to@example.com']
+                )
+                for i in range(5)
+            ]
+            self.assertEqual(backend.send_messages(messages), 5)
+            self.assertIs(get_client(), get_client())
+            stats = connection_stats()
+        self.assertEqual((stats.requests, stats.connections), (5, 1))
+        self.assertEqual(stats.reused, 4)
+
+
+class FakeSendGridServerTest(TestCase):
+    """Test cases for the fake mail/send endpoint and the benchmark command."""
+
+    def setUp(self):
+        """Send through the backend to a fresh client."""
+        self.addCleanup(reset_client)
+
+    def send(self, server, count=3):
+        """Send `count` messages to `server` and return how many were sent."""
+        messages = [
+            EmailMessage('Hi', 'Body', 'from@example.com', [f'to{i}@example.com'])
+            for i in range(count)
+        ]
+        with override_settings(SENDGRID_API_KEY='key', SENDGRID_API_HOST=server.url):
+            reset_client()
+            return SendGridBackend().send_messages(messages)
+
+    def test_accepts_and_counts_messages(self):
+        """Test that accepted requests are counted per personalization."""
+        with FakeSendGridServer(keep_payloads=True) as server:
+            with override_settings(SENDGRID_BATCH_SEND=True):
+                self.assertEqual(self.send(server), 3)
+        self.assertEqual((server.requests, server.accepted), (1, 1))
+        self.assertEqual(server.messages, 3)
+        self.assertEqual(len(server.payloads[0]['personalizations']), 3)
+
+    def test_server_errors_fail_the_send(self):
+        """Test that a server answering 500 leaves messages unsent."""
+        with FakeSendGridServer(error_rate=1) as server:
+            self.assertEqual(self.send(server, 1), 0)
+        self.assertEqual(server.accepted, 0)
+        self.assertGreaterEqual(server.errors, 1)
+
+    def test_throttled_requests_are_retried(self):
+        """Test that 429 responses are retried by the rate limiter."""
+        with FakeSendGridServer(throttle_rate=0.5, retry_after=0, seed=1) as server:
+            with override_settings(SENDGRID_RATE_LIMIT=1000, SENDGRID_MAX_RETRIES=10):
+                self.assertEqual(self.send(server, 5), 5)
+        self.assertEqual(server.messages, 5)
+        self.assertGreater(server.throttled, 0)
+
+    def test_benchmark_command(self):
+        """Test that the benchmark reports throughput in both modes."""
+        for mode in ('backend', 'template'):
+            out = io.StringIO()
+            call_command(
+                'benchmark_email', mode=mode, messages=20, chunk_size=5, stdout=out
+            )
+            self.assertIn('Sent 20/20 emails', out.getvalue())
+            self.assertIn('msgs/s', out.getvalue())
+        self.assertFalse(EmailLog.objects.filter(template__name='benchmark').exists())
+
 
 class EmailTemplateTest(TestCase):
     """Test cases for EmailTemplate model."""
@@ -80,23 +497,408 @@ class EmailUtilsTest(TestCase):
             plain_content='Hello {{ name }}, welcome!'
         )
     
-    @patch('sendgrid.SendGridAPIClient')
-    def test_send_template_email(self, mock_sg_client):
-        """Test sending email using template."""
-        mock_response = Mock()
-        mock_response.status_code = 202
-        mock_sg_client.return_value.send.return_value = mock_response
-        
-        with patch('sendgrid.SendGridAPIClient', mock_sg_client):
-            result = send_template_email(
-                template_name='test_template',
-                recipient_email='test@example.com',
-                context={'name': 'John Doe'}
-            )
-        
+    def test_send_template_email(self):
+        """Test that a template email is rendered and queued, not sent."""
+        result = send_template_email(
+            template_name='test_template',
+            recipient_email='test@example.com',
+            context={'name': 'John Doe'}
+        )
+
         self.assertTrue(result)
-        
+        self.assertEqual(len(mail.outbox), 0)
+
         # Check if email log was created
         log = EmailLog.objects.get(recipient='test@example.com')
         self.assertEqual(log.subject, 'Hello John Doe')
-        self.assertEqual(log.status, 'sent')
\ No newline at end of file
+        self.assertEqual(log.status, 'pending')
+        self.assertEqual(log.outbox.text_body, 'Hello John Doe, welcome!')
+
+
+class TemplateCacheTest(TestCase):
+    """Test cases for the compiled template cache."""
+
+    def setUp(self):
+        """Set up a template and an empty cache."""
+        clear_cache()
+        self.addCleanup(clear_cache)
+        self.template = EmailTemplate.objects.create(
+            name='job_alert',
+            subject='{{ count }} new jobs',
+            html_content='<p>Hi {{ name }}</p>',
+        )
+
+    def test_render_many_parses_once(self):
+        """Test that bulk rendering parses each template part once."""
+        contexts = [{'name': f'User {i}', 'count': i} for i in range(50)]
+        with patch('sendgrid.rendering.Template', wraps=Template) as parse:
+            rendered = list(render_many('job_alert', contexts))
+            rendered += list(render_many('job_alert', contexts))
+
+        self.assertEqual(parse.call_count, 2)
+        self.assertEqual(len(rendered), 100)
+        self.assertEqual(
+            rendered[7], RenderedEmail('7 new jobs', '<p>Hi User 7</p>', 'Hi User 7')
+        )
+
+    def test_saving_a_template_invalidates_it(self):
+        """Test that edits show up in the next render."""
+        list(render_many('job_alert', [{}]))
+        self.template.html_content = '<p>Hello {{ name }}</p>'
+        self.template.save()
+
+        rendered, = render_many('job_alert', [{'name': 'Ann'}])
+        self.assertEqual(rendered.html_content, '<p>Hello Ann</p>')
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTest(TestCase):
+    """Test cases for the email outbox worker."""
+
+    def queue(self, count=1):
+        """Queue emails to distinct recipients."""
+        return [
+            enqueue(
+                f'user{i}@example.com', 'from@example.com', 'Hi', 'Body', '<p>Body</p>'
+            )
+            for i in range(count)
+        ]
+
+    def test_queued_emails_are_sent(self):
+        """Test that the worker sends queued emails and marks them sent."""
+        logs = self.queue(3)
+
+        result = process_outbox()
+
+        self.assertEqual(result, OutboxResult(3, 0, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives, [('<p>Body</p>', 'text/html')])
+        self.assertEqual(
+            set(
+                EmailLog.objects.filter(pk__in=[log.pk for log in logs])
+                .values_list('status', flat=True)
+            ),
+            {'sent'},
+        )
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_rolled_back_emails_are_not_queued(self):
+        """Test that an email is only queued if the caller's transaction commits."""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.queue()
+                raise RuntimeError
+
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertFalse(EmailLog.objects.exists())
+
+    def test_failed_sends_are_retried_with_backoff(self):
+        """Test that a failing provider reschedules the email for later."""
+        log, = self.queue()
+        connection = MagicMock()
+        connection.send_messages.side_effect = OSError('provider down')
+
+        self.assertEqual(process_outbox(connection=connection), OutboxResult(0, 1, 0))
+
+        row = OutboxMessage.objects.get(pk=log.pk)
+        self.assertEqual(row.attempts, 1)
+        self.assertGreater(row.next_attempt_at, timezone.now())
+        self.assertIsNone(row.claim_token)
+        self.assertEqual(EmailLog.objects.get(pk=log.pk).status, 'pending')
+        # Not due again yet.
+        self.assertEqual(process_outbox(), OutboxResult(0, 0, 0))
+
+    def test_emails_fail_after_max_attempts(self):
+        """Test that an email gives up after the last attempt."""
+        log, = self.queue()
+        OutboxMessage.objects.filter(pk=log.pk).update(attempts=MAX_ATTEMPTS - 1)
+        connection = MagicMock()
+        connection.send_messages.return_value = 0
+
+        self.assertEqual(process_outbox(connection=connection), OutboxResult(0, 0, 1))
+
+        self.assertEqual(EmailLog.objects.get(pk=log.pk).status, 'failed')
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_deferred_sends_keep_their_attempts(self):
+        """Test that rate limited sends are rescheduled without failing."""
+        log, = self.queue()
+        OutboxMessage.objects.filter(pk=log.pk).update(attempts=MAX_ATTEMPTS - 1)
+
+        with patch(
+            'sendgrid.outbox.send_all',
+            side_effect=lambda connection, messages, **kwargs: [
+                SendResult(message, False, deferred=True) for message in messages
+            ],
+        ):
+            self.assertEqual(process_outbox(), OutboxResult(0, 1, 0))
+
+        row = OutboxMessage.objects.get(pk=log.pk)
+        self.assertEqual(row.attempts, MAX_ATTEMPTS - 1)
+        self.assertGreater(row.next_attempt_at, timezone.now())
+        self.assertEqual(EmailLog.objects.get(pk=log.pk).status, 'pending')
+
+    def test_claimed_rows_are_not_claimed_again(self):
+        """Test that concurrent workers get disjoint batches."""
+        self.queue(5)
+        now = timezone.now()
+
+        first = claim(3, now)
+        second = claim(3, now)
+
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({row.pk for row in first} & {row.pk for row in second})
+        self.assertEqual(claim(3, now), [])
+
+    def test_lease_is_renewed_while_sending(self):
+        """Test that a batch outlasting its lease keeps it."""
+        self.queue(2)
+        rows = claim(2, timezone.now())
+        # Claimed long enough ago that the lease is about to run out.
+        expiring = timezone.now() + datetime.timedelta(seconds=10)
+        OutboxMessage.objects.update(claimed_until=expiring)
+        lease = Lease(rows, expiring - LEASE)
+
+        with self.assertNumQueries(1):
+            lease.renew()
+        with self.assertNumQueries(0):
+            lease.renew()
+
+        self.assertEqual(claim(2, timezone.now() + datetime.timedelta(minutes=1)), [])
+        for row in OutboxMessage.objects.all():
+            self.assertGreater(row.claimed_until, timezone.now() + LEASE)
+
+    def test_lease_is_renewed_before_each_send(self):
+        """Test that the worker offers to renew its lease before every send."""
+        self.queue(3)
+
+        with patch('sendgrid.outbox.Lease.renew') as renew:
+            self.assertEqual(process_outbox(), OutboxResult(3, 0, 0))
+
+        self.assertEqual(renew.call_count, 3)
+
+
+@patch('sendgrid.views.verify_signature', return_value=True)
+class EventWebhookTest(TestCase):
+    """Test cases for the SendGrid event webhook."""
+
+    def setUp(self):
+        """Set up sent email logs."""
+        self.logs = [
+            EmailLog.objects.create(
+                recipient=f'user{i}@example.com',
+                sender='from@example.com',
+                subject='Hi',
+                sendgrid_message_id='batch1' if i < 2 else f'single{i}',
+                status='sent',
+            )
+            for i in range(4)
+        ]
+
+    def post(self, events):
+        """Post an event batch to the webhook."""
+        return self.client.post(
+            reverse('sendgrid_event_webhook'),
+            data=json.dumps(events),
+            content_type='application/json',
+        )
+
+    def event(self, event_id, event, log, **extra):
+        """Build a webhook event for a log."""
+        return {
+            'sg_event_id': event_id,
+            'event': event,
+            'email': log.recipient,
+            'sg_message_id': f'{log.sendgrid_message_id}.filterdrecv-1.0',
+            'timestamp': 1700000000,
+            **extra,
+        }
+
+    def statuses(self):
+        """Return the current status of every log."""
+        return [log.status for log in EmailLog.objects.order_by('pk')]
+
+    def test_events_update_their_logs(self, verify):
+        """Test that events move logs of the right recipient forward."""
+        response = self.post([
+            self.event('e1', 'delivered', self.logs[1]),
+            self.event('e2', 'bounce', self.logs[2]),
+            self.event('e3', 'open', self.logs[3]),
+        ])
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.statuses(), ['sent', 'delivered', 'bounced', 'sent'])
+        self.assertEqual(
+            EmailLog.objects.get(pk=self.logs[1].pk).delivered_at.timestamp(),
+            1700000000,
+        )
+
+    def test_duplicate_events_are_ignored(self, verify):
+        """Test that a redelivered event is not applied twice."""
+        self.post([self.event('e1', 'spamreport', self.logs[2])])
+        EmailLog.objects.filter(pk=self.logs[2].pk).update(status='sent')
+
+        self.post([self.event('e1', 'spamreport', self.logs[2])])
+
+        self.assertEqual(EmailLog.objects.get(pk=self.logs[2].pk).status, 'sent')
+        self.assertEqual(EmailEvent.objects.count(), 1)
+
+    def test_late_events_do_not_regress_status(self, verify):
+        """Test that an event arriving after a later one is ignored."""
+        self.post([self.event('e1', 'delivered', self.logs[3])])
+        self.post([self.event('e2', 'processed', self.logs[3])])
+
+        self.assertEqual(EmailLog.objects.get(pk=self.logs[3].pk).status, 'delivered')
+
+    def test_large_batches_use_few_queries(self, verify):
+        """Test that a burst of events costs queries per chunk, not per event."""
+        events = [
+            self.event(
+                f'e{i}', 'delivered', self.logs[i % 4], email=f'x{i}@example.com'
+            )
+            for i in range(1000)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            self.post(events)
+
+        self.assertLess(len(queries), 25)
+        self.assertEqual(EmailEvent.objects.count(), 1000)
+
+    def test_events_before_their_log_are_kept(self, verify):
+        """Test that an event for an unknown message id is not lost."""
+        log = EmailLog.objects.create(
+            recipient='late@example.com', sender='from@example.com', status='sent'
+        )
+        event = {
+            'sg_event_id': 'e1',
+            'event': 'delivered',
+            'email': 'late@example.com',
+            'sg_message_id': 'late1.filterdrecv-1.0',
+            'timestamp': 1700000000,
+        }
+        self.post([event])
+        self.assertFalse(EmailEvent.objects.get(pk='e1').applied)
+
+        EmailLog.objects.filter(pk=log.pk).update(sendgrid_message_id='late1')
+        self.post([event])
+
+        self.assertEqual(EmailLog.objects.get(pk=log.pk).status, 'delivered')
+        self.assertTrue(EmailEvent.objects.get(pk='e1').applied)
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_pending_events_apply_once_sent(self, verify):
+        """Test that recording a send applies the events that came first."""
+        log = enqueue('late@example.com', 'from@example.com', 'Hi', 'Body')
+        self.post([
+            {
+                'sg_event_id': 'e1',
+                'event': 'delivered',
+                'email': 'late@example.com',
+                'sg_message_id': 'late1.filterdrecv-1.0',
+                'timestamp': 1700000000,
+            }
+        ])
+
+        def send(messages):
+            messages[0].sendgrid_message_id = 'late1'
+            return 1
+
+        connection = MagicMock()
+        connection.send_messages.side_effect = send
+        self.assertEqual(process_outbox(connection=connection), OutboxResult(1, 0, 0))
+
+        self.assertEqual(EmailLog.objects.get(pk=log.pk).status, 'delivered')
+        self.assertTrue(EmailEvent.objects.get(pk='e1').applied)
+
+    def test_unverified_requests_are_rejected(self, verify):
+        """Test that batches failing verification change nothing."""
+        verify.return_value = False
+
+        response = self.post([self.event('e1', 'delivered', self.logs[2])])
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.statuses(), ['sent'] * 4)
+
+
+class WebhookSignatureTest(TestCase):
+    """Test cases for webhook signature verification."""
+
+    @override_settings(SENDGRID_WEBHOOK_PUBLIC_KEY='')
+    def test_missing_key_rejects_everything(self):
+        """Test that nothing verifies without a configured public key."""
+        self.assertFalse(verify_signature(b'[]', 'signature', str(int(time.time()))))
+
+    @override_settings(SENDGRID_WEBHOOK_PUBLIC_KEY='key')
+    def test_stale_timestamps_are_rejected(self):
+        """Test that old signed requests cannot be replayed."""
+        self.assertFalse(verify_signature(b'[]', 'signature', '1000'))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class EmailStatisticsTest(TestCase):
+    """Test cases for the daily email statistics rollup."""
+
+    def rollup(self):
+        """Return the non-zero rollup rows."""
+        return list(
+            EmailDailyStat.objects.exclude(count=0)
+            .order_by('day', 'template_id', 'status')
+            .values_list('day', 'template_id', 'status', 'count')
+        )
+
+    def test_rollup_follows_log_writes(self):
+        """Test that queueing, sending and webhook events keep the rollup exact."""
+        template = EmailTemplate.objects.create(name='welcome', subject='Hi')
+        logs = [
+            enqueue(
+                f'user{i}@example.com', 'from@example.com', 'Hi', 'Body',
+                template=template,
+            )
+            for i in range(4)
+        ]
+        enqueue('other@example.com', 'from@example.com', 'Hi', 'Body')
+        process_outbox()
+        EmailLog.objects.filter(pk__in=[log.pk for log in logs]).update(
+            sendgrid_message_id='batch1'
+        )
+        with patch('sendgrid.views.verify_signature', return_value=True):
+            self.client.post(
+                reverse('sendgrid_event_webhook'),
+                data=json.dumps([
+                    {
+                        'sg_event_id': f'e{i}',
+                        'event': event,
+                        'email': f'user{i}@example.com',
+                        'sg_message_id': 'batch1.filter0',
+                        'timestamp': 1700000000,
+                    }
+                    for i, event in enumerate(['delivered', 'delivered', 'bounce'])
+                ]),
+                content_type='application/json',
+            )
+
+        incremental = self.rollup()
+        rebuild_stats()
+        self.assertEqual(incremental, self.rollup())
+        with self.assertNumQueries(1):
+            stats = get_email_statistics(days=7)
+        self.assertEqual(stats['total_sent'], 5)
+        self.assertEqual(stats['delivered'], 2)
+        self.assertEqual(stats['bounced'], 1)
+        self.assertEqual(stats['delivery_rate'], 40)
+
+    def test_rebuild_counts_existing_logs(self):
+        """Test that a backfill counts logs written without the rollup."""
+        for status in ['sent', 'delivered', 'delivered', 'spam']:
+            EmailLog.objects.create(
+                recipient='a@example.com', sender='from@example.com', subject='Hi',
+                status=status,
+            )
+        self.assertEqual(get_email_statistics()['total_sent'], 0)
+
+        call_command('rebuild_email_stats', stdout=io.StringIO())
+
+        stats = get_email_statistics()
+        self.assertEqual(stats['total_sent'], 4)
+        self.assertEqual((stats['delivered'], stats['spam']), (2, 1))
@@ -0,0 +1,31 @@
+"""Views for the SendGrid application."""
+
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from sendgrid.webhooks import (
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    parse_events,
+    process_events,
+    verify_signature,
+)
+
+
+@csrf_exempt
+@require_POST
+def event_webhook(request: HttpRequest) -> HttpResponse:
+    """Receive a batch of SendGrid delivery events."""
+    if not verify_signature(
+        request.body,
+        request.headers.get(SIGNATURE_HEADER, ""),
+        request.headers.get(TIMESTAMP_HEADER, ""),
+    ):
+        return HttpResponse(status=403)
+    try:
+        events = parse_events(request.body)
+    except ValueError:
+        return HttpResponse(status=400)
+    process_events(events)
+    return HttpResponse(status=204)
@@ -0,0 +1,264 @@
+"""SendGrid Event Webhook processing.
+
+SendGrid posts events in batches. A batch is verified against the signed
+webhook's ECDSA public key, events already seen are dropped by their
+`sg_event_id`, and the remaining status events are applied to EmailLog
+with one UPDATE per event type, chunk and `sendgrid.stats` rollup group,
+matched on the indexed `sendgrid_message_id` plus the recipient (batched
+sends share a message id). Each type only moves logs forward from the
+statuses listed in STATUS_EVENTS, so events arriving out of order never
+undo a later status. Events can arrive before the outbox has stored the
+message id of their log; those are kept unapplied and applied by
+`apply_pending_events` once the log is recorded as sent.
+"""
+
+import datetime
+import functools
+import itertools
+import json
+import logging
+import operator
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+
+from .models import EmailEvent, EmailLog
+from .stats import Deltas, add_deltas, apply_deltas, transition
+
+try:
+    from ellipticcurve.ecdsa import Ecdsa  # type: ignore[import-untyped]
+    from ellipticcurve.publicKey import PublicKey  # type: ignore[import-untyped]
+    from ellipticcurve.signature import Signature  # type: ignore[import-untyped]
+except ImportError:
+    # Without starkbank-ecdsa no signature verifies and every batch is refused.
+    Ecdsa = PublicKey = Signature = None
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Twilio-Email-Event-Webhook-Signature"
+TIMESTAMP_HEADER = "X-Twilio-Email-Event-Webhook-Timestamp"
+TOLERANCE = getattr(settings, "SENDGRID_WEBHOOK_TOLERANCE", 600)
+CHUNK_SIZE = 200
+
+# event type: (new EmailLog status, statuses it may replace)
+STATUS_EVENTS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "processed": ("sent", ("pending",)),
+    "delivered": ("delivered", ("pending", "sent")),
+    "dropped": ("failed", ("pending", "sent")),
+    "bounce": ("bounced", ("pending", "sent")),
+    "spamreport": ("spam", ("pending", "sent", "delivered")),
+}
+
+
+@functools.lru_cache(maxsize=4)
+def load_public_key(key: str) -> Any:
+    """Parse the base64 public key shown in the SendGrid settings."""
+    return PublicKey.fromPem(
+        f"-----BEGIN PUBLIC KEY-----\n{key}\n-----END PUBLIC KEY-----"
+    )
+
+
+def verify_signature(payload: bytes, signature: str, timestamp: str) -> bool:
+    """Return True if a webhook request was signed by SendGrid recently."""
+    try:
+        if abs(time.time() - int(timestamp)) > TOLERANCE:
+            return False
+    except ValueError:
+        return False
+    key = getattr(settings, "SENDGRID_WEBHOOK_PUBLIC_KEY", "")
+    if not key or Ecdsa is None:
+        logger.error(
+            "SendGrid webhook verification is unavailable: set "
+            "SENDGRID_WEBHOOK_PUBLIC_KEY and install starkbank-ecdsa."
+        )
+        return False
+    try:
+        return bool(
+            Ecdsa.verify(
+                timestamp + payload.decode(),
+                Signature.fromBase64(signature),
+                load_public_key(key),
+            )
+        )
+    except Exception:  # pylint: disable=broad-except
+        # Malformed signatures and keys raise all sorts of parsing errors.
+        return False
+
+
+def parse_events(payload: bytes) -> List[Dict[str, Any]]:
+    """Decode an event batch; raise ValueError if it is not a list of events."""
+    events = json.loads(payload)
+    if not isinstance(events, list) or not all(isinstance(e, dict) for e in events):
+        raise ValueError("Expected a JSON list of events")
+    return events
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield lists of at most `size` items."""
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def message_id(event: Dict[str, Any]) -> str:
+    """Return the X-Message-Id an event's `sg_message_id` starts with."""
+    return str(event.get("sg_message_id") or "").split(".", 1)[0]
+
+
+def event_time(event: Dict[str, Any]) -> datetime.datetime:
+    """Return when an event happened."""
+    try:
+        return datetime.datetime.fromtimestamp(
+            int(event["timestamp"]), tz=datetime.timezone.utc
+        )
+    except (KeyError, TypeError, ValueError):
+        return datetime.datetime.now(tz=datetime.timezone.utc)
+
+
+def status_key(event: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """Return the (message id, recipient) a status event applies to."""
+    mid = message_id(event)
+    email = str(event.get("email") or "").lower()
+    if event.get("event") in STATUS_EVENTS and mid and email:
+        return mid, email
+    return None
+
+
+def known_logs(keys: Iterable[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+    """Return the (message id, recipient) pairs that have an EmailLog."""
+    found: Set[Tuple[str, str]] = set()
+    for mids in chunked({mid for mid, _ in keys}, CHUNK_SIZE):
+        found.update(
+            (mid, email.lower())
+            for mid, email in EmailLog.objects.filter(
+                sendgrid_message_id__in=mids
+            ).values_list("sendgrid_message_id", "recipient")
+        )
+    return found
+
+
+def new_events(events: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Return a batch's events, by id, that were not applied before."""
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        event_id = event.get("sg_event_id")
+        if event_id and event.get("event"):
+            by_id.setdefault(str(event_id), event)
+
+    applied = set()
+    for ids in chunked(by_id, CHUNK_SIZE):
+        applied.update(
+            EmailEvent.objects.filter(pk__in=ids, applied=True).values_list(
+                "pk", flat=True
+            )
+        )
+    return {event_id: e for event_id, e in by_id.items() if event_id not in applied}
+
+
+def record_events(events: Dict[str, Dict[str, Any]]) -> None:
+    """Record events as received; those without an EmailLog yet as unapplied."""
+    keys = {event_id: status_key(event) for event_id, event in events.items()}
+    logs = known_logs(key for key in keys.values() if key)
+    EmailEvent.objects.bulk_create(
+        [
+            EmailEvent(
+                event_id=event_id,
+                event=str(event["event"])[:32],
+                message_id=message_id(event)[:100],
+                email=str(event.get("email") or "")[:254],
+                timestamp=event_time(event),
+                applied=keys[event_id] is None or keys[event_id] in logs,
+            )
+            for event_id, event in events.items()
+        ],
+        batch_size=CHUNK_SIZE,
+        update_conflicts=True,
+        unique_fields=["event_id"],
+        update_fields=["applied"],
+    )
+
+
+def apply_events(events: List[Dict[str, Any]]) -> int:
+    """Apply status events to their EmailLogs; return the rows updated."""
+    matches: Dict[str, Dict[Tuple[str, str], datetime.datetime]] = {
+        event_type: {} for event_type in STATUS_EVENTS
+    }
+    for event in events:
+        mid = message_id(event)
+        email = event.get("email")
+        if event.get("event") in STATUS_EVENTS and mid and email:
+            matches[event["event"]][mid, str(email)] = event_time(event)
+
+    updated = 0
+    deltas: Deltas = {}
+    for event_type, logs in matches.items():
+        status, sources = STATUS_EVENTS[event_type]
+        for chunk in chunked(logs.items(), CHUNK_SIZE):
+            conditions = [
+                (Q(sendgrid_message_id=mid, recipient__iexact=email), when)
+                for (mid, email), when in chunk
+            ]
+            fields: Dict[str, Any] = {}
+            if status == "delivered":
+                fields["delivered_at"] = Case(
+                    *(When(q, then=Value(when)) for q, when in conditions),
+                    default=F("delivered_at"),
+                )
+            count, changes = transition(
+                EmailLog.objects.filter(
+                    functools.reduce(operator.or_, (q for q, _ in conditions)),
+                    status__in=sources,
+                ),
+                status,
+                **fields,
+            )
+            updated += count
+            add_deltas(deltas, changes)
+    apply_deltas(deltas)
+    return updated
+
+
+def process_events(events: List[Dict[str, Any]]) -> int:
+    """Dedupe and apply an event batch; return the EmailLog rows updated."""
+    with transaction.atomic():
+        fresh = new_events(events)
+        record_events(fresh)
+        return apply_events(list(fresh.values()))
+
+
+def apply_pending_events(message_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Apply the events kept for logs that had no message id yet.
+
+    Only events of `message_ids` are tried if given. Events whose log
+    still cannot be found stay pending. Returns the EmailLog rows updated.
+    """
+    pending = EmailEvent.objects.filter(applied=False)
+    if message_ids is not None:
+        message_ids = [mid for mid in message_ids if mid]
+        if not message_ids:
+            return 0
+        pending = pending.filter(message_id__in=message_ids)
+    events = {
+        row.event_id: {
+            "event": row.event,
+            "sg_message_id": row.message_id,
+            "email": row.email,
+            "timestamp": int(row.timestamp.timestamp()),
+        }
+        for row in pending
+    }
+    if not events:
+        return 0
+    with transaction.atomic():
+        record_events(events)
+        return apply_events(list(events.values()))
+
+
+def prune_events(before: datetime.datetime) -> int:
+    """Forget events received before `before`; return how many were removed."""
+    deleted, _ = EmailEvent.objects.filter(received_at__lt=before).delete()
+    return deleted
@@ -0,0 +1,16 @@
+"""Django app configuration for uploads application."""
+
+from django.apps import AppConfig
+
+
+class UploadsConfig(AppConfig):
+    """Configuration for the uploads app."""
+
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "uploads"
+
+    def ready(self) -> None:
+        """Connect signal handlers."""
+        from .signals import connect_signals
+
+        connect_signals()
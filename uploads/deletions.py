@@ -0,0 +1,79 @@
+"""Durable record of stored files that could not be deleted.
+
+Files are deleted in a background thread (`recruit.utils.queue_delete`).
+Files that still fail after the thread's retries, or that are still queued
+when the process exits, are recorded as FailedDeletion rows instead of
+only being logged. `retry_failed_deletions`, run by the
+`purge_media_objects` command, tries them again.
+"""
+
+from typing import Any, Dict, Iterable, List
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from recruit.utils import DeleteFailure, DeleteResult, StoredFile, delete_objects
+
+from .models import FailedDeletion
+
+BATCH_SIZE = 1000
+
+
+def storage_path(storage: Any) -> str:
+    """Return the dotted path of a storage's class."""
+    cls = type(storage)
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def record_failures(failures: Iterable[DeleteFailure]) -> int:
+    """Record files that could not be deleted, for a later retry."""
+    rows = {
+        (storage_path(failure.file.storage), failure.file.name): failure.error
+        for failure in failures
+    }
+    FailedDeletion.objects.bulk_create(
+        [
+            FailedDeletion(storage=storage, name=name, error=error)
+            for (storage, name), error in rows.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["storage", "name"],
+        update_fields=["error", "failed_at"],
+    )
+    return len(rows)
+
+
+def retry_failed_deletions(batch_size: int = BATCH_SIZE) -> DeleteResult:
+    """Try to delete every recorded file again, forgetting those deleted."""
+    storages: Dict[str, Any] = {}
+    deleted = 0
+    failed: List[DeleteFailure] = []
+    last_pk = 0
+    while True:
+        rows = list(
+            FailedDeletion.objects.filter(pk__gt=last_pk).order_by("pk")[:batch_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1].pk
+        files: Dict[StoredFile, int] = {}
+        for row in rows:
+            if row.storage not in storages:
+                storages[row.storage] = import_string(row.storage)()
+            files[StoredFile(storages[row.storage], row.name)] = row.pk
+        result = delete_objects(files)
+        still_failing = {
+            files[failure.file]: failure.error for failure in result.failed
+        }
+        FailedDeletion.objects.filter(pk__in=files.values()).exclude(
+            pk__in=still_failing
+        ).delete()
+        now = timezone.now()
+        for pk, error in still_failing.items():
+            FailedDeletion.objects.filter(pk=pk).update(
+                error=error, attempts=F("attempts") + 1, failed_at=now
+            )
+        deleted += result.deleted
+        failed += result.failed
+    return DeleteResult(deleted, failed)
@@ -0,0 +1,44 @@
+"""Upload handlers hashing files while the request body is read.
+
+The content-addressed storages name objects by the SHA-256 of their
+content. These handlers compute it chunk by chunk as the upload streams
+in and set it as `content_digest` on the uploaded file, so saving it does
+not have to read the file a second time.
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+
+
+class HashingMixin:
+    """Compute the SHA-256 of each file a handler receives."""
+
+    def new_file(self, *args: Any, **kwargs: Any) -> None:
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)  # type: ignore[misc]
+
+    def receive_data_chunk(self, raw_data: bytes, start: int) -> Optional[bytes]:
+        # A memory handler that is not activated passes the data on unread.
+        if getattr(self, "activated", True):
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)  # type: ignore[misc]
+
+    def file_complete(self, file_size: int) -> Optional[UploadedFile]:
+        uploaded = super().file_complete(file_size)  # type: ignore[misc]
+        if uploaded is not None:
+            uploaded.content_digest = self.hasher.hexdigest()
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+    """Keep small uploads in memory, hashing them as they arrive."""
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin, TemporaryFileUploadHandler):
+    """Stream large uploads to a temporary file, hashing them as they arrive."""
@@ -0,0 +1,69 @@
+"""Management command deleting unreferenced and undeleted media objects."""
+
+import datetime
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from uploads.deletions import retry_failed_deletions
+from uploads.presigned import get_expires_in, purge_unclaimed
+from uploads.refcounts import purge_unreferenced, rebuild_refcounts
+
+
+class Command(BaseCommand):
+    """Purge media objects no file field has referred to for a while."""
+
+    help = (
+        "Delete content-addressed media objects, and their image variants, "
+        "that have been unreferenced for longer than the grace period, direct "
+        "uploads that were never claimed, and retry the deletions that "
+        "failed earlier."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=24,
+            help="Keep objects released within this many hours.",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recount all references from the file fields first.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        started = time.monotonic()
+        if options["rebuild"]:
+            counted = rebuild_refcounts()
+            self.stdout.write(f"Counted references to {counted} objects.")
+        before = timezone.now() - datetime.timedelta(hours=options["hours"])
+        result = purge_unreferenced(before)
+        for failure in result.failed:
+            self.stderr.write(f"Could not delete {failure.file.name}: {failure.error}")
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Purged {result.deleted} objects ({len(result.failed)} files "
+                f"failed) in {elapsed:.1f}s."
+            )
+        )
+        expired = timezone.now() - datetime.timedelta(seconds=get_expires_in())
+        unclaimed = purge_unclaimed(expired)
+        for failure in unclaimed.failed:
+            self.stderr.write(f"Could not delete {failure.file.name}: {failure.error}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {unclaimed.deleted} unclaimed uploads.")
+        )
+        retried = retry_failed_deletions()
+        for failure in retried.failed:
+            self.stderr.write(f"Could not delete {failure.file.name}: {failure.error}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {retried.deleted} files that failed before "
+                f"({len(retried.failed)} still failing)."
+            )
+        )
@@ -0,0 +1,66 @@
+"""Models for the uploads application."""
+
+from django.db import models
+
+
+class StoredObject(models.Model):
+    """
+    A content-addressed media object and how many file fields refer to it.
+
+    Maintained by `uploads.refcounts`. `released_at` is when the count last
+    dropped to zero; objects unreferenced for long enough are purged.
+    """
+
+    name = models.CharField(max_length=255, primary_key=True)
+    refcount = models.IntegerField(default=0)
+    released_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.refcount} references)"
+
+
+class FailedDeletion(models.Model):
+    """
+    A stored file that could not be deleted.
+
+    Recorded by the background delete thread of `recruit.utils` once its
+    retries are used up, or when the process exits with the file still
+    queued. `uploads.deletions.retry_failed_deletions` tries again.
+    """
+
+    # Dotted path of the storage class, instantiated without arguments.
+    storage = models.CharField(max_length=255)
+    name = models.CharField(max_length=1024)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=1)
+    failed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["storage", "name"], name="uploads_failed_deletion_file"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.error}"
+
+
+class PendingUpload(models.Model):
+    """
+    A direct upload that was issued and not claimed yet.
+
+    Created by `uploads.presigned.presign_upload`. Claiming the upload
+    deletes the row, so each upload is claimed once; the objects of uploads
+    never claimed are deleted by `purge_unclaimed`.
+    """
+
+    name = models.CharField(max_length=255, primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+__all__ = ["FailedDeletion", "PendingUpload", "StoredObject"]
@@ -0,0 +1,192 @@
+"""Direct-to-storage uploads with presigned POST policies.
+
+Instead of streaming a file through a web worker, which then uploads it to
+S3 again, the server issues a presigned POST for a fresh key and the
+browser sends the file straight to the bucket. The upload is described by
+a signed token naming the key, the form field and the uploader. Once the
+browser reports the upload done, `claim_upload` checks the token, that
+the object arrived within its size limit and, for photos, that it is an
+image, and the key is assigned to the model field without re-uploading
+the content. Every issued upload has a PendingUpload row; claiming deletes
+it, so a token is good for one claim, and `purge_unclaimed` deletes the
+objects of uploads that were never claimed. With `AWS_S3_ENDPOINT_URL` the
+same flow works against a local S3-compatible server such as MinIO.
+"""
+
+import datetime
+import os
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import Storage, default_storage
+from django.db import transaction
+from django.utils.text import get_valid_filename
+from PIL import Image, UnidentifiedImageError
+
+from recruit.utils import (
+    DeleteFailure,
+    DeleteResult,
+    StoredFile,
+    delete_objects,
+    s3_key,
+)
+
+from .models import PendingUpload
+
+UPLOAD_PREFIX = "incoming"
+SIGNING_SALT = "uploads.presigned"
+DEFAULT_MAX_SIZE = 10 * 1024 * 1024
+DEFAULT_EXPIRES_IN = 15 * 60
+MAX_FILENAME_LENGTH = 100
+BATCH_SIZE = 1000
+
+# Photo types accepted, and the Pillow format each must decode as.
+IMAGE_TYPES = {"image/jpeg": "JPEG", "image/png": "PNG", "image/webp": "WEBP"}
+
+
+class UploadError(Exception):
+    """A direct upload that cannot be issued or accepted."""
+
+
+class PresignedUpload(NamedTuple):
+    """Where and how the browser should POST a file, and its claim token."""
+
+    url: str
+    fields: Dict[str, str]
+    token: str
+
+
+def get_max_size() -> int:
+    """Return the largest direct upload accepted, in bytes."""
+    return int(getattr(settings, "PRESIGNED_UPLOAD_MAX_SIZE", DEFAULT_MAX_SIZE))
+
+
+def get_expires_in() -> int:
+    """Return the seconds presigned uploads and their tokens stay valid."""
+    return int(getattr(settings, "PRESIGNED_UPLOAD_EXPIRES_IN", DEFAULT_EXPIRES_IN))
+
+
+def supports_direct_uploads(storage: Optional[Storage] = None) -> bool:
+    """Return whether uploads to a storage can bypass the web workers."""
+    if not getattr(settings, "PRESIGNED_UPLOADS", False):
+        return False
+    return hasattr(storage or default_storage, "bucket")
+
+
+def presign_upload(
+    field: str,
+    filename: str,
+    content_type: str,
+    owner: Any,
+    storage: Optional[Storage] = None,
+) -> PresignedUpload:
+    """Issue a presigned POST of one file for the form field `field`."""
+    storage = storage or default_storage
+    if not supports_direct_uploads(storage):
+        raise UploadError("Direct uploads are not available.")
+    filename = get_valid_filename(os.path.basename(filename)) or "upload"
+    name = f"{UPLOAD_PREFIX}/{uuid.uuid4().hex}/{filename[-MAX_FILENAME_LENGTH:]}"
+    key = s3_key(storage, name)
+    post = storage.bucket.meta.client.generate_presigned_post(  # type: ignore
+        Bucket=storage.bucket_name,  # type: ignore[attr-defined]
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, get_max_size()],
+        ],
+        ExpiresIn=get_expires_in(),
+    )
+    PendingUpload.objects.create(name=name)
+    token = signing.dumps(
+        {"name": name, "field": field, "owner": str(owner)}, salt=SIGNING_SALT
+    )
+    return PresignedUpload(post["url"], post["fields"], token)
+
+
+def verify_image(storage: Storage, name: str) -> None:
+    """Raise UploadError unless a stored file is a JPEG, PNG or WebP image."""
+    try:
+        with storage.open(name) as file, Image.open(file) as image:
+            image_format = image.format
+            image.verify()
+    except (OSError, SyntaxError, UnidentifiedImageError, Image.DecompressionBombError):
+        image_format = None
+    if image_format not in IMAGE_TYPES.values():
+        raise UploadError("The photo must be a JPEG, PNG or WebP image.")
+
+
+def claim_upload(
+    token: str,
+    field: str,
+    owner: Any,
+    storage: Optional[Storage] = None,
+    image: bool = False,
+) -> str:
+    """
+    Return the stored name of a finished direct upload.
+
+    Raises UploadError unless the token was issued to `owner` for `field`,
+    has not expired or been claimed before, and the object exists within
+    the size limit and, with `image`, is an image. Rejected objects are
+    deleted. Claim inside the transaction that saves the name, so that the
+    upload can be claimed again if the save fails.
+    """
+    storage = storage or default_storage
+    try:
+        claim = signing.loads(token, salt=SIGNING_SALT, max_age=get_expires_in())
+    except signing.BadSignature as e:
+        raise UploadError("Invalid or expired upload.") from e
+    if claim.get("field") != field or claim.get("owner") != str(owner):
+        raise UploadError("Invalid or expired upload.")
+    name = claim["name"]
+    if not storage.exists(name):
+        raise UploadError("The file was not uploaded.")
+    try:
+        if storage.size(name) > get_max_size():
+            raise UploadError("The file is too large.")
+        if image:
+            verify_image(storage, name)
+    except UploadError:
+        storage.delete(name)
+        raise
+    if not PendingUpload.objects.filter(name=name).delete()[0]:
+        raise UploadError("Invalid or expired upload.")
+    return name
+
+
+def purge_unclaimed(
+    before: datetime.datetime, storage: Optional[Storage] = None
+) -> DeleteResult:
+    """
+    Delete the objects of direct uploads issued before `before` and unclaimed.
+
+    Rows are claimed with SKIP LOCKED and deleted in the same transaction as
+    the objects, so a concurrent claim either wins or finds the row gone.
+    Rows of objects that could not be deleted are kept for the next run.
+    """
+    storage = storage or default_storage
+    deleted = 0
+    failed: List[DeleteFailure] = []
+    last = ""
+    while True:
+        with transaction.atomic():
+            names = list(
+                PendingUpload.objects.filter(created_at__lt=before, name__gt=last)
+                .select_for_update(skip_locked=True)
+                .order_by("name")
+                .values_list("name", flat=True)[:BATCH_SIZE]
+            )
+            if not names:
+                break
+            last = names[-1]
+            result = delete_objects(StoredFile(storage, name) for name in names)
+            kept = {failure.file.name for failure in result.failed}
+            PendingUpload.objects.filter(name__in=names).exclude(
+                name__in=kept
+            ).delete()
+        deleted += result.deleted
+        failed += result.failed
+    return DeleteResult(deleted, failed)
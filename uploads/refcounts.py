@@ -0,0 +1,183 @@
+"""Reference counting of content-addressed media objects.
+
+A StoredObject row counts the file fields, across all models, that hold
+an object's name. Saves and deletes adjust the counts in the same
+transaction through the signal handlers of `uploads.signals`. Only the
+objects themselves are counted; files derived from them, like image
+variants, live and die with their object. An object whose count dropped
+to zero is only purged after a grace period, since an identical upload
+may reuse it in the meantime. `rebuild_refcounts` recounts every field
+and repairs counts after writes that bypassed model saves.
+"""
+
+import datetime
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Tuple, Type
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from recruit.custom_storages import is_object_name
+from recruit.utils import (
+    DeleteFailure,
+    DeleteResult,
+    StoredFile,
+    delete_objects,
+    image_files,
+)
+
+from .models import StoredObject
+
+BATCH_SIZE = 500
+
+
+def file_fields(model: Type[models.Model]) -> List[str]:
+    """Return the attribute names of a model's file fields."""
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+
+
+def models_with_files() -> Iterator[Tuple[Type[models.Model], List[str]]]:
+    """Yield every model with file fields, and those fields."""
+    for model in apps.get_models():
+        fields = file_fields(model)
+        if fields:
+            yield model, fields
+
+
+def stored_name(value: Any) -> str:
+    """Return the stored name held by a file field value, or ''."""
+    if isinstance(value, str):
+        return value
+    if getattr(value, "_committed", False):
+        return value.name or ""
+    return ""
+
+
+def stored_names(instance: models.Model, fields: List[str]) -> Dict[str, str]:
+    """Return the stored name of each loaded file field of an instance."""
+    values = instance.__dict__
+    return {field: stored_name(values[field]) for field in fields if field in values}
+
+
+def count_references(deltas: Dict[str, int]) -> None:
+    """Add reference count changes, creating missing rows."""
+    changes = sorted(
+        (name, delta)
+        for name, delta in deltas.items()
+        if delta and is_object_name(name)
+    )
+    if not changes:
+        return
+    StoredObject.objects.bulk_create(
+        [StoredObject(name=name) for name, _ in changes], ignore_conflicts=True
+    )
+    now = timezone.now()
+    for name, delta in changes:
+        StoredObject.objects.filter(name=name).update(
+            refcount=F("refcount") + delta,
+            released_at=Case(
+                When(refcount__lte=-delta, then=Value(now)),
+                default=None if delta > 0 else F("released_at"),
+                output_field=models.DateTimeField(),
+            ),
+        )
+
+
+def reserve_object(name: str) -> None:
+    """
+    Keep an object from being purged while an upload stores or reuses it.
+
+    Creates the object's row if needed and restarts its grace period. A
+    purge deleting the object holds its row until the files are gone, so
+    this waits for the purge to finish.
+    """
+    now = timezone.now()
+    StoredObject.objects.bulk_create(
+        [StoredObject(name=name, released_at=now)], ignore_conflicts=True
+    )
+    StoredObject.objects.filter(name=name, refcount__lte=0).update(released_at=now)
+
+
+def reference_changes(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, int]:
+    """Return the count changes of file fields going from `old` to `new`."""
+    deltas: Counter = Counter()
+    for field, name in new.items():
+        previous = old.get(field, "")
+        if name != previous:
+            deltas[name] += 1
+            deltas[previous] -= 1
+    deltas.pop("", None)
+    return dict(deltas)
+
+
+def rebuild_refcounts() -> int:
+    """Recount the references of every object from the file fields."""
+    counts: Counter = Counter()
+    for model, fields in models_with_files():
+        for names in model._default_manager.values_list(*fields).iterator():
+            counts.update(name for name in names if name and is_object_name(name))
+    now = timezone.now()
+    with transaction.atomic():
+        StoredObject.objects.filter(refcount__gt=0).update(refcount=0, released_at=now)
+        StoredObject.objects.bulk_create(
+            [StoredObject(name=name) for name in counts],
+            ignore_conflicts=True,
+            batch_size=BATCH_SIZE,
+        )
+        StoredObject.objects.bulk_update(
+            [
+                StoredObject(name=name, refcount=count, released_at=None)
+                for name, count in counts.items()
+            ],
+            ["refcount", "released_at"],
+            batch_size=BATCH_SIZE,
+        )
+    return len(counts)
+
+
+def purge_unreferenced(before: datetime.datetime) -> DeleteResult:
+    """
+    Delete the objects unreferenced since before `before`, with variants.
+
+    Rows are claimed with SKIP LOCKED and deleted, then the files are
+    deleted in the same transaction: an upload reserving one of these
+    objects (`reserve_object`) waits for the purge and then stores the
+    object again instead of reusing a file about to disappear. Returns the
+    number of objects purged and the files that could not be deleted; the
+    rows of objects with such files are kept for the next run.
+    """
+    deleted = 0
+    failed: List[DeleteFailure] = []
+    candidates = StoredObject.objects.filter(refcount__lte=0, released_at__lt=before)
+    last = ""
+    while True:
+        with transaction.atomic():
+            names = list(
+                candidates.filter(name__gt=last)
+                .select_for_update(skip_locked=True)
+                .order_by("name")
+                .values_list("name", flat=True)[:BATCH_SIZE]
+            )
+            if not names:
+                break
+            last = names[-1]
+            StoredObject.objects.filter(name__in=names, refcount__lte=0).delete()
+            objects: Dict[StoredFile, str] = {}
+            for name in names:
+                for file in image_files(StoredFile(default_storage, name)):
+                    objects[file] = name
+            result = delete_objects(objects)
+            kept = sorted({objects[failure.file] for failure in result.failed})
+            StoredObject.objects.bulk_create(
+                [StoredObject(name=name, released_at=before) for name in kept]
+            )
+        deleted += len(names) - len(kept)
+        failed += result.failed
+    return DeleteResult(deleted, failed)
@@ -0,0 +1,72 @@
+"""Signal handlers counting references to content-addressed objects."""
+
+from typing import Any, Dict, List, Type
+
+from django.conf import settings
+from django.db import models
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .refcounts import (
+    count_references,
+    models_with_files,
+    reference_changes,
+    stored_names,
+)
+
+# model -> attribute names of its file fields
+_fields: Dict[Type[models.Model], List[str]] = {}
+
+
+def remember_names(sender: Any, instance: models.Model, **kwargs: Any) -> None:
+    """Note the stored names of a loaded instance, to detect replacements."""
+    instance._stored_names = stored_names(instance, _fields[sender])  # type: ignore
+
+
+def count_saved(
+    sender: Any, instance: models.Model, update_fields: Any = None, **kwargs: Any
+) -> None:
+    """Count references to new objects and release replaced ones."""
+    fields = _fields[sender]
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+    old = getattr(instance, "_stored_names", {})
+    new = stored_names(instance, fields)
+    count_references(reference_changes(old, new))
+    instance._stored_names = {**old, **new}  # type: ignore
+
+
+def count_deleted(sender: Any, instance: models.Model, **kwargs: Any) -> None:
+    """Release the objects of a deleted instance."""
+    # The names last saved, where known, are the ones in the database.
+    names = {
+        **stored_names(instance, _fields[sender]),
+        **getattr(instance, "_stored_names", {}),
+    }
+    count_references(reference_changes(names, dict.fromkeys(names, "")))
+
+
+def connect_signals() -> None:
+    """
+    Connect the handlers to every model with file fields.
+
+    Only with MEDIA_CONTENT_ADDRESSED: otherwise there is nothing to count,
+    and every loaded instance of these models would pay for post_init.
+    """
+    if not getattr(settings, "MEDIA_CONTENT_ADDRESSED", False):
+        return
+    for model, fields in models_with_files():
+        _fields[model] = fields
+        uid = f"uploads.{model._meta.label}"
+        post_init.connect(remember_names, sender=model, dispatch_uid=uid)
+        post_save.connect(count_saved, sender=model, dispatch_uid=uid)
+        post_delete.connect(count_deleted, sender=model, dispatch_uid=uid)
+
+
+def disconnect_signals() -> None:
+    """Disconnect the handlers from every model."""
+    for model in list(_fields):
+        uid = f"uploads.{model._meta.label}"
+        post_init.disconnect(sender=model, dispatch_uid=uid)
+        post_save.disconnect(sender=model, dispatch_uid=uid)
+        post_delete.disconnect(sender=model, dispatch_uid=uid)
+        del _fields[model]
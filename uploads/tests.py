@@ -0,0 +1,227 @@
+"""Tests for the uploads application."""
+
+import contextlib
+import datetime
+import hashlib
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from candidates.models import Candidate
+from recruit.custom_storages import ContentAddressedFileSystemStorage
+from recruit.utils import DeleteFailure, StoredFile
+
+from .handlers import (
+    HashingMemoryFileUploadHandler,
+    HashingTemporaryFileUploadHandler,
+)
+from .deletions import record_failures, retry_failed_deletions, storage_path
+from .models import FailedDeletion, StoredObject
+from .refcounts import purge_unreferenced, rebuild_refcounts
+from .signals import connect_signals, disconnect_signals
+
+PHOTO = b"photo bytes"
+PHOTO_DIGEST = hashlib.sha256(PHOTO).hexdigest()
+PHOTO_NAME = f"objects/{PHOTO_DIGEST[:2]}/{PHOTO_DIGEST[2:4]}/{PHOTO_DIGEST}.jpg"
+
+
+class MediaTestCase(TestCase):
+    """Base class storing media content-addressed in a temporary root."""
+
+    def setUp(self) -> None:
+        """Use a content-addressed storage in a temporary media root."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(
+            MEDIA_ROOT=media_root,
+            MEDIA_CONTENT_ADDRESSED=True,
+            IMAGE_PIPELINE_WORKERS=0,
+            STORAGES={
+                "default": {
+                    "BACKEND": (
+                        "recruit.custom_storages.ContentAddressedFileSystemStorage"
+                    )
+                },
+                "staticfiles": {
+                    "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+                },
+            },
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        connect_signals()
+        self.addCleanup(disconnect_signals)
+
+
+class ContentAddressedStorageTest(MediaTestCase):
+    """Test cases for the content-addressed storage."""
+
+    def test_equal_content_is_stored_once(self) -> None:
+        """Test that uploads of the same content share one object."""
+        storage = ContentAddressedFileSystemStorage()
+
+        first = storage.save("resumes/cv.JPG", ContentFile(PHOTO))
+        second = storage.save("photos/me.jpg", ContentFile(PHOTO))
+        other = storage.save("photos/me.jpg", ContentFile(b"other"))
+
+        self.assertEqual(first, PHOTO_NAME)
+        self.assertEqual(second, PHOTO_NAME)
+        self.assertNotEqual(other, PHOTO_NAME)
+        directory = f"objects/{PHOTO_DIGEST[:2]}/{PHOTO_DIGEST[2:4]}"
+        self.assertEqual(len(storage.listdir(directory)[1]), 1)
+
+    def test_upload_digest_is_used(self) -> None:
+        """Test that a digest computed during the upload is not recomputed."""
+        upload = ContentFile(PHOTO, "me.png")
+        upload.content_digest = "f" * 64
+
+        name = ContentAddressedFileSystemStorage().save("me.png", upload)
+
+        self.assertEqual(name, f"objects/ff/ff/{'f' * 64}.png")
+
+    def test_derived_files_keep_their_name(self) -> None:
+        """Test that variants of an object are stored under their own names."""
+        storage = ContentAddressedFileSystemStorage()
+        variant = PHOTO_NAME.replace(".jpg", "-thumb.webp")
+
+        self.assertEqual(storage.save(variant, ContentFile(b"thumb")), variant)
+
+    def test_handlers_hash_uploads(self) -> None:
+        """Test that both upload handlers set the digest of what they received."""
+        for handler in (
+            HashingMemoryFileUploadHandler(),
+            HashingTemporaryFileUploadHandler(),
+        ):
+            handler.handle_raw_input(None, {}, len(PHOTO), "boundary")
+            # The memory handler stops the handlers after it.
+            with contextlib.suppress(StopFutureHandlers):
+                handler.new_file("image", "me.jpg", "image/jpeg", len(PHOTO))
+            handler.receive_data_chunk(PHOTO[:4], 0)
+            handler.receive_data_chunk(PHOTO[4:], 4)
+            uploaded = handler.file_complete(len(PHOTO))
+            self.assertEqual(uploaded.content_digest, PHOTO_DIGEST)
+            uploaded.close()
+
+
+class RefcountTest(MediaTestCase):
+    """Test cases for reference counting of stored objects."""
+
+    def candidate(self, username, content=PHOTO):
+        """Create a candidate with a photo."""
+        return Candidate.objects.create(
+            user=User.objects.create_user(username=username, password="pass1234"),
+            image=ContentFile(content, "me.jpg"),
+        )
+
+    def refcount(self, name=PHOTO_NAME):
+        """Return the reference count of an object."""
+        return StoredObject.objects.get(name=name).refcount
+
+    def test_fields_count_references(self) -> None:
+        """Test that saves, replacements and deletes adjust the counts."""
+        first = self.candidate("first")
+        second = self.candidate("second")
+        self.assertEqual(first.image.name, PHOTO_NAME)
+        self.assertEqual(self.refcount(), 2)
+
+        second = Candidate.objects.get(pk=second.pk)
+        second.image = ContentFile(b"new photo", "new.jpg")
+        second.save()
+        self.assertEqual(self.refcount(), 1)
+        self.assertEqual(self.refcount(second.image.name), 1)
+
+        first.delete()
+        stored = StoredObject.objects.get(name=PHOTO_NAME)
+        self.assertEqual(stored.refcount, 0)
+        self.assertIsNotNone(stored.released_at)
+
+    def test_purge_deletes_unreferenced_objects(self) -> None:
+        """Test that released objects and their variants are purged."""
+        candidate = self.candidate("first")
+        kept = self.candidate("second", b"kept")
+        variant = PHOTO_NAME.replace(".jpg", "-thumb.jpg")
+        default_storage.save(variant, ContentFile(b"thumb"))
+        candidate.delete()
+
+        grace = timezone.now() - datetime.timedelta(hours=1)
+        self.assertEqual(purge_unreferenced(grace).deleted, 0)
+        result = purge_unreferenced(timezone.now() + datetime.timedelta(seconds=1))
+
+        self.assertEqual(result, (1, []))
+        self.assertFalse(default_storage.exists(PHOTO_NAME))
+        self.assertFalse(default_storage.exists(variant))
+        self.assertTrue(default_storage.exists(kept.image.name))
+        self.assertFalse(StoredObject.objects.filter(name=PHOTO_NAME).exists())
+
+    def test_reused_object_is_not_purged(self) -> None:
+        """Test that uploading a released object again restarts its grace period."""
+        self.candidate("first").delete()
+        released = StoredObject.objects.get(name=PHOTO_NAME).released_at
+
+        reused = ContentAddressedFileSystemStorage().save("me.jpg", ContentFile(PHOTO))
+
+        self.assertEqual(reused, PHOTO_NAME)
+        reserved = StoredObject.objects.get(name=PHOTO_NAME).released_at
+        self.assertGreater(reserved, released)
+        self.assertEqual(purge_unreferenced(reserved).deleted, 0)
+        self.assertTrue(default_storage.exists(PHOTO_NAME))
+
+    def test_stored_objects_are_counted_before_use(self) -> None:
+        """Test that a stored object has a row even if nothing refers to it."""
+        name = ContentAddressedFileSystemStorage().save("me.jpg", ContentFile(PHOTO))
+
+        self.assertEqual(self.refcount(name), 0)
+
+    def test_signals_need_content_addressed_media(self) -> None:
+        """Test that nothing is counted without MEDIA_CONTENT_ADDRESSED."""
+        disconnect_signals()
+        with override_settings(MEDIA_CONTENT_ADDRESSED=False):
+            connect_signals()
+            self.candidate("first")
+
+        self.assertFalse(StoredObject.objects.filter(refcount__gt=0).exists())
+
+    def test_rebuild_repairs_counts(self) -> None:
+        """Test that rebuilding recounts writes that bypassed saves."""
+        candidate = self.candidate("first")
+        Candidate.objects.filter(pk=candidate.pk).update(image="")
+
+        self.assertEqual(rebuild_refcounts(), 0)
+        self.assertEqual(self.refcount(), 0)
+
+        Candidate.objects.filter(pk=candidate.pk).update(image=PHOTO_NAME)
+        call_command("purge_media_objects", rebuild=True, stdout=io.StringIO())
+        self.assertEqual(self.refcount(), 1)
+        self.assertTrue(default_storage.exists(PHOTO_NAME))
+
+
+class FailedDeletionTest(MediaTestCase):
+    """Test cases for retrying deletions that failed."""
+
+    def test_retry_deletes_recorded_files(self) -> None:
+        """Test that recorded files are deleted and then forgotten."""
+        name = default_storage.save("orphan.jpg", ContentFile(b"orphan"))
+        record_failures(
+            [
+                DeleteFailure(StoredFile(default_storage, name), "SlowDown"),
+                DeleteFailure(StoredFile(default_storage, "gone.jpg"), "SlowDown"),
+            ]
+        )
+        self.assertEqual(
+            set(FailedDeletion.objects.values_list("storage", flat=True)),
+            {storage_path(default_storage)},
+        )
+
+        result = retry_failed_deletions()
+
+        self.assertEqual(result, (2, []))
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(FailedDeletion.objects.exists())